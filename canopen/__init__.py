@@ -1,6 +1,7 @@
 from .version import __version__
 from .network import Network, NodeScanner
 from .node import RemoteNode, LocalNode
+from .simulator import Simulator
 from .sdo import SdoCommunicationError, SdoAbortedError
 from .objectdictionary import import_od, ObjectDictionary, ObjectDictionaryError
 from .profiles.p402 import BaseNode402
@@ -0,0 +1,207 @@
+import io
+import logging
+import mmap
+import os
+import tempfile
+
+from .sdo import SdoAbortedError
+
+try:
+    from os import replace as _replace
+except ImportError:
+    # Python 2
+    _replace = os.rename
+
+logger = logging.getLogger(__name__)
+
+
+class Domain(object):
+    """Provides the data of a DOMAIN object of a :class:`~canopen.LocalNode`
+    in chunks, so that large objects like firmware images do not have to be
+    kept in memory.
+
+    Subclass and override the methods needed. By default the domain is
+    empty and writes are refused.
+    """
+
+    def get_size(self):
+        """Return the current size of the data in bytes."""
+        return 0
+
+    def read(self, offset, size):
+        """Read a chunk of data.
+
+        :param int offset:
+            Position of the first byte.
+        :param int size:
+            Number of bytes to read.
+
+        :return: The data, shorter than requested only at the end.
+        :rtype: bytes
+        """
+        return b""
+
+    def end_read(self):
+        """Called when a reader of the data has finished, so that resources
+        needed for reading can be released.
+        """
+
+    def begin_write(self, size):
+        """Called before new data is written.
+
+        :param int size:
+            Size of the new data in bytes, or None if unknown.
+        """
+
+    def write(self, offset, data):
+        """Write a chunk of data.
+
+        :param int offset:
+            Position of the first byte.
+        :param bytes data:
+            The data.
+        """
+        # Attempt to write a read only object
+        raise SdoAbortedError(0x06010002)
+
+    def end_write(self, size):
+        """Called when all new data has been written.
+
+        :param int size:
+            Number of bytes written.
+        """
+
+    def abort_write(self):
+        """Called instead of :meth:`end_write` if the transfer was aborted.
+
+        The data written so far should be discarded.
+        """
+
+
+class FileDomain(Domain):
+    """A domain stored in a file.
+
+    The file is memory mapped for reading. New data is written to a
+    temporary file in the same directory, which replaces the file when the
+    transfer has completed, so an aborted transfer leaves the file as it
+    was.
+
+    :param str path:
+        Path to the file.
+    :param bool writable:
+        Allow the file to be replaced by writes to the domain.
+    """
+
+    def __init__(self, path, writable=True):
+        self.path = path
+        self.writable = writable
+        self._read_file = None
+        self._map = None
+        self._write_file = None
+        self._temp_path = None
+
+    def get_size(self):
+        return os.path.getsize(self.path)
+
+    def read(self, offset, size):
+        if self._map is None:
+            self._read_file = open(self.path, "rb")
+            try:
+                self._map = mmap.mmap(self._read_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                self.end_read()
+                return b""
+        return self._map[offset:offset + size]
+
+    def end_read(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._read_file is not None:
+            self._read_file.close()
+            self._read_file = None
+
+    def begin_write(self, size):
+        if not self.writable:
+            raise SdoAbortedError(0x06010002)
+        self.abort_write()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, self._temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._write_file = os.fdopen(fd, "wb")
+
+    def write(self, offset, data):
+        if self._write_file is None:
+            # Not opened by begin_write()
+            raise SdoAbortedError(0x08000022)
+        self._write_file.seek(offset)
+        self._write_file.write(data)
+
+    def end_write(self, size):
+        if self._write_file is None:
+            raise SdoAbortedError(0x08000022)
+        self._write_file.close()
+        self._write_file = None
+        # Readers continue with the new file
+        self.end_read()
+        _replace(self._temp_path, self.path)
+        self._temp_path = None
+        logger.info("Wrote %d bytes to %s", size, self.path)
+
+    def abort_write(self):
+        if self._write_file is not None:
+            self._write_file.close()
+            self._write_file = None
+        if self._temp_path is not None:
+            os.remove(self._temp_path)
+            self._temp_path = None
+
+    def close(self):
+        """Close all open files and discard an unfinished write."""
+        self.end_read()
+        self.abort_write()
+
+
+class DomainReader(object):
+    """File like object reading from a :class:`Domain` at an offset
+    cursor.
+    """
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.size = domain.get_size()
+        self.offset = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def read(self, size=-1):
+        remaining = self.size - self.offset
+        if size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return b""
+        data = self.domain.read(self.offset, size)
+        self.offset += len(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.offset
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.offset = offset
+        return offset
+
+    def tell(self):
+        return self.offset
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.domain.end_read()
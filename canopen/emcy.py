@@ -1,7 +1,11 @@
 import struct
 import logging
 import threading
-import time
+import collections
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 # Error code, error register, vendor specific data
 EMCY_STRUCT = struct.Struct("<HB5s")
@@ -11,26 +15,34 @@ logger = logging.getLogger(__name__)
 
 class EmcyConsumer(object):
 
-    def __init__(self):
-        #: Log of all received EMCYs for this node
-        self.log = []
+    def __init__(self, log_size=1000):
+        #: Log of the latest received EMCYs for this node as an
+        #: :class:`~canopen.emcy.EmcyStore`
+        self.log = EmcyStore(log_size)
         #: Only active EMCYs. Will be cleared on Error Reset
         self.active = []
         self.callbacks = []
+        #: Additional :class:`~canopen.emcy.EmcyStore` shared with other
+        #: nodes, set to the network wide log when added to a network
+        self.shared_log = None
         self.emcy_received = threading.Condition()
 
     def on_emcy(self, can_id, data, timestamp):
         code, register, data = EMCY_STRUCT.unpack(data)
-        entry = EmcyError(code, register, data, timestamp)
+        self._handle(EmcyError(code, register, data, timestamp, can_id & 0x7F))
 
+    def _handle(self, entry):
+        code = entry.code
         with self.emcy_received:
             if code & 0xFF00 == 0:
                 # Error reset
                 self.active = []
             else:
                 self.active.append(entry)
-            self.log.append(entry)
+            self.log.add(entry)
             self.emcy_received.notify_all()
+        if self.shared_log is not None:
+            self.shared_log.add(entry)
 
         for callback in self.callbacks:
             callback(entry)
@@ -46,7 +58,7 @@ class EmcyConsumer(object):
 
     def reset(self):
         """Reset log and active lists."""
-        self.log = []
+        self.log.clear()
         self.active = []
 
     def wait(self, emcy_code=None, timeout=10):
@@ -58,23 +70,363 @@ class EmcyConsumer(object):
         :return: The EMCY exception object or None if timeout
         :rtype: canopen.emcy.EmcyError
         """
-        end_time = time.time() + timeout
-        while True:
-            with self.emcy_received:
-                prev_log_size = len(self.log)
-                self.emcy_received.wait(timeout)
-                if len(self.log) == prev_log_size:
-                    # Resumed due to timeout
-                    return None
-                # Get last logged EMCY
-                emcy = self.log[-1]
-                logger.info("Got %s", emcy)
-                if time.time() > end_time:
-                    # No valid EMCY received on time
-                    return None
-                if emcy_code is None or emcy.code == emcy_code:
-                    # This is the one we're interested in
-                    return emcy
+        emcy = self.log.wait(emcy_code, timeout)
+        if emcy is not None:
+            logger.info("Got %s", emcy)
+        return emcy
+
+
+class EmcyStore(object):
+    """Bounded history of EMCY messages.
+
+    When full, the oldest entries are discarded. Entries are indexed by node
+    and by error class so that these lookups do not need to scan the whole
+    history. Entries are expected to be added in order of time.
+
+    :param int maxlen:
+        Max number of entries to keep.
+    """
+
+    def __init__(self, maxlen=1000):
+        #: Max number of entries to keep
+        self.maxlen = maxlen
+        #: Number of entries discarded since the store was full
+        self.discarded = 0
+        # Ring buffer of entries, the oldest at position _head when full
+        self._entries = []
+        self._head = 0
+        self._by_node = {}
+        self._by_class = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        with self._lock:
+            entries = self._entries
+            size = len(entries)
+            if isinstance(index, slice):
+                return [entries[(self._head + i) % size]
+                        for i in range(*index.indices(size))]
+            if index < 0:
+                index += size
+            if not 0 <= index < size:
+                raise IndexError("EMCY index out of range")
+            return entries[(self._head + index) % size]
+
+    def __iter__(self):
+        with self._lock:
+            entries = self._entries
+            return iter(entries[self._head:] + entries[:self._head])
+
+    def add(self, entry):
+        """Add an EMCY to the store.
+
+        :param canopen.emcy.EmcyError entry: The EMCY to add
+        """
+        error_class = get_error_class(entry.code)
+        with self._lock:
+            self._by_node.setdefault(entry.node_id, collections.deque()).append(entry)
+            self._by_class.setdefault(error_class, collections.deque()).append(entry)
+            if len(self._entries) < self.maxlen:
+                self._entries.append(entry)
+            else:
+                # Replace the oldest entry, which is also the oldest in its
+                # indexes
+                old = self._entries[self._head]
+                self._entries[self._head] = entry
+                self._head = (self._head + 1) % len(self._entries)
+                self._by_node[old.node_id].popleft()
+                self._by_class[get_error_class(old.code)].popleft()
+                self.discarded += 1
+            waiters = self._waiters.pop(entry.code, [])
+            waiters.extend(self._waiters.pop(None, []))
+        for waiter in waiters:
+            waiter.entry = entry
+            waiter.event.set()
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries = []
+            self._head = 0
+            self.discarded = 0
+            self._by_node.clear()
+            self._by_class.clear()
+
+    def by_node(self, node_id):
+        """Get stored EMCYs from a node.
+
+        :param int node_id: Node ID
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._by_node.get(node_id, ()))
+
+    def by_class(self, code):
+        """Get stored EMCYs of the same error class as the given code, e.g.
+        0x3000 for all voltage errors.
+
+        :param int code: EMCY code
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._by_class.get(get_error_class(code), ()))
+
+    def between(self, start, end):
+        """Get stored EMCYs with timestamps in the range ``start <= t < end``.
+
+        :param float start: Start timestamp
+        :param float end: End timestamp
+        :rtype: list
+        """
+        with self._lock:
+            entries = self._entries
+            head = self._head
+            size = len(entries)
+            first = self._bisect(start)
+            last = self._bisect(end)
+            return [entries[(head + i) % size] for i in range(first, last)]
+
+    def _bisect(self, timestamp):
+        entries = self._entries
+        head = self._head
+        size = len(entries)
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            if entries[(head + middle) % size].timestamp < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def wait(self, emcy_code=None, timeout=10):
+        """Wait for a new EMCY to be added.
+
+        Each waiter is only woken up by EMCYs with the code it waits for,
+        and will not miss it if several EMCYs arrive at once.
+
+        :param int emcy_code: EMCY code to wait for, or None for any code
+        :param float timeout: Max time in seconds to wait
+
+        :return: The EMCY exception object or None if timeout
+        :rtype: canopen.emcy.EmcyError
+        """
+        waiter = _Waiter()
+        with self._lock:
+            self._waiters.setdefault(emcy_code, []).append(waiter)
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                waiters = self._waiters.get(emcy_code, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+        return waiter.entry
+
+
+class EmcyAggregator(object):
+    """Collects EMCYs from all nodes on a network and delivers them to
+    callbacks in batches.
+
+    EMCYs with the same code from the same node within one window are
+    coalesced into one :class:`~canopen.emcy.EmcyEvent` with a counter, so
+    that a storm of messages only results in one notification per window.
+    Receiving a message only queues it; the EMCY objects are created and
+    the callbacks called from a delivery thread of the aggregator, so slow
+    callbacks do not hold up the network's scheduler.
+
+    While started, the :class:`~canopen.emcy.EmcyConsumer` of each remote
+    node is also fed from the delivery thread instead of from the receive
+    thread. Consumers still get every EMCY, in the order received, so their
+    logs and active errors are the same as without the aggregator.
+
+    :param canopen.Network network:
+        The network to listen on.
+    """
+
+    #: Length of the window in seconds
+    window = 0.1
+
+    def __init__(self, network):
+        self.network = network
+        self.callbacks = []
+        #: Total number of EMCYs received
+        self.received = 0
+        #: Total number of EMCYs coalesced into an earlier one
+        self.suppressed = 0
+        self._pending = collections.OrderedDict()
+        # Messages for consumers in the order received
+        self._messages = []
+        self._lock = threading.Lock()
+        # Keeps batches in order if flushed from several threads
+        self._deliver_lock = threading.RLock()
+        self._timer = None
+        self._listening = False
+        self._requests = None
+        self._thread = None
+        # EmcyConsumer by node ID
+        self._consumers = {}
+
+    def start(self, window=None):
+        """Start listening for EMCYs from all node IDs.
+
+        :param float window:
+            Length of the window in seconds.
+        """
+        if window is not None:
+            self.window = window
+        if not self._listening:
+            self._requests = queue.Queue()
+            self._thread = threading.Thread(target=self._run,
+                                            name="canopen-emcy")
+            self._thread.daemon = True
+            self._thread.start()
+            for node_id, consumer in self._consumers.items():
+                self.network.unsubscribe(0x80 + node_id, consumer.on_emcy)
+            for node_id in range(1, 128):
+                self.network.subscribe(0x80 + node_id, self.on_emcy)
+            self._listening = True
+
+    def stop(self):
+        """Stop listening and deliver any pending events."""
+        if self._listening:
+            for node_id in range(1, 128):
+                self.network.unsubscribe(0x80 + node_id, self.on_emcy)
+            for node_id, consumer in self._consumers.items():
+                self.network.subscribe(0x80 + node_id, consumer.on_emcy)
+            self._listening = False
+            self._requests.put(False)
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add_consumer(self, node_id, consumer):
+        """Feed the EMCYs of a node to its consumer.
+
+        Messages are passed on directly while the aggregator is stopped and
+        from the delivery thread once per window while it is started.
+
+        :param int node_id: Node ID
+        :param canopen.emcy.EmcyConsumer consumer: The consumer
+        """
+        self._consumers[node_id] = consumer
+        if not self._listening:
+            self.network.subscribe(0x80 + node_id, consumer.on_emcy)
+
+    def remove_consumer(self, node_id):
+        """Stop feeding EMCYs to the consumer of a node.
+
+        :param int node_id: Node ID
+        """
+        consumer = self._consumers.pop(node_id)
+        if not self._listening:
+            self.network.unsubscribe(0x80 + node_id, consumer.on_emcy)
+
+    def add_callback(self, callback):
+        """Get notified of EMCYs once per window.
+
+        :param callback:
+            Callable which must take a list of
+            :class:`~canopen.emcy.EmcyEvent` objects as only argument.
+        """
+        self.callbacks.append(callback)
+
+    def on_emcy(self, can_id, data, timestamp):
+        # Decoded and checked when flushed
+        node_id = can_id & 0x7F
+        key = (node_id, bytes(data[:2]))
+        with self._lock:
+            self.received += 1
+            if node_id in self._consumers:
+                self._messages.append((node_id, bytes(data), timestamp))
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = [bytes(data), timestamp, timestamp, 1]
+                if self._timer is None:
+                    self._timer = self.network.scheduler.call_later(
+                        self.window, self._request_flush)
+            else:
+                pending[2] = timestamp
+                pending[3] += 1
+                self.suppressed += 1
+
+    def flush(self):
+        """Deliver the EMCYs collected so far to the consumers and the
+        events to the callbacks.
+        """
+        with self._deliver_lock:
+            with self._lock:
+                pending = self._pending
+                messages = self._messages
+                self._pending = collections.OrderedDict()
+                self._messages = []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            for node_id, data, timestamp in messages:
+                consumer = self._consumers.get(node_id)
+                try:
+                    code, register, data = EMCY_STRUCT.unpack(data)
+                except struct.error:
+                    # Reported once for its event below
+                    continue
+                if consumer is not None:
+                    consumer._handle(EmcyError(
+                        code, register, data, timestamp, node_id))
+            events = []
+            for (node_id, _), (data, first, last, count) in pending.items():
+                try:
+                    code, register, data = EMCY_STRUCT.unpack(data)
+                except struct.error:
+                    logger.warning("Invalid EMCY from node %d: %r",
+                                   node_id, data)
+                    continue
+                entry = EmcyError(code, register, data, first, node_id)
+                events.append(EmcyEvent(entry, count, last))
+            if not events:
+                return
+            for callback in self.callbacks:
+                callback(events)
+
+    def _request_flush(self):
+        # Called from the scheduler thread, delivery is left to our own
+        requests = self._requests
+        if requests is not None:
+            requests.put(True)
+
+    def _run(self):
+        requests = self._requests
+        while requests.get():
+            try:
+                self.flush()
+            except Exception as e:
+                # Exceptions in callbacks should not stop later deliveries
+                logger.exception(e)
+
+
+class EmcyEvent(object):
+    """One or more EMCYs with the same code from the same node."""
+
+    def __init__(self, emcy, count, last_timestamp):
+        #: The first :class:`~canopen.emcy.EmcyError` received
+        self.emcy = emcy
+        #: Number of times the EMCY was received in the window
+        self.count = count
+        #: Timestamp of the last time the EMCY was received
+        self.last_timestamp = last_timestamp
+
+    def __str__(self):
+        return "Node %d: %s (x%d)" % (self.emcy.node_id, self.emcy, self.count)
+
+
+class _Waiter(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
 
 
 class EmcyProducer(object):
@@ -111,7 +463,7 @@ class EmcyError(Exception):
         (0xFF00, 0xFF00, "Device Specific")
     ]
 
-    def __init__(self, code, register, data, timestamp):
+    def __init__(self, code, register, data, timestamp, node_id=None):
         #: EMCY code
         self.code = code
         #: Error register
@@ -120,6 +472,8 @@ class EmcyError(Exception):
         self.data = data
         #: Timestamp of message
         self.timestamp = timestamp
+        #: ID of the node which sent the EMCY
+        self.node_id = node_id
 
     def get_desc(self):
         for code, mask, description in self.DESCRIPTIONS:
@@ -133,3 +487,30 @@ class EmcyError(Exception):
         if description:
             text = text + ", " + description
         return text
+
+
+def _build_error_classes():
+    # All masks only cover the upper byte, so it decides the class
+    classes = []
+    for high_byte in range(256):
+        code = high_byte << 8
+        for error_class, mask, _ in EmcyError.DESCRIPTIONS:
+            if code & mask == error_class:
+                break
+        else:
+            error_class = code
+        classes.append(error_class)
+    return classes
+
+
+_ERROR_CLASSES = _build_error_classes()
+
+
+def get_error_class(code):
+    """Get the error class of an EMCY code as defined by
+    :attr:`EmcyError.DESCRIPTIONS`, e.g. 0x3000 for 0x3120.
+
+    :param int code: EMCY code
+    :rtype: int
+    """
+    return _ERROR_CLASSES[code >> 8]
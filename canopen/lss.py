@@ -6,6 +6,8 @@ try:
 except ImportError:
     import Queue as queue
 
+from .scheduler import clock
+
 logger = logging.getLogger(__name__)
 
 # Command Specifier (CS)
@@ -81,6 +83,19 @@ class LssMaster(object):
     #: Max time in seconds to wait for response from server
     RESPONSE_TIMEOUT = 0.5
 
+    #: Time in seconds to wait after each part of an LSS address which is
+    #: not answered, as some devices can not handle messages arriving with
+    #: no delay
+    INTER_FRAME_DELAY = 0.2
+
+    #: Shortest time in seconds to wait for a fast scan response when the
+    #: timeout is adapted to the measured response times
+    FAST_SCAN_MIN_TIMEOUT = 0.02
+
+    #: Factor between the slowest fast scan response seen and the adapted
+    #: timeout
+    FAST_SCAN_MARGIN = 3
+
     def __init__(self):
         self.network = None
         self._node_id = 0
@@ -108,7 +123,8 @@ class LssMaster(object):
         self.send_switch_state_global(mode)
 
     def send_switch_state_selective(self,
-                                    vendorId, productCode, revisionNumber, serialNumber):
+                                    vendorId, productCode, revisionNumber, serialNumber,
+                                    delay=None):
         """switch mode from WAITING_STATE to CONFIGURATION_STATE
         only if 128bits LSS address matches with the arguments.
         It sends 4 messages for each argument.
@@ -123,6 +139,9 @@ class LssMaster(object):
             object index 0x1018 subindex 3
         :param int serialNumber:
             object index 0x1018 subindex 4
+        :param float delay:
+            Time in seconds to wait between the messages.
+            Defaults to :attr:`INTER_FRAME_DELAY`.
 
         :return:
             True if any slave responds.
@@ -130,10 +149,14 @@ class LssMaster(object):
         :rtype: bool
         """
 
-        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_VENDOR_ID, vendorId)
-        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_PRODUCT_CODE, productCode)
-        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_REVISION_NUMBER, revisionNumber)
-        response = self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_SERIAL_NUMBER, serialNumber)
+        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_VENDOR_ID, vendorId, delay)
+        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_PRODUCT_CODE, productCode, delay)
+        self.__send_lss_address(CS_SWITCH_STATE_SELECTIVE_REVISION_NUMBER, revisionNumber, delay)
+        try:
+            response = self.__send_lss_address(
+                CS_SWITCH_STATE_SELECTIVE_SERIAL_NUMBER, serialNumber, delay)
+        except LssError:
+            return False
 
         cs = struct.unpack_from("<B", response)[0]
         if cs == CS_SWITCH_STATE_SELECTIVE_RESPONSE:
@@ -241,52 +264,213 @@ class LssMaster(object):
         message[0] = CS_IDENTIFY_NON_CONFIGURED_REMOTE_SLAVE
         self.__send_command(message)
 
-    def fast_scan(self):
+    def fast_scan(self, timeout=None, adaptive=False):
         """This command sends a series of fastscan message
         to find unconfigured slave with lowest number of LSS idenities
 
+        Half of the steps are expected to get no response, so the time to
+        wait for a response decides how long a scan takes.
+
+        :param float timeout:
+            Max time in seconds to wait for a response to each step.
+            Defaults to :attr:`RESPONSE_TIMEOUT`.
+        :param bool adaptive:
+            Wait only :attr:`FAST_SCAN_MARGIN` times the slowest response
+            seen so far, but at least :attr:`FAST_SCAN_MIN_TIMEOUT`.
+            Responses arriving after their step timed out are discarded
+            and make the timeout longer. If the result can not be
+            confirmed, the scan is repeated with the full timeout.
+
         :return:
             True if a slave is found.
             False if there is no candidate.
             list is the LSS identities [vendor_id, product_code, revision_number, seerial_number]
         :rtype: bool, list
         """
+        if timeout is None:
+            timeout = self.RESPONSE_TIMEOUT
+        responded, lss_id = self.__fast_scan(timeout, adaptive)
+        if responded and lss_id is None and adaptive:
+            # A response may have been too slow for the adapted timeout
+            responded, lss_id = self.__fast_scan(timeout, False)
+        if lss_id is None:
+            return False, None
+        return True, lss_id
+
+    def fast_scan_all(self, node_ids, timeout=None, adaptive=True, store=False):
+        """Find all unconfigured slaves using fast scan and assign node IDs.
+
+        Slaves are found one at a time and given the next node ID from the
+        list, until no unconfigured slave responds or all node IDs are used.
+
+        :param node_ids:
+            Node IDs to assign, in order.
+        :param float timeout:
+            Max time in seconds to wait for a response to each step.
+        :param bool adaptive:
+            Adapt the timeout to the measured response times,
+            see :meth:`fast_scan`.
+        :param bool store:
+            Store the configuration in each slave.
+
+        :return: One result per slave found.
+        :rtype: list[canopen.lss.LssResult]
+        """
+        results = []
+        for node_id in node_ids:
+            start = clock()
+            found, lss_id = self.fast_scan(timeout, adaptive)
+            if not found:
+                break
+            result = LssResult(lss_id, node_id)
+            try:
+                self.configure_node_id(node_id)
+                if store:
+                    self.store_configuration()
+            except LssError as e:
+                result.error = e
+            self.send_switch_state_global(self.WAITING_STATE)
+            result.elapsed = clock() - start
+            logger.info("Assigned node ID %d to slave %s in %.3f s",
+                        node_id, lss_id, result.elapsed)
+            results.append(result)
+        return results
+
+    def commission(self, devices, delay=None, store=True, verify=True):
+        """Assign node IDs to slaves with known LSS addresses.
+
+        Each slave is switched to configuration state with
+        :meth:`send_switch_state_selective`, given its node ID and switched
+        back to waiting state. Errors are recorded in the result for the
+        slave and do not stop the remaining slaves from being configured.
+
+        :param devices:
+            Sequence of ``(lss_address, node_id)`` or
+            ``(lss_address, node_id, delay)`` where ``lss_address`` is
+            ``[vendor_id, product_code, revision_number, serial_number]``
+            and ``delay`` overrides the delay between messages for the slave.
+        :param float delay:
+            Time in seconds to wait between unanswered messages.
+            Defaults to :attr:`INTER_FRAME_DELAY`.
+        :param bool store:
+            Store the configuration in each slave.
+        :param bool verify:
+            Read back the node ID with :meth:`inquire_node_id`.
+
+        :return: One result per slave.
+        :rtype: list[canopen.lss.LssResult]
+        """
+        results = []
+        for device in devices:
+            lss_address, node_id = device[:2]
+            device_delay = device[2] if len(device) > 2 else delay
+            result = LssResult(list(lss_address), node_id)
+            start = clock()
+            try:
+                if not self.send_switch_state_selective(*lss_address,
+                                                        delay=device_delay):
+                    raise LssError("Slave did not respond")
+                try:
+                    self.configure_node_id(node_id)
+                    if verify:
+                        current_node_id = self.inquire_node_id()
+                        if current_node_id != node_id:
+                            raise LssError("Node ID is %d, expected %d" % (
+                                current_node_id, node_id))
+                    if store:
+                        self.store_configuration()
+                finally:
+                    self.send_switch_state_global(self.WAITING_STATE)
+            except LssError as e:
+                result.error = e
+            result.elapsed = clock() - start
+            logger.info("Configured slave %s as node %d in %.3f s: %s",
+                        result.lss_address, node_id, result.elapsed,
+                        "OK" if result.success else result.error)
+            results.append(result)
+        return results
+
+    def __fast_scan(self, timeout, adaptive):
+        """Run one fast scan.
+
+        :return:
+            If any slave responded and the LSS address, or None if the
+            address could not be confirmed.
+        :rtype: bool, list
+        """
         lss_id = [0] * 4
         lss_bit_check = 128
         lss_sub = 0
         lss_next = 0
-
-        if self.__send_fast_scan_message(lss_id[0], lss_bit_check, lss_sub, lss_next):
-            time.sleep(0.01)
-            while lss_sub < 4:
-                lss_bit_check = 32
-                while lss_bit_check > 0:
-                    lss_bit_check -= 1
-
-                    if not self.__send_fast_scan_message(lss_id[lss_sub], lss_bit_check, lss_sub, lss_next):
-                        lss_id[lss_sub] |= 1 << lss_bit_check
-
-                    time.sleep(0.01)
-
-                lss_next = (lss_sub + 1) & 3
-                if not self.__send_fast_scan_message(lss_id[lss_sub], lss_bit_check, lss_sub, lss_next):
-                    return False, None
-
-                time.sleep(0.01)
-
-                # Now the next 32 bits will be scanned
-                lss_sub += 1
-
-            # Now lss_id contains the entire 128 bits scanned
-            return True, lss_id
-
-        return False, None
-
-    def __send_fast_scan_message(self, id_number, bit_checker, lss_sub, lss_next):
+        step_timeout = timeout
+        slowest = 0
+
+        start = clock()
+        if not self.__send_fast_scan_message(lss_id[0], lss_bit_check, lss_sub, lss_next, timeout):
+            return False, None
+        if adaptive:
+            slowest = clock() - start
+            step_timeout = self.__adapt_timeout(timeout, slowest)
+
+        while lss_sub < 4:
+            lss_bit_check = 32
+            while lss_bit_check > 0:
+                lss_bit_check -= 1
+
+                if self.__clear_responses() and adaptive:
+                    # A response arrived after its step timed out, so the
+                    # result will likely not be confirmed, but the rest of
+                    # the scan should not be affected
+                    slowest = step_timeout
+                    step_timeout = self.__adapt_timeout(timeout, slowest)
+                start = clock()
+                if self.__send_fast_scan_message(lss_id[lss_sub], lss_bit_check,
+                                                 lss_sub, lss_next, step_timeout):
+                    if adaptive and clock() - start > slowest:
+                        slowest = clock() - start
+                        step_timeout = self.__adapt_timeout(timeout, slowest)
+                else:
+                    lss_id[lss_sub] |= 1 << lss_bit_check
+
+            lss_next = (lss_sub + 1) & 3
+            if not self.__send_fast_scan_message(lss_id[lss_sub], lss_bit_check,
+                                                 lss_sub, lss_next, timeout):
+                return True, None
+
+            # Now the next 32 bits will be scanned
+            lss_sub += 1
+
+        # Now lss_id contains the entire 128 bits scanned
+        return True, lss_id
+
+    def __adapt_timeout(self, timeout, slowest):
+        return min(timeout, max(self.FAST_SCAN_MIN_TIMEOUT,
+                                slowest * self.FAST_SCAN_MARGIN))
+
+    def __clear_responses(self):
+        """Discard responses which arrived too late.
+
+        :return: Number of responses discarded.
+        :rtype: int
+        """
+        count = 0
+        while True:
+            try:
+                self.responses.get_nowait()
+            except queue.Empty:
+                break
+            count += 1
+        if count:
+            logger.info("Discarded %d late LSS response(s)", count)
+        return count
+
+    def __send_fast_scan_message(self, id_number, bit_checker, lss_sub, lss_next,
+                                 timeout=None):
         message = bytearray(8)
-        message[0:8] = struct.pack('<BIBBB', CS_FAST_SCAN, id_number, bit_checker, lss_sub, lss_next)
+        message[0:8] = struct.pack('<BIBBB', CS_FAST_SCAN, id_number, bit_checker,
+                                   lss_sub, lss_next)
         try:
-            recv_msg = self.__send_command(message)
+            recv_msg = self.__send_command(message, timeout)
         except LssError:
             return False
 
@@ -296,15 +480,19 @@ class LssMaster(object):
 
         return False
 
-    def __send_lss_address(self, req_cs, number):
+    def __send_lss_address(self, req_cs, number, delay=None):
         message = bytearray(8)
 
         message[0] = req_cs
         message[1:5] = struct.pack('<I', number)
         response = self.__send_command(message)
-        # some device needs these delays between messages
-        # because it can't handle messages arriving with no delay
-        time.sleep(0.2)
+        if response is None:
+            # some device needs these delays between messages
+            # because it can't handle messages arriving with no delay
+            if delay is None:
+                delay = self.INTER_FRAME_DELAY
+            if delay > 0:
+                time.sleep(delay)
 
         return response
 
@@ -359,11 +547,14 @@ class LssMaster(object):
             error_msg = "LSS Error: %d" % error_code
             raise LssError(error_msg)
 
-    def __send_command(self, message):
+    def __send_command(self, message, timeout=None):
         """Send a LSS operation code to the network
 
         :param bytearray message:
             LSS request message.
+        :param float timeout:
+            Max time in seconds to wait for the response.
+            Defaults to :attr:`RESPONSE_TIMEOUT`.
 
         :return:
             response
@@ -376,20 +567,20 @@ class LssMaster(object):
             "Sending LSS message {}".format(message_str))
 
         response = None
-        if not self.responses.empty():
-            logger.info("There were unexpected messages in the queue")
-            self.responses = queue.Queue()
+        self.__clear_responses()
 
         self.network.send_message(self.LSS_TX_COBID, message)
 
         if not bool(message[0] in ListMessageNeedResponse):
             return response
 
+        if timeout is None:
+            timeout = self.RESPONSE_TIMEOUT
+
         # Wait for the slave to respond
         # TODO check if the response is LSS response message
         try:
-            response = self.responses.get(
-                block=True, timeout=self.RESPONSE_TIMEOUT)
+            response = self.responses.get(block=True, timeout=timeout)
         except queue.Empty:
             raise LssError("No LSS response received")
 
@@ -399,5 +590,28 @@ class LssMaster(object):
         self.responses.put(bytes(data))
 
 
+class LssResult(object):
+    """Outcome of configuring one slave."""
+
+    def __init__(self, lss_address, node_id):
+        #: LSS address as [vendor_id, product_code, revision_number, serial_number]
+        self.lss_address = lss_address
+        #: Node ID assigned to the slave
+        self.node_id = node_id
+        #: Time in seconds spent on the slave
+        self.elapsed = None
+        #: :class:`~canopen.lss.LssError` if the configuration failed
+        self.error = None
+
+    @property
+    def success(self):
+        """True if the slave was configured without errors."""
+        return self.error is None
+
+    def __repr__(self):
+        return "<LssResult node %d: %s>" % (
+            self.node_id, "OK" if self.success else self.error)
+
+
 class LssError(Exception):
     """Some LSS operation failed."""
@@ -1,7 +1,9 @@
 import collections
 import logging
+import multiprocessing
 import threading
 import struct
+import time
 
 try:
     import can
@@ -16,8 +18,11 @@ except ImportError:
 from .node import RemoteNode, LocalNode
 from .sync import SyncProducer
 from .timestamp import TimeProducer
-from .nmt import NmtMaster
+from .nmt import NmtMaster, HeartbeatMonitor, NodeGuarding
 from .lss import LssMaster
+from .emcy import EmcyStore, EmcyAggregator
+from .scheduler import Scheduler, clock
+from .objectdictionary import import_od, ObjectDictionary
 from .objectdictionary.eds import import_from_node
 
 logger = logging.getLogger(__name__)
@@ -42,29 +47,50 @@ class Network(collections.MutableMapping):
         self.notifier = None
         self.nodes = {}
         self.subscribers = {}
+        self.remote_subscribers = {}
+        # Serializes changes of the subscriber lists, reading needs no lock
+        self._subscribe_lock = threading.Lock()
         self.send_lock = threading.Lock()
         self.sync = SyncProducer(self)
         self.time = TimeProducer(self)
+        #: A :class:`~canopen.scheduler.Scheduler` for timed tasks
+        self.scheduler = Scheduler()
         self.nmt = NmtMaster(0)
         self.nmt.network = self
+        #: A :class:`~canopen.nmt.HeartbeatMonitor` supervising heartbeats
+        self.heartbeat = HeartbeatMonitor(self)
+        #: A :class:`~canopen.nmt.NodeGuarding` master for nodes without
+        #: heartbeat
+        self.guarding = NodeGuarding(self)
+        #: An :class:`~canopen.emcy.EmcyStore` with EMCYs from all remote nodes
+        self.emcy_log = EmcyStore(10000)
+        #: An :class:`~canopen.emcy.EmcyAggregator` for batched EMCY
+        #: notifications from all nodes
+        self.emcy = EmcyAggregator(self)
 
         self.lss = LssMaster()
         self.lss.network = self
         self.subscribe(self.lss.LSS_RX_COBID, self.lss.on_message_received)
 
-    def subscribe(self, can_id, callback):
+    def subscribe(self, can_id, callback, remote=False):
         """Listen for messages with a specific CAN ID.
 
         :param int can_id:
             The CAN ID to listen for.
         :param callback:
             Function to call when message is received.
+        :param bool remote:
+            Listen for remote frames instead of data frames.
         """
-        self.subscribers.setdefault(can_id, list())
-        if callback not in self.subscribers[can_id]:
-            self.subscribers[can_id].append(callback)
-
-    def unsubscribe(self, can_id, callback=None):
+        subscribers = self.remote_subscribers if remote else self.subscribers
+        # Lists are replaced rather than modified so that they can be
+        # iterated safely from the receiving thread
+        with self._subscribe_lock:
+            callbacks = subscribers.get(can_id, [])
+            if callback not in callbacks:
+                subscribers[can_id] = callbacks + [callback]
+
+    def unsubscribe(self, can_id, callback=None, remote=False):
         """Stop listening for message.
 
         :param int can_id:
@@ -72,11 +98,17 @@ class Network(collections.MutableMapping):
         :param callback:
             If given, remove only this callback.  Otherwise all callbacks for
             the CAN ID.
+        :param bool remote:
+            Stop listening for remote frames instead of data frames.
         """
-        if callback is None:
-            del self.subscribers[can_id]
-        else:
-            self.subscribers[can_id].remove(callback)
+        subscribers = self.remote_subscribers if remote else self.subscribers
+        with self._subscribe_lock:
+            if callback is None:
+                del subscribers[can_id]
+            else:
+                callbacks = list(subscribers[can_id])
+                callbacks.remove(callback)
+                subscribers[can_id] = callbacks
 
     def connect(self, *args, **kwargs):
         """Connect to CAN bus using python-can.
@@ -119,6 +151,7 @@ class Network(collections.MutableMapping):
         for node in self.nodes.values():
             if hasattr(node, "pdo"):
                 node.pdo.stop()
+        self.scheduler.stop()
         self.notifier.stop()
         self.bus.shutdown()
         self.bus = None
@@ -155,6 +188,58 @@ class Network(collections.MutableMapping):
         self[node.id] = node
         return node
 
+    def add_nodes(self, specs, workers=None):
+        """Add many remote nodes to the network at once.
+
+        The object dictionary files are parsed in parallel using a pool of
+        worker processes, which may considerably reduce start-up time for
+        networks with many nodes.
+
+        :param specs:
+            Iterable of ``(node_id, object_dictionary)`` pairs where the
+            object dictionary is given in the same way as for
+            :meth:`add_node`.
+        :param int workers:
+            Number of worker processes. Defaults to the number of CPUs.
+            Set to 1 to parse all files in the current process.
+
+        :return:
+            The Node objects that were added, in the same order as given.
+        :rtype: list
+        """
+        specs = list(specs)
+        # Files with $NODEID expressions are parsed differently depending on
+        # the node ID, so each distinct combination needs to be parsed
+        jobs = []
+        for node_id, object_dictionary in specs:
+            if _is_od_path(object_dictionary):
+                job = (object_dictionary, node_id)
+                if job not in jobs:
+                    jobs.append(job)
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, len(jobs))
+        if workers > 1:
+            logger.info("Parsing %d object dictionaries using %d processes",
+                        len(jobs), workers)
+            pool = multiprocessing.Pool(workers)
+            try:
+                results = pool.map(_import_od_job, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_import_od_job(job) for job in jobs]
+        parsed = dict(zip(jobs, results))
+
+        nodes = []
+        for node_id, object_dictionary in specs:
+            if _is_od_path(object_dictionary):
+                object_dictionary = parsed[(object_dictionary, node_id)]
+            nodes.append(self.add_node(node_id, object_dictionary))
+        return nodes
+
     def create_node(self, node, object_dictionary=None):
         """Create a local node in the network.
 
@@ -219,7 +304,7 @@ class Network(collections.MutableMapping):
         """
         return PeriodicMessageTask(can_id, data, period, self.bus, remote)
 
-    def notify(self, can_id, data, timestamp):
+    def notify(self, can_id, data, timestamp, remote=False):
         """Feed incoming message to this library.
 
         If a custom interface is used, this function must be called for each
@@ -231,7 +316,13 @@ class Network(collections.MutableMapping):
             Data part of the message (0 - 8 bytes)
         :param float timestamp:
             Timestamp of the message, preferably as a Unix timestamp
+        :param bool remote:
+            True if the message is a remote frame
         """
+        if remote:
+            for callback in self.remote_subscribers.get(can_id, ()):
+                callback(can_id, data, timestamp)
+            return
         if can_id in self.subscribers:
             callbacks = self.subscribers[can_id]
             for callback in callbacks:
@@ -268,6 +359,18 @@ class Network(collections.MutableMapping):
         return len(self.nodes)
 
 
+def _is_od_path(object_dictionary):
+    return not (object_dictionary is None or
+                isinstance(object_dictionary, ObjectDictionary) or
+                hasattr(object_dictionary, "read"))
+
+
+def _import_od_job(job):
+    # Must be at module level to be usable from worker processes
+    source, node_id = job
+    return import_od(source, node_id)
+
+
 class PeriodicMessageTask(object):
     """
     Task object to transmit a message periodically using python-can's
@@ -328,11 +431,12 @@ class MessageListener(Listener):
         self.network = network
 
     def on_message_received(self, msg):
-        if msg.is_error_frame or msg.is_remote_frame:
+        if msg.is_error_frame:
             return
 
         try:
-            self.network.notify(msg.arbitration_id, msg.data, msg.timestamp)
+            self.network.notify(msg.arbitration_id, msg.data, msg.timestamp,
+                                msg.is_remote_frame)
         except Exception as e:
             # Exceptions in any callbaks should not affect CAN processing
             logger.error(str(e))
@@ -356,6 +460,9 @@ class NodeScanner(object):
 
     SERVICES = (0x700, 0x580, 0x180, 0x280, 0x380, 0x480, 0x80)
 
+    #: Number of bits in an SDO request including worst case bit stuffing
+    FRAME_BITS = 135
+
     def __init__(self, network=None):
         self.network = network
         #: A :class:`list` of nodes discovered
@@ -379,3 +486,169 @@ class NodeScanner(object):
         for node_id in range(1, limit + 1):
             self.network.send_message(0x600 + node_id, sdo_req)
 
+    def scan(self, limit=127, timeout=0.2, bitrate=125000, load=0.5,
+             device_type=False, quiet=0.05):
+        """Search for nodes and read their identity object (0x1018).
+
+        A request for the vendor ID is sent to every node ID, paced so that
+        the requests use at most a part of the bus capacity and leave room
+        for the responses. The rest of the identity object, and optionally
+        the device type (0x1000), is requested from a node as soon as it
+        responds. Entries a node does not support are set to ``None``.
+
+        The scan ends when all nodes have responded, when every node that
+        responded has been read and no response has arrived for ``quiet``
+        seconds, or at the latest ``timeout`` seconds after the last request.
+
+        :param int limit:
+            Highest node ID to probe.
+        :param float timeout:
+            Max time in seconds to wait for responses after the last request
+            has been sent.
+        :param int bitrate:
+            Bitrate of the bus in bit/s.
+        :param float load:
+            Part of the bus capacity to use for requests.
+        :param bool device_type:
+            Also read the device type.
+        :param float quiet:
+            Time in seconds without responses after which no more nodes are
+            expected to respond.
+
+        :return: Identity of each node which responded.
+        :rtype: dict[int, canopen.network.NodeIdentity]
+        """
+        if self.network is None:
+            raise RuntimeError("A Network is required to do active scanning")
+        entries = [(0x1018, 1), (0x1018, 2), (0x1018, 3), (0x1018, 4)]
+        if device_type:
+            entries.append((0x1000, 0))
+        scan = _IdentityScan(self.network, range(1, limit + 1), entries)
+        interval = self.FRAME_BITS / float(bitrate) / load
+        scan.start()
+        try:
+            due = clock()
+            for node_id in range(1, limit + 1):
+                delay = due - clock()
+                if delay > 0:
+                    time.sleep(delay)
+                scan.request(node_id)
+                due += interval
+            scan.wait(timeout, quiet)
+        finally:
+            scan.stop()
+        return scan.identities
+
+
+class NodeIdentity(object):
+    """Contents of the identity object of a node."""
+
+    def __init__(self, node_id):
+        #: Node ID
+        self.node_id = node_id
+        #: Vendor ID (0x1018:1)
+        self.vendor_id = None
+        #: Product code (0x1018:2)
+        self.product_code = None
+        #: Revision number (0x1018:3)
+        self.revision_number = None
+        #: Serial number (0x1018:4)
+        self.serial_number = None
+        #: Device type (0x1000), if requested
+        self.device_type = None
+
+    def __repr__(self):
+        return ("<NodeIdentity %d: vendor=%s, product=%s, revision=%s, "
+                "serial=%s>" % (self.node_id, self.vendor_id,
+                                self.product_code, self.revision_number,
+                                self.serial_number))
+
+
+_IDENTITY_ATTRIBUTES = {
+    (0x1018, 1): "vendor_id",
+    (0x1018, 2): "product_code",
+    (0x1018, 3): "revision_number",
+    (0x1018, 4): "serial_number",
+    (0x1000, 0): "device_type",
+}
+
+_SDO_UPLOAD_STRUCT = struct.Struct("<BHB4s")
+
+
+class _IdentityScan(object):
+    """Reads a list of entries from many nodes, one request outstanding per
+    node, driven by the responses.
+    """
+
+    def __init__(self, network, node_ids, entries):
+        self.network = network
+        self.node_ids = list(node_ids)
+        self.entries = entries
+        self.identities = {}
+        self._position = {}
+        self._remaining = len(self.node_ids)
+        # Nodes which have responded but not been read completely
+        self._reading = 0
+        self._last_response = None
+        self._condition = threading.Condition()
+
+    def start(self):
+        for node_id in self.node_ids:
+            self.network.subscribe(0x580 + node_id, self.on_response)
+
+    def stop(self):
+        for node_id in self.node_ids:
+            self.network.unsubscribe(0x580 + node_id, self.on_response)
+
+    def request(self, node_id, position=0):
+        self._position[node_id] = position
+        index, subindex = self.entries[position]
+        request = _SDO_UPLOAD_STRUCT.pack(0x40, index, subindex, b"\x00" * 4)
+        self.network.send_message(0x600 + node_id, request)
+
+    def on_response(self, can_id, data, timestamp):
+        node_id = can_id - 0x580
+        position = self._position.get(node_id)
+        if position is None or len(data) < 8:
+            return
+        command, index, subindex, value = _SDO_UPLOAD_STRUCT.unpack(bytes(data))
+        if (index, subindex) != self.entries[position]:
+            # Not a response to our request
+            return
+        identity = self.identities.get(node_id)
+        if identity is None:
+            identity = self.identities[node_id] = NodeIdentity(node_id)
+        if command & 0xE2 == 0x42:
+            # Expedited upload, with or without size indicated, all entries
+            # are UNSIGNED32
+            value, = struct.unpack("<L", value)
+            setattr(identity, _IDENTITY_ATTRIBUTES[index, subindex], value)
+        position += 1
+        if position < len(self.entries):
+            self.request(node_id, position)
+        else:
+            del self._position[node_id]
+        with self._condition:
+            self._last_response = clock()
+            if position == 1:
+                self._reading += 1
+            if position == len(self.entries):
+                self._reading -= 1
+                self._remaining -= 1
+            self._condition.notify_all()
+
+    def wait(self, timeout, quiet):
+        started = clock()
+        deadline = started + timeout
+        with self._condition:
+            while self._remaining > 0:
+                end = deadline
+                if self._reading == 0:
+                    # Not waiting for any node in particular
+                    last = max(started, self._last_response or started)
+                    end = min(end, last + quiet)
+                now = clock()
+                if now >= end:
+                    break
+                self._condition.wait(end - now)
+
@@ -1,9 +1,11 @@
 import threading
 import logging
+import math
 import struct
 import time
 
 from .network import CanError
+from .sdo import SdoAbortedError
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,8 @@ NMT_STATES = {
     127: 'PRE-OPERATIONAL'
 }
 
+NMT_STATE_CODES = dict((name, code) for code, name in NMT_STATES.items())
+
 NMT_COMMANDS = {
     'OPERATIONAL': 1,
     'STOPPED': 2,
@@ -118,6 +122,8 @@ class NmtMaster(NmtBase):
         with self.state_update:
             self.timestamp = timestamp
             new_state, = struct.unpack_from("B", data)
+            # Remove toggle bit of node guarding responses
+            new_state &= 0x7F
             logger.info("Received heartbeat can-id %d, state is %d", can_id, new_state)
             for callback in self._callbacks:
                 callback(new_state)
@@ -162,6 +168,114 @@ class NmtMaster(NmtBase):
             if self._state_received == 0:
                 break
 
+    def expect_heartbeats(self, node_ids, bootup=False, state=None):
+        """Start collecting heartbeats from several nodes.
+
+        Call this before the command which is expected to trigger the
+        messages (e.g. a reset), and then use
+        :meth:`~canopen.nmt.HeartbeatWaiter.wait` so that no message is missed.
+
+        :param node_ids:
+            Node IDs to wait for.
+        :param bool bootup:
+            Only accept boot-up messages.
+        :param str state:
+            Only accept heartbeats with this NMT state, e.g. 'OPERATIONAL'.
+
+        :rtype: canopen.nmt.HeartbeatWaiter
+        """
+        return HeartbeatWaiter(self.network, node_ids, bootup, state)
+
+    def transition(self, node_ids, target, timeout=10, broadcast=None):
+        """Change the state of several nodes and wait until their heartbeats
+        confirm the new state.
+
+        All nodes are waited for at the same time. Reset commands are
+        confirmed by the boot-up messages.
+
+        :param node_ids:
+            Node IDs to change the state of.
+        :param str target:
+            New state, see :attr:`state`.
+        :param float timeout:
+            Max time in seconds to wait for all nodes.
+        :param bool broadcast:
+            Send one command to all nodes instead of one command per node.
+            By default a broadcast is only used if the node IDs are exactly
+            the nodes added to the network.
+
+        :return: Node IDs which did not confirm the new state in time.
+        :rtype: set
+        """
+        if target not in NMT_COMMANDS:
+            raise ValueError("'%s' is an invalid state. Must be one of %s." %
+                             (target, ", ".join(NMT_COMMANDS)))
+        code = NMT_COMMANDS[target]
+        node_ids = set(node_ids)
+        if broadcast is None:
+            broadcast = (len(self.network) > 0 and
+                         set(self.network) == node_ids)
+        waiter = HeartbeatWaiter(self.network, node_ids,
+                                 state=NMT_STATES[COMMAND_TO_STATE[code]])
+        try:
+            if broadcast:
+                logger.info("Sending NMT command 0x%X to all nodes", code)
+                self.network.send_message(0, [code, 0])
+            else:
+                for node_id in sorted(node_ids):
+                    logger.info("Sending NMT command 0x%X to node %d",
+                                code, node_id)
+                    self.network.send_message(0, [code, node_id])
+            waiter.wait(timeout)
+        except NmtError:
+            pass
+        finally:
+            waiter.close()
+        return waiter.missing
+
+    def wait_for_heartbeats(self, node_ids, timeout=10):
+        """Wait until a heartbeat message is received from several nodes.
+
+        :param node_ids:
+            Node IDs to wait for.
+        :param float timeout:
+            Max time in seconds to wait for all nodes.
+
+        :return: Timestamps of the heartbeats as {node_id: timestamp}
+        :rtype: dict
+
+        :raises canopen.nmt.NmtError:
+            If not all nodes sent a heartbeat in time.
+        """
+        return self.expect_heartbeats(node_ids).wait(timeout)
+
+    def wait_for_bootups(self, node_ids, timeout=10):
+        """Wait until a boot-up message is received from several nodes.
+
+        :param node_ids:
+            Node IDs to wait for.
+        :param float timeout:
+            Max time in seconds to wait for all nodes.
+
+        :return: Timestamps of the boot-up messages as {node_id: timestamp}
+        :rtype: dict
+
+        :raises canopen.nmt.NmtError:
+            If not all nodes booted in time.
+        """
+        return self.expect_heartbeats(node_ids, bootup=True).wait(timeout)
+
+    def wait_for_bootups_async(self, node_ids, timeout=10, loop=None):
+        """Awaitable version of :meth:`wait_for_bootups` for :mod:`asyncio`.
+
+        :return:
+            A future resolving to the boot-up timestamps as
+            {node_id: timestamp}.
+        :rtype: asyncio.Future
+        """
+        waiter = self.expect_heartbeats(node_ids, bootup=True)
+        return waiter.as_future(timeout, loop)
+
     def add_hearbeat_callback(self, callback):
         """Add function to be called on heartbeat reception.
 
@@ -170,18 +284,30 @@ class NmtMaster(NmtBase):
         """
         self._callbacks.append(callback)
 
-    def start_node_guarding(self, period):
+    def start_node_guarding(self, period, life_time_factor=1):
         """Starts the node guarding mechanism.
 
+        The node is guarded by the network's
+        :class:`~canopen.nmt.NodeGuarding` master.
+
         :param float period:
             Period (in seconds) at which the node guarding should be advertised to the slave node.
+        :param int life_time_factor:
+            Number of periods without a response before the node is regarded
+            as lost.
+
+        :return: The object holding the status of the node.
+        :rtype: canopen.nmt.GuardedNode
         """
-        self._node_guarding_producer = self.network.send_periodic(0x700 + self.id, None, period, True)
+        self._node_guarding_producer = self.network.guarding.guard(
+            self.id, period, life_time_factor)
+        return self._node_guarding_producer
 
     def stop_node_guarding(self):
         """Stops the node guarding mechanism."""
         if self._node_guarding_producer is not None:
-            self._node_guarding_producer.stop()
+            self.network.guarding.unguard(self.id)
+            self._node_guarding_producer = None
 
 
 class NmtSlave(NmtBase):
@@ -194,6 +320,17 @@ class NmtSlave(NmtBase):
         self._send_task = None
         self._heartbeat_time_ms = 0
         self._local_node = local_node
+        self._toggle = 0
+        self._life_timer = None
+        self._life_lost = False
+        self._life_guarding_callbacks = []
+
+    def on_command(self, can_id, data, timestamp):
+        cmd, node_id = struct.unpack_from("BB", data)
+        if node_id in (self.id, 0):
+            logger.info("Node %d received command %d", self.id, cmd)
+            # Also updates the heartbeat
+            self.send_command(cmd)
 
     def send_command(self, code):
         """Send an NMT command code to the node.
@@ -205,6 +342,7 @@ class NmtSlave(NmtBase):
         super(NmtSlave, self).send_command(code)
 
         if self._state == 0:
+            self._toggle = 0
             logger.info("Sending boot-up message")
             self.network.send_message(0x700 + self.id, [0])
 
@@ -250,6 +388,526 @@ class NmtSlave(NmtBase):
         if self._send_task is not None:
             self._send_task.update([self._state])
 
+    def on_node_guarding_request(self, can_id, data, timestamp):
+        """Respond to a node guarding request from the master."""
+        self.network.send_message(0x700 + self.id, [self._state | self._toggle])
+        self._toggle ^= 0x80
+        # Life guarding starts with the first request
+        if self._life_timer is not None:
+            self._life_timer.cancel()
+            self._life_timer = None
+        life_time = self._get_life_time()
+        if life_time > 0:
+            self._life_timer = self.network.scheduler.call_later(
+                life_time, self._on_life_time_expired)
+        if self._life_lost:
+            self._life_lost = False
+            logger.info("Node guarding requests received again")
+            for callback in self._life_guarding_callbacks:
+                callback(True)
+
+    def add_life_guarding_callback(self, callback):
+        """Get notified when the master stops or resumes guarding the node.
+
+        :param callback:
+            Function that should accept a boolean which is ``False`` when no
+            node guarding request has been received within the node life time
+            (guard time 0x100C times life time factor 0x100D), and ``True``
+            when requests are received again.
+        """
+        self._life_guarding_callbacks.append(callback)
+
+    def stop_life_guarding(self):
+        """Stop supervising the node guarding requests."""
+        if self._life_timer is not None:
+            self._life_timer.cancel()
+            self._life_timer = None
+
+    def _get_life_time(self):
+        try:
+            guard_time_ms = self._local_node.sdo[0x100C].raw
+            life_time_factor = self._local_node.sdo[0x100D].raw
+        except (KeyError, SdoAbortedError):
+            # Life guarding not supported
+            return 0
+        return guard_time_ms * life_time_factor / 1000.0
+
+    def _on_life_time_expired(self):
+        self._life_timer = None
+        self._life_lost = True
+        logger.warning("Life guarding event, no node guarding request received")
+        # Life guard error, communication error
+        self._local_node.emcy.send(0x8130, 0x11)
+        for callback in self._life_guarding_callbacks:
+            callback(False)
+
+
+class HeartbeatWaiter(object):
+    """Collects heartbeat or boot-up messages from a set of nodes.
+
+    All nodes share the same event, which is set when the last expected
+    message has been received.
+
+    :param canopen.Network network:
+        The network to listen on.
+    :param node_ids:
+        Node IDs to wait for.
+    :param bool bootup:
+        Only accept boot-up messages.
+    :param str state:
+        Only accept heartbeats with this NMT state.
+    """
+
+    def __init__(self, network, node_ids, bootup=False, state=None):
+        self.network = network
+        self.node_ids = set(node_ids)
+        self.bootup = bootup
+        if bootup:
+            self._expected_state = 0
+        elif state is not None:
+            self._expected_state = NMT_STATE_CODES[state]
+        else:
+            self._expected_state = None
+        #: Timestamps of received messages as {node_id: timestamp}
+        self.timestamps = {}
+        #: Received NMT states as {node_id: state}
+        self.states = {}
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._on_done = None
+        if not self.node_ids:
+            self._event.set()
+        for node_id in self.node_ids:
+            network.subscribe(0x700 + node_id, self.on_heartbeat)
+
+    @property
+    def missing(self):
+        """Node IDs not heard from yet."""
+        return self.node_ids.difference(self.timestamps)
+
+    def on_heartbeat(self, can_id, data, timestamp):
+        node_id = can_id & 0x7F
+        state, = struct.unpack_from("B", data)
+        if self._expected_state is not None and state != self._expected_state:
+            return
+        with self._lock:
+            if node_id in self.timestamps:
+                return
+            self.timestamps[node_id] = timestamp
+            self.states[node_id] = state
+            if len(self.timestamps) < len(self.node_ids):
+                return
+            self._event.set()
+            on_done = self._on_done
+        if on_done is not None:
+            on_done()
+
+    def wait(self, timeout=10):
+        """Wait until a message is received from all nodes.
+
+        :param float timeout:
+            Max time in seconds to wait.
+
+        :return: Timestamps as {node_id: timestamp}
+        :rtype: dict
+
+        :raises canopen.nmt.NmtError:
+            If not all nodes responded in time.
+        """
+        try:
+            if not self._event.wait(timeout):
+                raise self._timeout_error()
+        finally:
+            self.close()
+        return dict(self.timestamps)
+
+    def as_future(self, timeout=10, loop=None):
+        """Wait using an :mod:`asyncio` future instead.
+
+        :param float timeout:
+            Max time in seconds to wait.
+        :param loop:
+            Event loop to use, defaults to the current event loop.
+
+        :return: A future resolving to the timestamps as {node_id: timestamp}
+        :rtype: asyncio.Future
+        """
+        import asyncio
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        def complete():
+            if not future.done():
+                future.set_result(dict(self.timestamps))
+
+        def expire():
+            if not future.done():
+                future.set_exception(self._timeout_error())
+
+        handle = loop.call_later(timeout, expire)
+        future.add_done_callback(lambda _: (handle.cancel(), self.close()))
+        with self._lock:
+            self._on_done = lambda: loop.call_soon_threadsafe(complete)
+            done = self._event.is_set()
+        if done:
+            complete()
+        return future
+
+    def close(self):
+        """Stop listening for messages."""
+        for node_id in self.node_ids:
+            try:
+                self.network.unsubscribe(0x700 + node_id, self.on_heartbeat)
+            except (KeyError, ValueError):
+                # Already unsubscribed
+                pass
+
+    def _timeout_error(self):
+        if self.bootup or self._expected_state == 0:
+            message = "boot-up"
+        elif self._expected_state is not None:
+            message = "%s heartbeat" % NMT_STATES[self._expected_state]
+        else:
+            message = "heartbeat"
+        return NmtError("No %s received from node(s) %s" % (
+            message, ", ".join(str(node_id) for node_id in sorted(self.missing))))
+
+
+class HeartbeatMonitor(object):
+    """Heartbeat consumer supervising many nodes at once.
+
+    Timeouts for all nodes are handled by the network's
+    :class:`~canopen.scheduler.Scheduler`, so the detection latency does not
+    depend on the number of nodes. Like the heartbeat consumer of CiA 301
+    (object 0x1016), supervision of a node starts when its first heartbeat is
+    received.
+
+    :param canopen.Network network:
+        The network to monitor.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        #: Supervised nodes as {node_id: :class:`HeartbeatConsumer`}
+        self.consumers = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def watch(self, node_id, period):
+        """Start supervising heartbeats from a node.
+
+        :param int node_id:
+            Node ID to supervise.
+        :param float period:
+            Heartbeat consumer time in seconds, i.e. the maximum time allowed
+            between two heartbeats before the node is regarded as lost.
+
+        :return: The object holding the status of the node.
+        :rtype: canopen.nmt.HeartbeatConsumer
+        """
+        with self._lock:
+            consumer = self.consumers.get(node_id)
+            if consumer is None:
+                consumer = HeartbeatConsumer(node_id, period)
+                self.consumers[node_id] = consumer
+            else:
+                consumer.period = period
+        self.network.subscribe(0x700 + node_id, self.on_heartbeat)
+        return consumer
+
+    def watch_consumer_entries(self, entries):
+        """Start supervising nodes given as heartbeat consumer time entries.
+
+        :param entries:
+            Iterable of 32-bit values as found in object 0x1016, with the
+            node ID in bits 16-23 and the time in ms in bits 0-15.
+            Entries with node ID or time set to 0 are ignored.
+        """
+        for entry in entries:
+            node_id = (entry >> 16) & 0xFF
+            time_ms = entry & 0xFFFF
+            if node_id and time_ms:
+                self.watch(node_id, time_ms / 1000.0)
+
+    def unwatch(self, node_id):
+        """Stop supervising a node.
+
+        :param int node_id:
+            Node ID to stop supervising.
+        """
+        with self._lock:
+            consumer = self.consumers.pop(node_id)
+            if consumer.timer is not None:
+                consumer.timer.cancel()
+        self.network.unsubscribe(0x700 + node_id, self.on_heartbeat)
+
+    def stop(self):
+        """Stop supervising all nodes."""
+        for node_id in list(self.consumers):
+            self.unwatch(node_id)
+
+    def add_callback(self, callback):
+        """Get notified when a node is lost or recovered.
+
+        :param callback:
+            Function that should accept a node ID and a boolean which is
+            ``False`` when the heartbeat has been lost and ``True`` when it is
+            received again.
+        """
+        self._callbacks.append(callback)
+
+    def on_heartbeat(self, can_id, data, timestamp):
+        node_id = can_id & 0x7F
+        with self._lock:
+            consumer = self.consumers.get(node_id)
+            if consumer is None:
+                return
+            state, = struct.unpack_from("B", data)
+            recovered = consumer.update(state, timestamp)
+            if consumer.timer is not None:
+                consumer.timer.cancel()
+            consumer.timer = self.network.scheduler.call_later(
+                consumer.period, self._on_timeout, consumer)
+        if recovered:
+            logger.info("Heartbeat from node %d recovered", node_id)
+            self._notify(node_id, True)
+
+    def _on_timeout(self, consumer):
+        with self._lock:
+            if self.consumers.get(consumer.node_id) is not consumer:
+                return
+            consumer.alive = False
+            consumer.losses += 1
+            consumer.timer = None
+        logger.warning("Heartbeat from node %d lost", consumer.node_id)
+        self._notify(consumer.node_id, False)
+
+    def _notify(self, node_id, alive):
+        for callback in self._callbacks:
+            callback(node_id, alive)
+
+
+class NodeGuarding(object):
+    """Node guarding master for many nodes at once.
+
+    Node guarding requests (remote frames) are sent to each guarded node
+    every guard time from the network's
+    :class:`~canopen.scheduler.Scheduler`. A node is regarded as lost when
+    it has not responded for its life time factor number of requests and the
+    toggle bit of every response is checked. Like the heartbeat consumer,
+    supervision of a node starts when its first response is received.
+
+    :param canopen.Network network:
+        The network to guard nodes on.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        #: Guarded nodes as {node_id: :class:`GuardedNode`}
+        self.nodes = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def guard(self, node_id, guard_time, life_time_factor=1):
+        """Start guarding a node.
+
+        :param int node_id:
+            Node ID to guard.
+        :param float guard_time:
+            Time in seconds between node guarding requests (0x100C).
+        :param int life_time_factor:
+            Number of guard times without a response before the node is
+            regarded as lost (0x100D).
+
+        :return: The object holding the status of the node.
+        :rtype: canopen.nmt.GuardedNode
+        """
+        node = GuardedNode(node_id, guard_time, life_time_factor)
+        with self._lock:
+            old_node = self.nodes.get(node_id)
+            if old_node is not None:
+                old_node.timer.cancel()
+            self.nodes[node_id] = node
+            self.network.subscribe(0x700 + node_id, self.on_response)
+            node.timer = self.network.scheduler.call_periodic(
+                guard_time, self._request, node)
+        return node
+
+    def unguard(self, node_id):
+        """Stop guarding a node.
+
+        :param int node_id:
+            Node ID to stop guarding.
+        """
+        with self._lock:
+            node = self.nodes.pop(node_id)
+            node.timer.cancel()
+        self.network.unsubscribe(0x700 + node_id, self.on_response)
+
+    def stop(self):
+        """Stop guarding all nodes."""
+        for node_id in list(self.nodes):
+            self.unguard(node_id)
+
+    def add_callback(self, callback):
+        """Get notified of node guarding events.
+
+        :param callback:
+            Function that should accept a node ID and one of the events
+            ``'LOST'``, ``'RECOVERED'`` or ``'TOGGLE ERROR'``.
+        """
+        self._callbacks.append(callback)
+
+    def _request(self, node):
+        event = None
+        with self._lock:
+            if self.nodes.get(node.node_id) is not node:
+                return
+            if node.pending:
+                node.missed += 1
+                if node.alive and node.missed >= node.life_time_factor:
+                    node.alive = False
+                    node.losses += 1
+                    event = "LOST"
+            node.pending = True
+        if event is not None:
+            logger.warning("Node guarding of node %d lost", node.node_id)
+            self._notify(node.node_id, event)
+        try:
+            self.network.send_message(0x700 + node.node_id, None, remote=True)
+        except CanError as e:
+            logger.error("Failed to send node guarding request: %s", e)
+
+    def on_response(self, can_id, data, timestamp):
+        if not data:
+            return
+        node_id = can_id & 0x7F
+        event = None
+        with self._lock:
+            node = self.nodes.get(node_id)
+            if node is None or not node.pending:
+                # Not requested, e.g. a heartbeat
+                return
+            node.pending = False
+            value, = struct.unpack_from("B", data)
+            toggle = value & 0x80
+            node.state = value & 0x7F
+            node.timestamp = timestamp
+            node.count += 1
+            if toggle == node.toggle:
+                node.toggle_errors += 1
+                event = "TOGGLE ERROR"
+            else:
+                node.missed = 0
+                if not node.alive:
+                    node.alive = True
+                    if node.losses:
+                        event = "RECOVERED"
+            node.toggle = toggle
+        if event is not None:
+            logger.info("Node guarding event for node %d: %s", node_id, event)
+            self._notify(node_id, event)
+
+    def _notify(self, node_id, event):
+        for callback in self._callbacks:
+            callback(node_id, event)
+
+
+class GuardedNode(object):
+    """Status of one node guarded by a :class:`~canopen.nmt.NodeGuarding`
+    master.
+    """
+
+    def __init__(self, node_id, guard_time, life_time_factor):
+        #: Node ID
+        self.node_id = node_id
+        #: Time in seconds between requests
+        self.guard_time = guard_time
+        #: Number of unanswered requests before the node is lost
+        self.life_time_factor = life_time_factor
+        #: ``True`` while the node responds in time
+        self.alive = False
+        #: Last received NMT state
+        self.state = None
+        #: Timestamp of last response
+        self.timestamp = None
+        #: Number of responses received
+        self.count = 0
+        #: Number of times the node has been lost
+        self.losses = 0
+        #: Number of responses with the wrong toggle bit
+        self.toggle_errors = 0
+        #: Number of unanswered requests in a row
+        self.missed = 0
+        self.pending = False
+        self.toggle = None
+        self.timer = None
+
+
+class HeartbeatConsumer(object):
+    """Status and statistics of one node supervised by a
+    :class:`~canopen.nmt.HeartbeatMonitor`.
+    """
+
+    def __init__(self, node_id, period):
+        #: Node ID
+        self.node_id = node_id
+        #: Heartbeat consumer time in seconds
+        self.period = period
+        #: ``True`` while heartbeats are received on time
+        self.alive = False
+        #: Last received NMT state
+        self.state = None
+        #: Timestamp of last heartbeat
+        self.timestamp = None
+        #: Number of heartbeats received
+        self.count = 0
+        #: Number of times the heartbeat has been lost
+        self.losses = 0
+        #: Shortest time between two heartbeats in seconds
+        self.min_interval = None
+        #: Longest time between two heartbeats in seconds
+        self.max_interval = None
+        #: Mean time between two heartbeats in seconds
+        self.mean_interval = None
+        self.timer = None
+        self._intervals = 0
+        self._sum_sq = 0.0
+
+    @property
+    def jitter(self):
+        """Standard deviation of the time between heartbeats in seconds."""
+        if self._intervals < 2:
+            return 0.0
+        return math.sqrt(self._sum_sq / (self._intervals - 1))
+
+    def update(self, state, timestamp):
+        """Register a received heartbeat.
+
+        :return: ``True`` if the node had been lost before.
+        :rtype: bool
+        """
+        if self.alive:
+            # Running mean and variance of intervals (Welford's algorithm)
+            interval = timestamp - self.timestamp
+            self._intervals += 1
+            if self._intervals == 1:
+                self.mean_interval = interval
+                self.min_interval = self.max_interval = interval
+            else:
+                delta = interval - self.mean_interval
+                self.mean_interval += delta / self._intervals
+                self._sum_sq += delta * (interval - self.mean_interval)
+                self.min_interval = min(self.min_interval, interval)
+                self.max_interval = max(self.max_interval, interval)
+        recovered = not self.alive and self.losses > 0
+        self.alive = True
+        self.state = state
+        self.timestamp = timestamp
+        self.count += 1
+        return recovered
+
 
 class NmtError(Exception):
     """Some NMT operation failed."""
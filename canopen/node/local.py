@@ -4,8 +4,10 @@ import struct
 from .base import BaseNode
 from ..sdo import SdoServer, SdoAbortedError
 from ..pdo import PDO, TPDO, RPDO
+from ..pdo.local import TpdoProducer, RpdoConsumer
 from ..nmt import NmtSlave
 from ..emcy import EmcyProducer
+from ..domain import DomainReader
 from .. import objectdictionary
 
 logger = logging.getLogger(__name__)
@@ -16,67 +18,215 @@ class LocalNode(BaseNode):
     def __init__(self, node_id, object_dictionary):
         super(LocalNode, self).__init__(node_id, object_dictionary)
 
+        #: Encoded data written by (index, subindex), other objects are
+        #: read from the values and defaults in the object dictionary
         self.data_store = {}
+        # Registered callbacks as (callback, index, subindex)
         self._read_callbacks = []
         self._write_callbacks = []
+        # Callbacks to call by (index, subindex), built on first access
+        self._read_routes = {}
+        self._write_routes = {}
+        # Object dictionary entries by (index, subindex)
+        self._objects = {}
+        # Domain providers by (index, subindex)
+        self._domains = {}
 
         self.sdo = SdoServer(0x600 + self.id, 0x580 + self.id, self)
+        #: All SDO server channels, starting with :attr:`sdo`
+        self.sdo_channels = [self.sdo]
+        for index in range(0x1201, 0x1280):
+            if index in self.object_dictionary:
+                self._add_sdo_channel_from_od(index)
         self.tpdo = TPDO(self)
         self.rpdo = RPDO(self)
         self.pdo = PDO(self, self.rpdo, self.tpdo)
+        #: Transmits the TPDOs when started
+        self.tpdo_producer = TpdoProducer(self)
+        self.add_write_callback(self.tpdo_producer.on_write)
+        #: Writes received RPDOs to the object dictionary when started
+        self.rpdo_consumer = RpdoConsumer(self)
         self.nmt = NmtSlave(self.id, self)
         # Let self.nmt handle writes for 0x1017
-        self.add_write_callback(self.nmt.on_write)
+        self.add_write_callback(self.nmt.on_write, 0x1017)
         self.emcy = EmcyProducer(0x80 + self.id)
 
     def associate_network(self, network):
         self.network = network
-        self.sdo.network = network
         self.tpdo.network = network
         self.rpdo.network = network
         self.nmt.network = network
         self.emcy.network = network
-        network.subscribe(self.sdo.rx_cobid, self.sdo.on_request)
+        for sdo in self.sdo_channels:
+            sdo.network = network
+            network.subscribe(sdo.rx_cobid, sdo.on_request)
         network.subscribe(0, self.nmt.on_command)
+        network.subscribe(0x700 + self.id, self.nmt.on_node_guarding_request,
+                          remote=True)
 
     def remove_network(self):
-        self.network.unsubscribe(self.sdo.rx_cobid, self.sdo.on_request)
+        self.nmt.stop_life_guarding()
+        self.tpdo_producer.stop()
+        self.rpdo_consumer.stop()
+        for sdo in self.sdo_channels:
+            self.network.unsubscribe(sdo.rx_cobid, sdo.on_request)
+            sdo.network = None
         self.network.unsubscribe(0, self.nmt.on_command)
+        self.network.unsubscribe(0x700 + self.id,
+                                 self.nmt.on_node_guarding_request, remote=True)
         self.network = None
-        self.sdo.network = None
         self.tpdo.network = None
         self.rpdo.network = None
         self.nmt.network = None
         self.emcy.network = None
 
-    def add_read_callback(self, callback):
-        self._read_callbacks.append(callback)
+    def add_sdo_channel(self, rx_cobid, tx_cobid):
+        """Add an SDO server channel.
 
-    def add_write_callback(self, callback):
-        self._write_callbacks.append(callback)
+        Each channel has its own transfer state, so transfers on different
+        channels do not disturb each other.
+
+        :param int rx_cobid:
+            COB-ID that the server receives on.
+        :param int tx_cobid:
+            COB-ID that the server responds with.
+
+        :return: The new SDO server.
+        :rtype: canopen.sdo.SdoServer
+        """
+        sdo = SdoServer(rx_cobid, tx_cobid, self)
+        self.sdo_channels.append(sdo)
+        if self.network is not None:
+            sdo.network = self.network
+            self.network.subscribe(rx_cobid, sdo.on_request)
+        return sdo
+
+    def _add_sdo_channel_from_od(self, index):
+        # Server SDO parameter, sub-index 1 and 2 are the COB-IDs
+        cob_ids = []
+        for subindex in (1, 2):
+            try:
+                obj = self._find_object(index, subindex)
+                cob_id = obj.decode_raw(self.get_data(index, subindex))
+            except SdoAbortedError:
+                return
+            if not cob_id or cob_id & (1 << 31):
+                # Not valid
+                return
+            cob_ids.append(cob_id & 0x7FF)
+        self.add_sdo_channel(*cob_ids)
+
+    def add_domain(self, domain, index, subindex=0):
+        """Provide the data of an object using a domain.
+
+        Reads and writes by SDO are done in chunks at an offset, so large
+        objects are never kept in memory as a whole. Read and write
+        callbacks are not used for the object.
+
+        :param canopen.domain.Domain domain:
+            The provider of the data, e.g. a
+            :class:`~canopen.domain.FileDomain`.
+        :param int index:
+            Index of the object.
+        :param int subindex:
+            Sub-index of the object.
+        """
+        self._find_object(index, subindex)
+        self._domains[(index, subindex)] = domain
+
+    def get_domain(self, index, subindex, check_writable=False):
+        """Get the domain providing the data of an object.
+
+        :return: The domain or None if the object has none.
+        :rtype: canopen.domain.Domain
+        """
+        domain = self._domains.get((index, subindex))
+        if domain is not None and check_writable:
+            if not self._find_object(index, subindex).writable:
+                raise SdoAbortedError(0x06010002)
+        return domain
+
+    def add_read_callback(self, callback, index=None, subindex=None):
+        """Add a callback for reads of the object dictionary.
+
+        The callback is called with the keyword arguments ``index``,
+        ``subindex`` and ``od``. If it returns something other than None,
+        that value is used instead of the stored data. A file like object
+        may be returned to upload large data by SDO in chunks.
+
+        :param callback:
+            Function to call.
+        :param int index:
+            Only call for this index, or for all objects if None.
+        :param int subindex:
+            Only call for this subindex of the index, or for all subindices
+            if None.
+        """
+        self._read_callbacks.append((callback, index, subindex))
+        self._read_routes.clear()
+
+    def add_write_callback(self, callback, index=None, subindex=None):
+        """Add a callback for writes to the object dictionary.
+
+        The callback is called with the keyword arguments ``index``,
+        ``subindex``, ``od`` and ``data``.
+
+        :param callback:
+            Function to call.
+        :param int index:
+            Only call for this index, or for all objects if None.
+        :param int subindex:
+            Only call for this subindex of the index, or for all subindices
+            if None.
+        """
+        self._write_callbacks.append((callback, index, subindex))
+        self._write_routes.clear()
 
     def get_data(self, index, subindex, check_readable=False):
+        data = self.get_data_source(index, subindex, check_readable)
+        if hasattr(data, "read"):
+            try:
+                return bytes(data.read())
+            finally:
+                data.close()
+        return data
+
+    def get_data_source(self, index, subindex, check_readable=False):
+        """Get the data of an object for streaming it.
+
+        Unlike :meth:`get_data`, a file like object provided by a domain
+        or a read callback is returned as is, so that it can be read in
+        chunks. The caller must close it.
+
+        :return: The encoded data or a file like object.
+        """
         obj = self._find_object(index, subindex)
 
         if check_readable and not obj.readable:
             raise SdoAbortedError(0x06010001)
 
+        domain = self._domains.get((index, subindex))
+        if domain is not None:
+            return DomainReader(domain)
+
         # Try callback
-        for callback in self._read_callbacks:
+        for callback in self._get_callbacks(
+                self._read_callbacks, self._read_routes, index, subindex):
             result = callback(index=index, subindex=subindex, od=obj)
             if result is not None:
+                if hasattr(result, "read"):
+                    # File like object
+                    return result
                 return obj.encode_raw(result)
 
         # Try stored data
         try:
-            return self.data_store[index][subindex]
+            return self.data_store[(index, subindex)]
         except KeyError:
-            # Try ParameterValue in EDS
-            if obj.value is not None:
-                return obj.encode_raw(obj.value)
-            # Try default value
-            if obj.default is not None:
-                return obj.encode_raw(obj.default)
+            # Try ParameterValue in EDS, or else the default value
+            default = obj.value if obj.value is not None else obj.default
+            if default is not None:
+                return obj.encode_raw(default)
 
         # Resource not available
         logger.info("Resource unavailable for 0x%X:%d", index, subindex)
@@ -88,15 +238,42 @@ class LocalNode(BaseNode):
         if check_writable and not obj.writable:
             raise SdoAbortedError(0x06010002)
 
+        domain = self._domains.get((index, subindex))
+        if domain is not None:
+            domain.begin_write(len(data))
+            try:
+                domain.write(0, bytes(data))
+                domain.end_write(len(data))
+            except Exception:
+                domain.abort_write()
+                raise
+            return
+
         # Try callbacks
-        for callback in self._write_callbacks:
+        for callback in self._get_callbacks(
+                self._write_callbacks, self._write_routes, index, subindex):
             callback(index=index, subindex=subindex, od=obj, data=data)
 
         # Store data
-        self.data_store.setdefault(index, {})
-        self.data_store[index][subindex] = bytes(data)
+        self.data_store[(index, subindex)] = bytes(data)
+
+    @staticmethod
+    def _get_callbacks(callbacks, routes, index, subindex):
+        key = (index, subindex)
+        try:
+            return routes[key]
+        except KeyError:
+            routes[key] = route = [
+                callback for callback, cb_index, cb_subindex in callbacks
+                if (cb_index is None or cb_index == index) and
+                (cb_subindex is None or cb_subindex == subindex)]
+            return route
 
     def _find_object(self, index, subindex):
+        try:
+            return self._objects[(index, subindex)]
+        except KeyError:
+            pass
         if index not in self.object_dictionary:
             # Index does not exist
             raise SdoAbortedError(0x06020000)
@@ -107,4 +284,5 @@ class LocalNode(BaseNode):
                 # Subindex does not exist
                 raise SdoAbortedError(0x06090011)
             obj = obj[subindex]
+        self._objects[(index, subindex)] = obj
         return obj
@@ -50,15 +50,16 @@ class RemoteNode(BaseNode):
         self.tpdo.network = network
         self.rpdo.network = network
         self.nmt.network = network
+        self.emcy.shared_log = network.emcy_log
         network.subscribe(self.sdo.tx_cobid, self.sdo.on_response)
         network.subscribe(0x700 + self.id, self.nmt.on_heartbeat)
-        network.subscribe(0x80 + self.id, self.emcy.on_emcy)
+        network.emcy.add_consumer(self.id, self.emcy)
         network.subscribe(0, self.nmt.on_command)
 
     def remove_network(self):
         self.network.unsubscribe(self.sdo.tx_cobid, self.sdo.on_response)
         self.network.unsubscribe(0x700 + self.id, self.nmt.on_heartbeat)
-        self.network.unsubscribe(0x80 + self.id, self.emcy.on_emcy)
+        self.network.emcy.remove_consumer(self.id)
         self.network.unsubscribe(0, self.nmt.on_command)
         self.network = None
         self.sdo.network = None
@@ -66,6 +67,7 @@ class RemoteNode(BaseNode):
         self.tpdo.network = None
         self.rpdo.network = None
         self.nmt.network = None
+        self.emcy.shared_log = None
 
     def store(self, subindex=1):
         """Store parameters in non-volatile memory.
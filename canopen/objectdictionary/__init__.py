@@ -42,24 +42,60 @@ def import_od(source, node_id=None):
         raise NotImplementedError("No support for this format")
 
 
+def export_dcf(od, dest, node_id=None):
+    """Write an Object Dictionary, including parameter values, as a DCF file.
+
+    :param canopen.ObjectDictionary od:
+        The Object Dictionary to export.
+    :param dest:
+        Path to the file to write or a file like object opened in text mode.
+    :param int node_id:
+        Node ID used to express values relative to the node ID as
+        ``$NODEID+<offset>``. Defaults to the node ID of the Object Dictionary.
+    """
+    from . import eds
+    if hasattr(dest, "write"):
+        eds.export_dcf(od, dest, node_id)
+    else:
+        with open(dest, "w") as fp:
+            eds.export_dcf(od, fp, node_id)
+
+
 class ObjectDictionary(collections.MutableMapping):
     """Representation of the object dictionary as a Python dictionary."""
 
     def __init__(self):
         self.indices = {}
         self.names = {}
+        # Unified lookup of names, indices, "Record.member" paths and
+        # (index, subindex) tuples
+        self._lookup = {}
+        # Cached sorted indices, invalidated when objects are added or removed
+        self._sorted_indices = None
         #: Default bitrate if specified by file
         self.bitrate = None
         #: Node ID if specified by file
         self.node_id = None
 
     def __getitem__(self, index):
-        """Get object from object dictionary by name or index."""
-        item = self.names.get(index) or self.indices.get(index)
-        if item is None:
+        """Get object from object dictionary by name or index.
+
+        Variables can also be looked up directly using a
+        ``"Record.member"`` path or an ``(index, subindex)`` tuple.
+        """
+        try:
+            return self._lookup[index]
+        except KeyError:
+            if isinstance(index, tuple):
+                obj = self.indices.get(index[0])
+                if isinstance(obj, (Record, Array)):
+                    try:
+                        # Let arrays generate undefined subindices
+                        return obj[index[1]]
+                    except KeyError:
+                        pass
             name = "0x%X" % index if isinstance(index, int) else index
-            raise KeyError("%s was not found in Object Dictionary" % name)
-        return item
+            raise KeyError("%s was not found in Object Dictionary" % (name, ))
 
     def __setitem__(self, index, obj):
         assert index == obj.index or index == obj.name
@@ -69,15 +105,25 @@ class ObjectDictionary(collections.MutableMapping):
         obj = self[index]
         del self.indices[obj.index]
         del self.names[obj.name]
+        del self._lookup[obj.index]
+        del self._lookup[obj.name]
+        if isinstance(obj, Variable):
+            del self._lookup[(obj.index, obj.subindex)]
+        else:
+            for var in obj.subindices.values():
+                self._remove_member(obj, var)
+        self._sorted_indices = None
 
     def __iter__(self):
-        return iter(sorted(self.indices))
+        if self._sorted_indices is None:
+            self._sorted_indices = sorted(self.indices)
+        return iter(self._sorted_indices)
 
     def __len__(self):
         return len(self.indices)
 
     def __contains__(self, index):
-        return index in self.names or index in self.indices
+        return index in self._lookup
 
     def add_object(self, obj):
         """Add object to the object dictionary.
@@ -91,6 +137,28 @@ class ObjectDictionary(collections.MutableMapping):
         obj.parent = self
         self.indices[obj.index] = obj
         self.names[obj.name] = obj
+        self._lookup[obj.index] = obj
+        self._lookup[obj.name] = obj
+        if isinstance(obj, Variable):
+            self._lookup[(obj.index, obj.subindex)] = obj
+        else:
+            for var in obj.subindices.values():
+                self._add_member(obj, var)
+        self._sorted_indices = None
+
+    def _add_member(self, obj, var):
+        """Make a member of a record or array available in the lookup."""
+        self._lookup[(obj.index, var.subindex)] = var
+        path = obj.name + "." + var.name
+        if path not in self.names:
+            self._lookup[path] = var
+
+    def _remove_member(self, obj, var):
+        """Remove a member of a record or array from the lookup."""
+        self._lookup.pop((obj.index, var.subindex), None)
+        path = obj.name + "." + var.name
+        if path not in self.names:
+            self._lookup.pop(path, None)
 
     def get_variable(self, index, subindex=0):
         """Get the variable object at specified index (and subindex if applicable).
@@ -98,6 +166,9 @@ class ObjectDictionary(collections.MutableMapping):
         :return: Variable if found, else `None`
         :rtype: canopen.objectdictionary.Variable
         """
+        var = self._lookup.get((index, subindex))
+        if var is not None:
+            return var
         obj = self.get(index)
         if isinstance(obj, Variable):
             return obj
@@ -137,6 +208,8 @@ class Record(collections.MutableMapping):
         var = self[subindex]
         del self.subindices[var.subindex]
         del self.names[var.name]
+        if isinstance(self.parent, ObjectDictionary):
+            self.parent._remove_member(self, var)
 
     def __len__(self):
         return len(self.subindices)
@@ -155,6 +228,8 @@ class Record(collections.MutableMapping):
         variable.parent = self
         self.subindices[variable.subindex] = variable
         self.names[variable.name] = variable
+        if isinstance(self.parent, ObjectDictionary):
+            self.parent._add_member(self, variable)
 
 
 class Array(collections.Mapping):
@@ -166,6 +241,9 @@ class Array(collections.Mapping):
 
     #: Description for the whole array
     description = ""
+    #: Number of sub-indices if the array was described using
+    #: ``CompactSubObj`` in an EDS file, otherwise ``None``
+    compact_sub_obj = None
 
     def __init__(self, name, index):
         #: The :class:`~canopen.ObjectDictionary` owning the record.
@@ -188,11 +266,11 @@ class Array(collections.Mapping):
             name = "%s_%x" % (template.name, subindex)
             var = Variable(name, self.index, subindex)
             var.parent = self
-            for attr in ("data_type", "unit", "factor", "min", "max", "default",
+            var.data_type = template.data_type
+            for attr in ("unit", "factor", "min", "max", "default",
                          "access_type", "description", "value_descriptions",
-                         "bit_definitions"):
-                if attr in template.__dict__:
-                    var.__dict__[attr] = template.__dict__[attr]
+                         "bit_definitions", "relative", "pdo_mappable"):
+                setattr(var, attr, getattr(template, attr))
         else:
             raise KeyError("Could not find subindex %r" % subindex)
         return var
@@ -211,6 +289,24 @@ class Array(collections.Mapping):
         variable.parent = self
         self.subindices[variable.subindex] = variable
         self.names[variable.name] = variable
+        if isinstance(self.parent, ObjectDictionary):
+            self.parent._add_member(self, variable)
+
+
+def _codec_attribute(name, doc):
+    """Attribute that the specialized codecs of a Variable depend on."""
+    key = "_" + name
+
+    def fget(self):
+        return self.__dict__[key]
+
+    def fset(self, value):
+        self.__dict__[key] = value
+        # Specialized codecs are bound again on first use
+        for codec in self.CODECS:
+            self.__dict__.pop(codec, None)
+
+    return property(fget, fset, doc=doc)
 
 
 class Variable(object):
@@ -243,20 +339,20 @@ class Variable(object):
         self.name = name
         #: Physical unit
         self.unit = ""
-        #: Factor between physical unit and integer value
         self.factor = 1
-        #: Minimum allowed value
         self.min = None
-        #: Maximum allowed value
         self.max = None
         #: Default value at start-up
         self.default = None
         #: The value of this variable stored in the object dictionary
         self.value = None
-        #: Data type according to the standard as an :class:`int`
         self.data_type = None
+        #: If the default and parameter values are relative to the node ID
+        self.relative = False
         #: Access type, should be "rw", "ro", "wo", or "const"
         self.access_type = "rw"
+        #: If the variable can be mapped to a PDO
+        self.pdo_mappable = False
         #: Description of variable
         self.description = ""
         #: Dictionary of value descriptions
@@ -264,10 +360,31 @@ class Variable(object):
         #: Dictionary of bitfield definitions
         self.bit_definitions = {}
 
+    #: Names of the encode and decode functions specialized for the data type
+    CODECS = ("decode_raw", "encode_raw", "decode_phys", "encode_phys",
+              "decode_phys_data", "encode_phys_data")
+
     def __eq__(self, other):
         return (self.index == other.index and
                 self.subindex == other.subindex)
 
+    def __getstate__(self):
+        # Specialized codecs are closures and are bound again when needed
+        state = self.__dict__.copy()
+        for name in self.CODECS:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    data_type = _codec_attribute(
+        "data_type", "Data type according to the standard as an :class:`int`")
+    factor = _codec_attribute(
+        "factor", "Factor between physical unit and integer value")
+    min = _codec_attribute("min", "Minimum allowed value")
+    max = _codec_attribute("max", "Maximum allowed value")
+
     def __len__(self):
         if self.data_type in self.STRUCT_TYPES:
             return self.STRUCT_TYPES[self.data_type].size * 8
@@ -298,64 +415,46 @@ class Variable(object):
         """
         self.bit_definitions[name] = bits
 
+    def _bind_codecs(self):
+        """Bind encode and decode functions specialized for the data type.
+
+        The functions are set as instance attributes, shadowing the methods
+        with the same names, so that each conversion only costs one call.
+        They only refer to the data type, limits and factor, not to the
+        variable itself, and are bound again if any of those change.
+        """
+        self.__dict__.update(_make_codecs(
+            self.data_type, self.min, self.max, self.factor))
+
     def decode_raw(self, data):
-        if self.data_type == VISIBLE_STRING:
-            return data.rstrip(b"\x00").decode("ascii", errors="ignore")
-        elif self.data_type == UNICODE_STRING:
-            # Is this correct?
-            return data.rstrip(b"\x00").decode("utf_16_le", errors="ignore")
-        elif self.data_type in self.STRUCT_TYPES:
-            try:
-                value, = self.STRUCT_TYPES[self.data_type].unpack(data)
-                return value
-            except struct.error:
-                raise ObjectDictionaryError(
-                    "Mismatch between expected and actual data size")
-        else:
-            # Just return the data as is
-            return data
+        """Decode bytes to a raw value."""
+        self._bind_codecs()
+        return self.decode_raw(data)
 
     def encode_raw(self, value):
-        if isinstance(value, (bytes, bytearray)):
-            return value
-        elif self.data_type == VISIBLE_STRING:
-            return value.encode("ascii")
-        elif self.data_type == UNICODE_STRING:
-            # Is this correct?
-            return value.encode("utf_16_le")
-        elif self.data_type in self.STRUCT_TYPES:
-            if self.data_type in INTEGER_TYPES:
-                value = int(value)
-            if self.data_type in NUMBER_TYPES:
-                if self.min is not None and value < self.min:
-                    logger.warning(
-                        "Value %d is less than min value %d", value, self.min)
-                if self.max is not None and value > self.max:
-                    logger.warning(
-                        "Value %d is greater than max value %d",
-                        value,
-                        self.max)
-            try:
-                return self.STRUCT_TYPES[self.data_type].pack(value)
-            except struct.error:
-                raise ValueError("Value does not fit in specified type")
-        elif self.data_type is None:
-            raise ObjectDictionaryError("Data type has not been specified")
-        else:
-            raise TypeError(
-                "Do not know how to encode %r to data type %Xh" % (
-                    value, self.data_type))
+        """Encode a raw value to bytes."""
+        self._bind_codecs()
+        return self.encode_raw(value)
 
     def decode_phys(self, value):
-        if self.data_type in INTEGER_TYPES:
-            value *= self.factor
-        return value
+        """Scale a raw value to a physical value."""
+        self._bind_codecs()
+        return self.decode_phys(value)
 
     def encode_phys(self, value):
-        if self.data_type in INTEGER_TYPES:
-            value /= self.factor
-            value = int(round(value))
-        return value
+        """Scale a physical value to a raw value."""
+        self._bind_codecs()
+        return self.encode_phys(value)
+
+    def decode_phys_data(self, data):
+        """Decode bytes directly to a physical value."""
+        self._bind_codecs()
+        return self.decode_phys_data(data)
+
+    def encode_phys_data(self, value):
+        """Encode a physical value directly to bytes."""
+        self._bind_codecs()
+        return self.encode_phys_data(value)
 
     def decode_desc(self, value):
         if not self.value_descriptions:
@@ -401,5 +500,119 @@ class Variable(object):
         return temp
 
 
+def _identity(value):
+    return value
+
+
+def _make_codecs(data_type, min_value, max_value, factor):
+    """Create encode and decode functions for a data type.
+
+    :return: Dictionary with the functions named as in Variable.CODECS
+    """
+    codec = Variable.STRUCT_TYPES.get(data_type)
+    if codec is None:
+        # Strings, domains etc. are neither scaled nor checked for limits
+        def decode_raw(data):
+            return _decode_other(data_type, data)
+
+        def encode_raw(value):
+            return _encode_other(data_type, value)
+
+        return {"decode_raw": decode_raw, "encode_raw": encode_raw,
+                "decode_phys": _identity, "encode_phys": _identity,
+                "decode_phys_data": decode_raw, "encode_phys_data": encode_raw}
+
+    unpack = codec.unpack
+    pack = codec.pack
+
+    def decode_raw(data):
+        try:
+            return unpack(data)[0]
+        except struct.error:
+            raise ObjectDictionaryError(
+                "Mismatch between expected and actual data size")
+
+    if data_type in NUMBER_TYPES:
+        to_number = int if data_type in INTEGER_TYPES else _identity
+
+        def encode_raw(value):
+            if isinstance(value, (bytes, bytearray)):
+                return value
+            value = to_number(value)
+            if min_value is not None and value < min_value:
+                logger.warning(
+                    "Value %d is less than min value %d", value, min_value)
+            if max_value is not None and value > max_value:
+                logger.warning(
+                    "Value %d is greater than max value %d",
+                    value,
+                    max_value)
+            try:
+                return pack(value)
+            except struct.error:
+                raise ValueError("Value does not fit in specified type")
+    else:
+        def encode_raw(value):
+            if isinstance(value, (bytes, bytearray)):
+                return value
+            try:
+                return pack(value)
+            except struct.error:
+                raise ValueError("Value does not fit in specified type")
+
+    if data_type not in INTEGER_TYPES:
+        return {"decode_raw": decode_raw, "encode_raw": encode_raw,
+                "decode_phys": _identity, "encode_phys": _identity,
+                "decode_phys_data": decode_raw, "encode_phys_data": encode_raw}
+
+    def decode_phys(value):
+        return value * factor
+
+    def encode_phys(value):
+        return int(round(value / factor))
+
+    def decode_phys_data(data):
+        try:
+            return unpack(data)[0] * factor
+        except struct.error:
+            raise ObjectDictionaryError(
+                "Mismatch between expected and actual data size")
+
+    def encode_phys_data(value):
+        return encode_raw(int(round(value / factor)))
+
+    return {"decode_raw": decode_raw, "encode_raw": encode_raw,
+            "decode_phys": decode_phys, "encode_phys": encode_phys,
+            "decode_phys_data": decode_phys_data,
+            "encode_phys_data": encode_phys_data}
+
+
+def _decode_other(data_type, data):
+    if data_type == VISIBLE_STRING:
+        return data.rstrip(b"\x00").decode("ascii", errors="ignore")
+    elif data_type == UNICODE_STRING:
+        # Is this correct?
+        return data.rstrip(b"\x00").decode("utf_16_le", errors="ignore")
+    else:
+        # Just return the data as is
+        return data
+
+
+def _encode_other(data_type, value):
+    if isinstance(value, (bytes, bytearray)):
+        return value
+    elif data_type == VISIBLE_STRING:
+        return value.encode("ascii")
+    elif data_type == UNICODE_STRING:
+        # Is this correct?
+        return value.encode("utf_16_le")
+    elif data_type is None:
+        raise ObjectDictionaryError("Data type has not been specified")
+    else:
+        raise TypeError(
+            "Do not know how to encode %r to data type %Xh" % (
+                value, data_type))
+
+
 class ObjectDictionaryError(Exception):
     """Unsupported operation with the current Object Dictionary."""
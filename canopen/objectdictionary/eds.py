@@ -3,6 +3,7 @@ import io
 import logging
 import copy
 import re
+import binascii
 
 try:
     from configparser import RawConfigParser, NoOptionError
@@ -61,6 +62,7 @@ def import_eds(source, node_id):
                 last_subindex.data_type = objectdictionary.UNSIGNED8
                 arr.add_member(last_subindex)
                 arr.add_member(build_variable(eds, section, node_id, index, 1))
+                arr.compact_sub_obj = int(eds.get(section, "CompactSubObj"), 0)
                 od.add_object(arr)
             elif object_type == ARR:
                 arr = objectdictionary.Array(name, index)
@@ -122,7 +124,13 @@ def import_from_node(node_id, network):
 
 
 def _convert_variable(node_id, var_type, value):
-    if var_type in objectdictionary.DATA_TYPES:
+    if var_type in (objectdictionary.OCTET_STRING, objectdictionary.DOMAIN):
+        try:
+            return bytes(bytearray.fromhex(value))
+        except ValueError:
+            # Not hex encoded, keep the text as is
+            return value
+    elif var_type in objectdictionary.DATA_TYPES:
         return value
     elif var_type in objectdictionary.FLOAT_TYPES:
         return float(value)
@@ -146,6 +154,11 @@ def build_variable(eds, section, node_id, index, subindex=0):
     var = objectdictionary.Variable(name, index, subindex)
     var.data_type = int(eds.get(section, "DataType"), 0)
     var.access_type = eds.get(section, "AccessType").lower()
+    if eds.has_option(section, "PDOMapping"):
+        try:
+            var.pdo_mappable = bool(int(eds.get(section, "PDOMapping"), 0))
+        except ValueError:
+            pass
     if var.data_type > 0x1B:
         # The object dictionary editor from CANFestival creates an optional object if min max values are used
         # This optional object is then placed in the eds under the section [A0] (start point, iterates for more)
@@ -164,13 +177,19 @@ def build_variable(eds, section, node_id, index, subindex=0):
         except ValueError:
             pass
     if eds.has_option(section, "DefaultValue"):
+        default = eds.get(section, "DefaultValue")
+        if '$NODEID' in default:
+            var.relative = True
         try:
-            var.default = _convert_variable(node_id, var.data_type, eds.get(section, "DefaultValue"))
+            var.default = _convert_variable(node_id, var.data_type, default)
         except ValueError:
             pass
     if eds.has_option(section, "ParameterValue"):
+        value = eds.get(section, "ParameterValue")
+        if '$NODEID' in value:
+            var.relative = True
         try:
-            var.value = _convert_variable(node_id, var.data_type, eds.get(section, "ParameterValue"))
+            var.value = _convert_variable(node_id, var.data_type, value)
         except ValueError:
             pass
     return var
@@ -183,3 +202,136 @@ def copy_variable(eds, section, subindex, src_var):
     var.name = name
     var.subindex = subindex
     return var
+
+
+def export_dcf(od, fp, node_id=None):
+    """Write the Object Dictionary as a DCF to a file like object.
+
+    Sections are written directly in the order expected by
+    :func:`import_eds`, so the result can be imported again.
+
+    :param canopen.ObjectDictionary od: Object Dictionary to export
+    :param fp: File like object opened in text mode
+    :param int node_id:
+        Node ID used for values relative to the node ID (default
+        ``od.node_id``)
+    """
+    if node_id is None:
+        node_id = od.node_id
+    write = fp.write
+
+    if od.node_id is not None and od.bitrate:
+        write("[DeviceComissioning]\n")
+        write("NodeID=%d\n" % od.node_id)
+        write("Baudrate=%d\n\n" % (od.bitrate // 1000))
+
+    mandatory = []
+    optional = []
+    manufacturer = []
+    for index in od:
+        if index in (0x1000, 0x1001, 0x1018):
+            mandatory.append(index)
+        elif 0x2000 <= index < 0x6000:
+            manufacturer.append(index)
+        else:
+            optional.append(index)
+    for section, indices in (("MandatoryObjects", mandatory),
+                             ("OptionalObjects", optional),
+                             ("ManufacturerObjects", manufacturer)):
+        write("[%s]\nSupportedObjects=%d\n" % (section, len(indices)))
+        for i, index in enumerate(indices, 1):
+            write("%d=0x%04X\n" % (i, index))
+        write("\n")
+
+    for index in od:
+        obj = od[index]
+        if isinstance(obj, objectdictionary.Variable):
+            # DS306 uses ObjectType DOMAIN for objects with DOMAIN data
+            object_type = (DOMAIN if obj.data_type == objectdictionary.DOMAIN
+                           else VAR)
+            _write_variable(write, "%04X" % index, obj, node_id, object_type)
+            continue
+        if isinstance(obj, objectdictionary.Array) and _is_compact(obj):
+            _write_compact_array(write, obj, node_id)
+            continue
+        object_type = ARR if isinstance(obj, objectdictionary.Array) else RECORD
+        write("[%04X]\n" % index)
+        write("ParameterName=%s\n" % obj.name)
+        write("ObjectType=0x%X\n" % object_type)
+        write("SubNumber=%d\n\n" % len(obj.subindices))
+        for subindex in sorted(obj.subindices):
+            _write_variable(write, "%04Xsub%X" % (index, subindex),
+                            obj.subindices[subindex], node_id)
+
+
+def _is_compact(arr):
+    # Only arrays imported from a CompactSubObj description with all entries
+    # from 1 and up can be described the same way again
+    if arr.compact_sub_obj is None or 1 not in arr.subindices:
+        return False
+    subindices = [subindex for subindex in sorted(arr.subindices) if subindex]
+    return subindices == list(range(1, len(subindices) + 1))
+
+
+def _write_compact_array(write, arr, node_id):
+    entries = [arr.subindices[subindex] for subindex in sorted(arr.subindices)
+               if subindex > 0]
+    # The section describes the first entry, which gets the name of the array
+    write("[%04X]\n" % arr.index)
+    write("ParameterName=%s\n" % arr.name)
+    write("ObjectType=0x%X\n" % ARR)
+    write("CompactSubObj=%d\n" % arr.compact_sub_obj)
+    write("\n".join(_variable_lines(entries[0], node_id)))
+    write("\n\n")
+    if any(var.name != arr.name for var in entries):
+        write("[%04XName]\n" % arr.index)
+        write("NrOfEntries=%d\n" % len(entries))
+        for var in entries:
+            write("%d=%s\n" % (var.subindex, var.name))
+        write("\n")
+
+
+def _write_variable(write, section, var, node_id, object_type=VAR):
+    lines = ["[%s]" % section,
+             "ParameterName=%s" % var.name,
+             "ObjectType=0x%X" % object_type]
+    lines.extend(_variable_lines(var, node_id))
+    lines.append("\n")
+    write("\n".join(lines))
+
+
+def _variable_lines(var, node_id):
+    lines = []
+    if var.data_type is not None:
+        lines.append("DataType=0x%04X" % var.data_type)
+    lines.append("AccessType=%s" % var.access_type)
+    if var.min is not None:
+        lines.append("LowLimit=%s" % _format_value(var, var.min, None))
+    if var.max is not None:
+        lines.append("HighLimit=%s" % _format_value(var, var.max, None))
+    if var.default is not None:
+        lines.append("DefaultValue=%s" % _format_value(var, var.default, node_id))
+    if var.value is not None:
+        lines.append("ParameterValue=%s" % _format_value(var, var.value, node_id))
+    lines.append("PDOMapping=%d" % var.pdo_mappable)
+    return lines
+
+
+def _format_value(var, value, node_id):
+    if var.data_type in (objectdictionary.OCTET_STRING,
+                         objectdictionary.DOMAIN):
+        if not isinstance(value, (bytes, bytearray)):
+            value = value.encode("latin-1")
+        return binascii.hexlify(value).decode("ascii").upper()
+    elif var.data_type in objectdictionary.DATA_TYPES:
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("latin-1")
+        return value
+    elif var.data_type in objectdictionary.FLOAT_TYPES:
+        return repr(float(value))
+    value = int(value)
+    if var.relative and node_id is not None and value >= node_id:
+        return "$NODEID+0x%X" % (value - node_id)
+    elif value < 0:
+        return "-0x%X" % -value
+    return "0x%X" % value
@@ -2,6 +2,8 @@ try:
     import xml.etree.cElementTree as etree
 except ImportError:
     import xml.etree.ElementTree as etree
+from xml.parsers import expat
+import io
 import logging
 from canopen import objectdictionary
 
@@ -21,17 +23,26 @@ DATA_TYPES = {
 }
 
 
-def import_epf(epf):
+def import_epf(epf, lazy=False):
     """Import an EPF file.
 
     :param epf:
         Either a path to an EPF-file, a file-like object, or an instance of
         :class:`xml.etree.ElementTree.Element`.
+    :param bool lazy:
+        Only record where the groups are in the file in a first pass, and
+        build the objects from the file when they are first accessed.
+        Useful for large files where only a few objects are needed. A
+        file-like object must stay open and is read into memory if it is
+        not seekable. Ignored if an element is given.
 
     :returns:
         The Object Dictionary.
     :rtype: canopen.ObjectDictionary
     """
+    if lazy and not etree.iselement(epf):
+        return _import_epf_lazy(epf)
+
     od = objectdictionary.ObjectDictionary()
     if etree.iselement(epf):
         tree = epf
@@ -41,46 +52,178 @@ def import_epf(epf):
     # Find and set default bitrate
     can_config = tree.find("Configuration/CANopen")
     if can_config is not None:
-        bitrate = can_config.get("BitRate", "250")
-        bitrate = bitrate.replace("U", "")
-        od.bitrate = int(bitrate) * 1000
+        od.bitrate = _get_bitrate(can_config)
 
     # Parse Object Dictionary
     for group_tree in tree.iterfind("Dictionary/Parameters/Group"):
-        name = group_tree.get("SymbolName")
-        parameters = group_tree.findall("Parameter")
-        index = int(parameters[0].get("Index"), 0)
-
-        if len(parameters) == 1:
-            # Simple variable
-            var = build_variable(parameters[0])
-            # Use top level index name instead
-            var.name = name
-            od.add_object(var)
-        elif len(parameters) == 2 and parameters[1].get("ObjectType") == "ARRAY":
-            # Array
-            arr = objectdictionary.Array(name, index)
-            for par_tree in parameters:
-                var = build_variable(par_tree)
-                arr.add_member(var)
-            description = group_tree.find("Description")
-            if description is not None:
-                arr.description = description.text
-            od.add_object(arr)
-        else:
-            # Complex record
-            record = objectdictionary.Record(name, index)
-            for par_tree in parameters:
-                var = build_variable(par_tree)
-                record.add_member(var)
-            description = group_tree.find("Description")
-            if description is not None:
-                record.description = description.text
-            od.add_object(record)
+        od.add_object(build_object(group_tree))
 
     return od
 
 
+def _import_epf_lazy(epf):
+    if not hasattr(epf, "read"):
+        # Path to file, opened again for each object built
+        source = epf
+        fp = open(epf, "rb")
+    elif hasattr(epf, "seekable") and epf.seekable():
+        source = fp = epf
+    else:
+        # The positions can not be read again from a stream
+        source = fp = io.BytesIO(epf.read())
+    od = LazyObjectDictionary(source)
+    parser = expat.ParserCreate()
+    tags = []
+    group = []
+
+    def start_element(tag, attrs):
+        tags.append(tag)
+        path = tags[1:]
+        if path == ["Configuration", "CANopen"]:
+            od.bitrate = _get_bitrate(attrs)
+        elif path == ["Dictionary", "Parameters", "Group"]:
+            # Name, index and start position
+            group[:] = [attrs.get("SymbolName"), None, parser.CurrentByteIndex]
+        elif path == ["Dictionary", "Parameters", "Group", "Parameter"]:
+            if group[1] is None:
+                group[1] = int(attrs["Index"], 0)
+
+    def end_element(tag):
+        if tags[1:] == ["Dictionary", "Parameters", "Group"] and group[1] is not None:
+            name, index, start = group
+            # Position of the end tag
+            od.add_pending(index, name, start, parser.CurrentByteIndex)
+        tags.pop()
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    od._offset = fp.tell()
+    try:
+        parser.ParseFile(fp)
+    finally:
+        if fp is not source:
+            fp.close()
+    return od
+
+
+def _get_bitrate(can_config):
+    bitrate = can_config.get("BitRate", "250")
+    bitrate = bitrate.replace("U", "")
+    return int(bitrate) * 1000
+
+
+class LazyObjectDictionary(objectdictionary.ObjectDictionary):
+    """Object Dictionary where objects are built from the groups of an EPF
+    file when they are first accessed.
+
+    Only the positions of the groups in the file are kept, and each group
+    is read and parsed again from the file when it is needed.
+
+    :param source:
+        Path to the EPF file or a seekable file-like object.
+    """
+
+    def __init__(self, source):
+        super(LazyObjectDictionary, self).__init__()
+        #: Groups not built yet as {index: (name, start, end)}
+        self.pending = {}
+        self._pending_names = {}
+        self._source = source
+        # Position of the start of the file in a file-like object
+        self._offset = 0
+
+    def add_pending(self, index, name, start, end):
+        """Register a group to be built on first access.
+
+        :param int index: Index of the object
+        :param str name: Name of the object
+        :param int start: Byte position of the ``Group`` start tag
+        :param int end: Byte position of the ``Group`` end tag
+        """
+        self.pending[index] = (name, start, end)
+        self._pending_names[name] = index
+
+    def _read_group(self, start, end):
+        if hasattr(self._source, "read"):
+            self._source.seek(self._offset + start)
+            data = self._source.read(end - start)
+        else:
+            with open(self._source, "rb") as fp:
+                fp.seek(start)
+                data = fp.read(end - start)
+        return etree.fromstring(data + b"</Group>")
+
+    def _materialize(self, key):
+        if isinstance(key, tuple):
+            key = key[0]
+        if key in self._pending_names:
+            key = self._pending_names[key]
+        elif key not in self.pending and isinstance(key, str):
+            # Possibly a "Record.member" path
+            pos = key.find(".")
+            while pos != -1:
+                if key[:pos] in self._pending_names:
+                    key = self._pending_names[key[:pos]]
+                    break
+                pos = key.find(".", pos + 1)
+        if key in self.pending:
+            name, start, end = self.pending.pop(key)
+            del self._pending_names[name]
+            self.add_object(build_object(self._read_group(start, end)))
+
+    def __getitem__(self, index):
+        if self.pending:
+            self._materialize(index)
+        return super(LazyObjectDictionary, self).__getitem__(index)
+
+    def __iter__(self):
+        return iter(sorted(set(self.indices) | set(self.pending)))
+
+    def __len__(self):
+        return len(self.indices) + len(self.pending)
+
+    def __contains__(self, index):
+        if index in self.pending or index in self._pending_names:
+            # Known without building the object
+            return True
+        if self.pending:
+            self._materialize(index)
+        return super(LazyObjectDictionary, self).__contains__(index)
+
+    def add_object(self, obj):
+        if obj.index in self.pending:
+            name = self.pending.pop(obj.index)[0]
+            del self._pending_names[name]
+        super(LazyObjectDictionary, self).add_object(obj)
+
+
+def build_object(group_tree):
+    """Build a variable, array or record from a ``Group`` element."""
+    name = group_tree.get("SymbolName")
+    parameters = group_tree.findall("Parameter")
+    index = int(parameters[0].get("Index"), 0)
+
+    if len(parameters) == 1:
+        # Simple variable
+        var = build_variable(parameters[0])
+        # Use top level index name instead
+        var.name = name
+        return var
+    elif len(parameters) == 2 and parameters[1].get("ObjectType") == "ARRAY":
+        # Array
+        obj = objectdictionary.Array(name, index)
+    else:
+        # Complex record
+        obj = objectdictionary.Record(name, index)
+    for par_tree in parameters:
+        var = build_variable(par_tree)
+        obj.add_member(var)
+    description = group_tree.find("Description")
+    if description is not None:
+        obj.description = description.text
+    return obj
+
+
 def build_variable(par_tree):
     index = int(par_tree.get("Index"), 0)
     subindex = int(par_tree.get("SubIndex"))
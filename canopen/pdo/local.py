@@ -0,0 +1,272 @@
+import logging
+import threading
+
+from ..scheduler import clock
+from ..sdo import SdoAbortedError
+
+logger = logging.getLogger(__name__)
+
+
+class TpdoProducer(object):
+    """Transmits the TPDOs of a :class:`~canopen.LocalNode`.
+
+    Enabled maps are transmitted according to their transmission type:
+
+    - 0: On the next SYNC after a mapped object has been written
+    - 1-240: On every n'th SYNC
+    - 254, 255: When a mapped object is written, but not more often than the
+      inhibit time allows, and when the event timer expires
+
+    The data of a map is updated as soon as a mapped object is written.
+    Timers run on the scheduler of the network, which is shared by all
+    nodes on it.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self._lock = threading.Lock()
+        self._states = []
+        # States of maps and mapped variables by (index, subindex)
+        self._mapped = {}
+        self._sync_states = []
+        self._running = False
+
+    def start(self):
+        """Start transmitting the enabled TPDOs.
+
+        The current configuration of :attr:`canopen.LocalNode.tpdo` is
+        used, so change it or call :meth:`canopen.pdo.PdoBase.read` before
+        starting.
+        """
+        self.stop()
+        network = self.node.network
+        with self._lock:
+            for pdo_map in self.node.tpdo.map.values():
+                if not pdo_map.enabled or pdo_map.cob_id is None:
+                    continue
+                state = _TpdoState(pdo_map)
+                for var in pdo_map.map:
+                    if not var.length:
+                        # Dummy entry
+                        continue
+                    try:
+                        var.set_data(self.node.get_data(var.index, var.subindex))
+                    except SdoAbortedError:
+                        logger.info("No data for %s in %s", var.name, pdo_map.name)
+                    self._mapped.setdefault(
+                        (var.index, var.subindex), []).append((state, var))
+                self._states.append(state)
+                if state.trans_type <= 240:
+                    self._sync_states.append(state)
+                elif state.event_timer:
+                    state.timer = network.scheduler.call_later(
+                        state.event_timer, self._on_event_timer, state)
+            self._running = True
+        if self._sync_states:
+            network.subscribe(0x80, self.on_sync)
+
+    def stop(self):
+        """Stop transmitting TPDOs."""
+        with self._lock:
+            self._running = False
+            for state in self._states:
+                state.cancel()
+            sync_states = self._sync_states
+            self._states = []
+            self._mapped = {}
+            self._sync_states = []
+        if sync_states:
+            self.node.network.unsubscribe(0x80, self.on_sync)
+
+    def on_write(self, index, subindex, od, data, **kwargs):
+        entries = self._mapped.get((index, subindex))
+        if not entries:
+            return
+        with self._lock:
+            for state, var in entries:
+                var.set_data(data)
+                state.changed = True
+                if state.trans_type >= 254:
+                    self._trigger(state)
+
+    def on_sync(self, can_id, data, timestamp):
+        with self._lock:
+            for state in self._sync_states:
+                if not state.started:
+                    # Wait for the SYNC counter to reach the start value
+                    if not data or data[0] != state.sync_start_value:
+                        continue
+                    state.started = True
+                if state.trans_type == 0:
+                    if state.changed:
+                        self._transmit(state)
+                    continue
+                state.sync_count += 1
+                if state.sync_count >= state.trans_type:
+                    state.sync_count = 0
+                    self._transmit(state)
+
+    def _trigger(self, state):
+        due = state.last + state.inhibit_time
+        if clock() >= due:
+            self._transmit(state)
+        elif state.pending is None:
+            state.pending = self.node.network.scheduler.call_at(
+                due, self._on_inhibit_end, state)
+
+    def _transmit(self, state):
+        state.last = clock()
+        state.changed = False
+        self.node.network.send_message(state.map.cob_id, state.map.data)
+        if state.event_timer:
+            # The event timer restarts with each transmission
+            if state.timer is not None:
+                state.timer.cancel()
+            state.timer = self.node.network.scheduler.call_later(
+                state.event_timer, self._on_event_timer, state)
+
+    def _on_inhibit_end(self, state):
+        with self._lock:
+            if self._running:
+                state.pending = None
+                self._transmit(state)
+
+    def _on_event_timer(self, state):
+        with self._lock:
+            if self._running:
+                state.timer = None
+                self._trigger(state)
+
+
+class _TpdoState(object):
+    """Transmission state of one TPDO map."""
+
+    def __init__(self, pdo_map):
+        self.map = pdo_map
+        self.trans_type = pdo_map.trans_type
+        if self.trans_type is None:
+            self.trans_type = 255
+        # Inhibit time is given in multiples of 100 us and event timer in ms
+        self.inhibit_time = (pdo_map.inhibit_time or 0) * 0.0001
+        self.event_timer = (pdo_map.event_timer or 0) * 0.001
+        self.sync_start_value = pdo_map.sync_start_value
+        self.started = not self.sync_start_value
+        self.sync_count = 0
+        self.changed = False
+        self.last = float("-inf")
+        self.timer = None
+        self.pending = None
+
+    def cancel(self):
+        for timer in (self.timer, self.pending):
+            if timer is not None:
+                timer.cancel()
+        self.timer = None
+        self.pending = None
+
+
+class RpdoConsumer(object):
+    """Writes the data of RPDOs received by a :class:`~canopen.LocalNode` to
+    its object dictionary.
+
+    Only entries which have changed are written, so write callbacks are only
+    called for new values. Data of synchronous RPDOs (transmission types
+    0-240) is written when the next SYNC is received.
+
+    The position of every mapped entry is worked out once when starting.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self._lock = threading.Lock()
+        # Layouts by COB-ID
+        self._layouts = {}
+        # Received data of synchronous RPDOs by COB-ID
+        self._pending = {}
+        self._sync = False
+
+    def start(self):
+        """Start writing received RPDOs to the object dictionary.
+
+        The current configuration of :attr:`canopen.LocalNode.rpdo` is
+        used, so change it or call :meth:`canopen.pdo.PdoBase.read` before
+        starting.
+        """
+        self.stop()
+        network = self.node.network
+        for pdo_map in self.node.rpdo.map.values():
+            if not pdo_map.enabled or pdo_map.cob_id is None:
+                continue
+            layout = _RpdoLayout(pdo_map)
+            self._layouts[pdo_map.cob_id] = layout
+            network.subscribe(pdo_map.cob_id, self.on_message)
+            if layout.synchronous:
+                self._sync = True
+        if self._sync:
+            network.subscribe(0x80, self.on_sync)
+
+    def stop(self):
+        """Stop writing received RPDOs."""
+        network = self.node.network
+        for cob_id in self._layouts:
+            network.unsubscribe(cob_id, self.on_message)
+        if self._sync:
+            network.unsubscribe(0x80, self.on_sync)
+        self._layouts = {}
+        self._pending = {}
+        self._sync = False
+
+    def on_message(self, can_id, data, timestamp):
+        layout = self._layouts.get(can_id)
+        if layout is None:
+            return
+        if len(data) < layout.size:
+            logger.warning("Received %d bytes in 0x%X, expected %d",
+                           len(data), can_id, layout.size)
+            return
+        if layout.synchronous:
+            with self._lock:
+                self._pending[can_id] = data
+        else:
+            self._apply(layout, data)
+
+    def on_sync(self, can_id, data, timestamp):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+        for cob_id, rpdo_data in pending.items():
+            layout = self._layouts.get(cob_id)
+            if layout is not None:
+                self._apply(layout, rpdo_data)
+
+    def _apply(self, layout, data):
+        data_store = self.node.data_store
+        for key, start, end, var in layout.entries:
+            if start is None:
+                # Not byte aligned
+                var.pdo_parent.data = bytearray(data)
+                value = bytes(var.get_data())
+            else:
+                value = bytes(data[start:end])
+            if data_store.get(key) != value:
+                self.node.set_data(key[0], key[1], value)
+
+
+class _RpdoLayout(object):
+    """Positions of the entries mapped in one RPDO."""
+
+    def __init__(self, pdo_map):
+        self.synchronous = (pdo_map.trans_type is not None and
+                            pdo_map.trans_type <= 240)
+        self.entries = []
+        self.size = (pdo_map.length + 7) // 8
+        for var in pdo_map.map:
+            if not var.length:
+                # Dummy entry
+                continue
+            key = (var.index, var.subindex)
+            if var.offset % 8 or var.length % 8:
+                self.entries.append((key, None, None, var))
+            else:
+                start = var.offset // 8
+                self.entries.append((key, start, start + var.length // 8, var))
@@ -1,9 +1,16 @@
 # inspired by the NmtMaster code
+import collections
 import logging
+import threading
 import time
 from ..node import RemoteNode
 from ..sdo import SdoCommunicationError
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,6 +54,9 @@ class State402(object):
         'QUICK STOP ACTIVE'     : [0x6F, 0x07]
     }
 
+    # Statusword bits which determine the state
+    SW_STATE_BITS = 0x6F
+
     # Transition path to enable the DS402 node
     NEXTSTATE2ENABLE = {
         ('START')                                                   : 'NOT READY TO SWITCH ON',
@@ -152,6 +162,9 @@ class OperationMode(object):
         'OPEN LOOP VECTOR MODE'       : 0x20000
     }
 
+    #: Target velocity, position and torque, cleared before changing mode
+    TARGETS = (0x60FF, 0x607A, 0x6071)
+
 
 class Homing(object):
 
@@ -188,6 +201,40 @@ class Homing(object):
     'ERROR VELOCITY IS ZERO'       : [0x3400, 0x2400]
     }
 
+    # Statusword bits which determine the homing status
+    STATUS_BITS = 0x3400
+    STATUS_SHIFT = 10
+
+    #: Homing states in which the homing procedure has ended
+    END_STATES = ('TARGET REACHED', 'ATTAINED', 'INTERRUPTED',
+                  'ERROR VELOCITY IS NOT ZERO', 'ERROR VELOCITY IS ZERO')
+
+
+def _build_lookup_table(states, bits, shift=0, default=None):
+    """Map every combination of the relevant Statusword bits to a state.
+
+    :param dict states: {state: [bitmask, value]}
+    :param int bits: All bits used by the bitmasks
+    :param int shift: Number of irrelevant low bits
+    :return: Table indexed by ``(statusword & bits) >> shift``
+    :rtype: tuple
+    """
+    table = [default] * ((bits >> shift) + 1)
+    for statusword in range(0, bits + 1, 1 << shift):
+        if statusword & ~bits:
+            # Index never used
+            continue
+        for key, (mask, value) in states.items():
+            if statusword & mask == value:
+                table[statusword >> shift] = key
+    return tuple(table)
+
+
+State402.STATE_TABLE = _build_lookup_table(
+    State402.SW_MASK, State402.SW_STATE_BITS, default='UNKNOWN')
+Homing.STATUS_TABLE = _build_lookup_table(
+    Homing.STATES, Homing.STATUS_BITS, Homing.STATUS_SHIFT)
+
 
 class BaseNode402(RemoteNode):
     """A CANopen CiA 402 profile slave node.
@@ -209,6 +256,13 @@ class BaseNode402(RemoteNode):
         self.tpdo_values = {}
         #! list of mapped objects configured in the RPDOs in a dictionary {object (hex, pointer (RPDO object) }
         self.rpdo_pointers = {}
+        #: Condition notified when a new Statusword is received by TPDO
+        self.state_update = threading.Condition()
+        self._statusword = None
+        self._state = None
+        self._state_listeners = []
+        self._op_mode_code = None
+        self._op_mode_support = None
 
     def setup_402_state_machine(self):
         """Configured the state machine by searching for the PDO that has the
@@ -252,12 +306,9 @@ class BaseNode402(RemoteNode):
         if self.state == 'FAULT':
             # particular case, it resets the Fault Reset bit (rising edge 0 -> 1)
             self.controlword = State402.CW_DISABLE_VOLTAGE
-            timeout = time.time() + 0.4  # 400 milliseconds
-            # Check if the Fault Reset bit is still = 1
-            while self.statusword & State402.SW_MASK['FAULT'][0] == State402.SW_MASK['FAULT'][1]:
-                if time.time() > timeout:
-                    break
-                time.sleep(0.01)  # 10 milliseconds
+            # Wait up to 400 milliseconds for the Fault Reset bit to be cleared
+            mask, value = State402.SW_MASK['FAULT']
+            self.wait_for_statusword(lambda sw: sw & mask != value, 0.4)
             self.state = 'OPERATION ENABLED'
         else:
             logger.info('The node its not at fault. Doing nothing!')
@@ -276,22 +327,15 @@ class BaseNode402(RemoteNode):
         self.op_mode = 'HOMING'
         # The homing process will initialize at operation enabled
         self.state = 'OPERATION ENABLED'
-        homingstatus = 'IN PROGRESS'
         self.controlword = State402.CW_OPERATION_ENABLED | Homing.CW_START
-        t = time.time() + timeout
         try:
-            while homingstatus not in ('TARGET REACHED', 'ATTAINED'):
-                for key, value in Homing.STATES.items():
-                    # check if the value after applying the bitmask (value[0])
-                    # corresponds with the value[1] to determine the current status
-                    bitmaskvalue = self.statusword & value[0]
-                    if bitmaskvalue == value[1]:
-                        homingstatus = key
-                if homingstatus in ('INTERRUPTED', 'ERROR VELOCITY IS NOT ZERO', 'ERROR VELOCITY IS ZERO'):
-                    raise  RuntimeError ('Unable to home. Reason: {0}'.format(homingstatus))
-                time.sleep(0.001)
-                if time.time() > t:
-                    raise RuntimeError('Unable to home, timeout reached')
+            # Woken up by each new Statusword until homing has ended
+            if not self.wait_for_statusword(
+                    lambda sw: self._homing_status(sw) in Homing.END_STATES, timeout):
+                raise RuntimeError('Unable to home, timeout reached')
+            homingstatus = self._homing_status(self.statusword)
+            if homingstatus not in ('TARGET REACHED', 'ATTAINED'):
+                raise RuntimeError('Unable to home. Reason: {0}'.format(homingstatus))
             if set_new_home:
                 offset = self.sdo[0x6063].raw
                 self.sdo[0x607C].raw = offset
@@ -307,10 +351,15 @@ class BaseNode402(RemoteNode):
     @property
     def op_mode(self):
         """
-        :return: Return the operation mode stored in the object 0x6061 through SDO
-        :rtype: int
+        :return: Return the operation mode stored in the object 0x6061,
+            by TPDO if mapped or else through SDO
+        :rtype: str
         """
-        return OperationMode.CODE2NAME[self.sdo[0x6061].raw]
+        code = self._op_mode_code
+        if code is None:
+            # Not received by TPDO
+            code = self.sdo[0x6061].raw
+        return OperationMode.CODE2NAME[code]
 
     @op_mode.setter
     def op_mode(self, mode):
@@ -333,6 +382,10 @@ class BaseNode402(RemoteNode):
         - 'OPEN LOOP VECTOR MODE'
 
         """
+        code = OperationMode.NAME2CODE[mode]
+        if self._op_mode_code == code:
+            # Already reported by TPDO
+            return
         try:
             logger.info('Changing Operation Mode to {0}'.format(mode))
             state = self.state
@@ -341,19 +394,12 @@ class BaseNode402(RemoteNode):
             if not self.is_op_mode_supported(mode):
                 raise TypeError('Operation mode not suppported by the node.')
 
-            if self.state == 'OPERATION ENABLED':
+            if state == 'OPERATION ENABLED':
                 self.state = 'SWITCHED ON'
-                # to make sure the node does not move with a old value in another mode
-                # we clean all the target values for the modes
-                self.sdo[0x60FF].raw = 0.0  # target velocity
-                self.sdo[0x607A].raw = 0.0  # target position
-                self.sdo[0x6071].raw = 0.0  # target torque
-            # set the operation mode in an agnostic way, accessing the SDO object by ID
-            self.sdo[0x6060].raw = OperationMode.NAME2CODE[mode]
-            t = time.time() + 0.5  # timeout
-            while self.op_mode != mode:
-                if time.time() > t:
-                    raise RuntimeError('Timeout setting the new mode of operation at node {0}.'.format(self.id))
+                self._clear_targets()
+            self._send_op_mode(code)
+            if not self._wait_for_op_mode(code, 0.5):
+                raise RuntimeError('Timeout setting the new mode of operation at node {0}.'.format(self.id))
             result = True
         except SdoCommunicationError as e:
             logger.warning('[SDO communication error] Cause: {0}'.format(str(e)))
@@ -370,16 +416,111 @@ class BaseNode402(RemoteNode):
         :return: If the operation mode is supported
         :rtype: bool
         """
-        mode_support = (self.sdo[0x6502].raw & OperationMode.SUPPORTED[mode])
+        if self._op_mode_support is None:
+            # The supported modes do not change, so read them only once
+            self._op_mode_support = self.sdo[0x6502].raw
+        mode_support = (self._op_mode_support & OperationMode.SUPPORTED[mode])
         return mode_support == OperationMode.SUPPORTED[mode]
 
+    def _clear_targets(self):
+        """Clear the target values of all modes, so that the node does not
+        move with an old value in another mode.
+        """
+        pdo_maps = []
+        for index in OperationMode.TARGETS:
+            if index in self.rpdo_pointers:
+                var = self.rpdo_pointers[index]
+                var.raw = 0
+                if var.pdo_parent not in pdo_maps:
+                    pdo_maps.append(var.pdo_parent)
+            elif index in self.object_dictionary:
+                self.sdo[index].raw = 0
+        for pdo_map in pdo_maps:
+            pdo_map.transmit()
+
+    def _send_op_mode(self, code):
+        """Write the modes of operation (0x6060) using PDO or SDO."""
+        if 0x6060 in self.rpdo_pointers:
+            self.rpdo_pointers[0x6060].raw = code
+            self.rpdo_pointers[0x6060].pdo_parent.transmit()
+        else:
+            self.sdo[0x6060].raw = code
+
+    def _wait_for_op_mode(self, code, timeout):
+        """Wait until the node reports a mode of operation.
+
+        :return: True if the mode was reported in time
+        :rtype: bool
+        """
+        deadline = time.time() + timeout
+        if 0x6061 in self.tpdo_values:
+            # Woken up by each new mode received by TPDO
+            with self.state_update:
+                while self._op_mode_code != code:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.state_update.wait(remaining)
+            return True
+        while self.sdo[0x6061].raw != code:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
     def on_TPDOs_update_callback(self, mapobject):
         """This function receives a map object.
         this map object is then used for changing the
         :param mapobject: :class: `canopen.objectdictionary.Variable`
         """
         for obj in mapobject:
-            self.tpdo_values[obj.index] = obj.raw
+            value = obj.raw
+            self.tpdo_values[obj.index] = value
+            if obj.index == 0x6041:
+                if value != self._statusword:
+                    self._on_statusword_change(value)
+            elif obj.index == 0x6061 and value != self._op_mode_code:
+                self._on_op_mode_change(value)
+
+    def _on_statusword_change(self, statusword):
+        with self.state_update:
+            self._statusword = statusword
+            self._state = self._decode_state(statusword)
+            self.state_update.notify_all()
+        for listener in self._state_listeners:
+            listener()
+
+    def _on_op_mode_change(self, code):
+        with self.state_update:
+            self._op_mode_code = code
+            self.state_update.notify_all()
+        for listener in self._state_listeners:
+            listener()
+
+    def wait_for_statusword(self, predicate, timeout):
+        """Wait until the Statusword received by TPDO fulfills a condition.
+
+        The condition is checked each time a new Statusword is received.
+
+        :param predicate:
+            Function taking the Statusword and returning True when done.
+        :param float timeout:
+            Max time to wait in seconds.
+        :return: True if the condition was fulfilled in time
+        :rtype: bool
+        """
+        deadline = time.time() + timeout
+        with self.state_update:
+            while not predicate(self.statusword):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.state_update.wait(remaining)
+        return True
+
+    @staticmethod
+    def _homing_status(statusword):
+        return Homing.STATUS_TABLE[(statusword & Homing.STATUS_BITS) >> Homing.STATUS_SHIFT]
 
     @property
     def statusword(self):
@@ -431,13 +572,11 @@ class BaseNode402(RemoteNode):
         - 'QUICK STOP ACTIVE'
 
         """
-        for key, value in State402.SW_MASK.items():
-            # check if the value after applying the bitmask (value[0])
-            # corresponds with the value[1] to determine the current status
-            bitmaskvalue = self.statusword & value[0]
-            if bitmaskvalue == value[1]:
-                return key
-        return 'UNKNOWN'
+        state = self._state
+        if state is None:
+            # No Statusword received by TPDO yet
+            return self._decode_state(self.statusword)
+        return state
 
     @state.setter
     def state(self, new_state):
@@ -447,27 +586,318 @@ class BaseNode402(RemoteNode):
         :raise RuntimeError: Occurs when the time defined to change the state is reached
         :raise TypeError: Occurs when trying to execute a ilegal transition in the sate machine
         """
-        t_to_new_state = time.time() + 8  # 800 milliseconds tiemout
+        t_to_new_state = time.time() + 8  # 8 seconds timeout
         while self.state != new_state:
-            try:
-                if new_state == 'OPERATION ENABLED':
-                    next_state = State402.next_state_for_enabling(self.state)
-                else:
-                    next_state = new_state
-                # get the code from the transition table
-                code = State402.TRANSITIONTABLE[ (self.state, next_state) ]
-                # set the control word
-                self.controlword = code
-                # timeout of 400 milliseconds to try set the next state
-                t_to_next_state = time.time() + 0.4
-                while self.state != next_state:
-                    if time.time() > t_to_next_state:
-                        break
-                    time.sleep(0.01)  # 10 milliseconds of sleep
-            except KeyError:
-                raise ValueError('Illegal transition from {f} to {t}'.format(f=self.state, t=new_state))
+            next_state = self._send_transition(new_state)
+            # timeout of 400 milliseconds to try set the next state, woken
+            # up as soon as the Statusword changes
+            self.wait_for_statusword(
+                lambda sw: self._decode_state(sw) == next_state,
+                min(0.4, max(t_to_new_state - time.time(), 0)))
             # check the timeout
             if time.time() > t_to_new_state:
                 raise RuntimeError('Timeout when trying to change state')
-            time.sleep(0.01)  # 10 miliseconds of sleep
 
+    def _send_transition(self, new_state):
+        """Send the Controlword for the next transition towards a state.
+
+        :return: The state expected after the transition
+        :rtype: str
+        """
+        state = self.state
+        if new_state == 'OPERATION ENABLED':
+            next_state = State402.next_state_for_enabling(state)
+        else:
+            next_state = new_state
+        try:
+            # get the code from the transition table
+            code = State402.TRANSITIONTABLE[(state, next_state)]
+        except KeyError:
+            raise ValueError('Illegal transition from {f} to {t}'.format(f=state, t=new_state))
+        # set the control word
+        self.controlword = code
+        return next_state
+
+    @staticmethod
+    def _decode_state(statusword):
+        return State402.STATE_TABLE[statusword & State402.SW_STATE_BITS]
+
+
+def enable_all(nodes, timeout=8):
+    """Bring many nodes to 'OPERATION ENABLED' in parallel.
+
+    Each node is sent the Controlword for its next transition as soon as a
+    TPDO shows that its previous transition has completed, so the nodes do
+    not wait for each other. All nodes are handled from the calling thread.
+
+    :param nodes:
+        :class:`BaseNode402` objects which have been set up with
+        :meth:`~BaseNode402.setup_402_state_machine`.
+    :param float timeout:
+        Max time in seconds for all nodes to be enabled.
+    :raise RuntimeError: If not all nodes were enabled in time
+    :raise ValueError: If a node is in a state from which it can not be enabled
+    """
+    nodes = list(nodes)
+    changed = threading.Event()
+    remaining = list(nodes)
+    # Expected state and when to send the Controlword again for each node
+    steps = {}
+    for node in nodes:
+        node._state_listeners.append(changed.set)
+    deadline = time.time() + timeout
+    try:
+        while True:
+            # Cleared before reading the states so that no change is missed
+            changed.clear()
+            now = time.time()
+            for node in list(remaining):
+                state = node.state
+                if state == 'OPERATION ENABLED':
+                    remaining.remove(node)
+                    steps.pop(node, None)
+                    continue
+                step = steps.get(node)
+                if step is None or step[0] == state or now > step[1]:
+                    # Previous transition completed or timed out
+                    next_state = node._send_transition('OPERATION ENABLED')
+                    steps[node] = (next_state, now + 0.4)
+            if not remaining:
+                break
+            if now > deadline:
+                raise RuntimeError('Timeout when enabling node(s) {0}'.format(
+                    ', '.join(str(node.id) for node in remaining)))
+            retry = min(steps[node][1] for node in remaining)
+            changed.wait(max(min(retry, deadline) - now, 0))
+    finally:
+        for node in nodes:
+            node._state_listeners.remove(changed.set)
+
+
+def set_op_mode_all(nodes, mode, timeout=0.5):
+    """Change the operation mode of many nodes in parallel.
+
+    The new mode is sent to all nodes before waiting for any confirmation,
+    so the nodes do not wait for each other. Nodes which are
+    'OPERATION ENABLED' are switched on during the change and enabled
+    again afterwards.
+
+    :param nodes:
+        :class:`BaseNode402` objects.
+    :param str mode:
+        Operation mode, see :attr:`BaseNode402.op_mode`.
+    :param float timeout:
+        Max time in seconds for all nodes to report the new mode.
+    :raise RuntimeError: If not all nodes changed mode in time
+    :raise TypeError: If a node does not support the mode
+    """
+    code = OperationMode.NAME2CODE[mode]
+    nodes = [node for node in nodes if node._op_mode_code != code]
+    for node in nodes:
+        if not node.is_op_mode_supported(mode):
+            raise TypeError('Operation mode not supported by node {0}'.format(node.id))
+    enabled = [node for node in nodes if node.state == 'OPERATION ENABLED']
+    for node in enabled:
+        node._send_transition('SWITCHED ON')
+    deadline = time.time() + timeout
+    for node in enabled:
+        if not node.wait_for_statusword(
+                lambda sw: node._decode_state(sw) == 'SWITCHED ON',
+                max(deadline - time.time(), 0)):
+            raise RuntimeError('Timeout when switching on node {0}'.format(node.id))
+        node._clear_targets()
+    for node in nodes:
+        node._send_op_mode(code)
+    deadline = time.time() + timeout
+    missing = [node for node in nodes
+               if not node._wait_for_op_mode(code, max(deadline - time.time(), 0))]
+    if missing:
+        raise RuntimeError('Timeout setting the mode of operation of node(s) {0}'.format(
+            ', '.join(str(node.id) for node in missing)))
+    if enabled:
+        enable_all(enabled)
+
+
+class AxisGroup(object):
+    """Streams setpoints to several axes in a cyclic synchronous mode.
+
+    On every SYNC the next setpoint of each axis is taken from a trajectory
+    buffer, packed into the RPDOs and all RPDOs are sent in one batch. The
+    actual values received by TPDO are compared with the setpoints to give
+    the following error of each axis.
+
+    The group either follows the SYNCs of another producer on the bus, or
+    sends the SYNCs itself, see :meth:`start`.
+
+    :param nodes:
+        :class:`BaseNode402` objects set up with
+        :meth:`~BaseNode402.setup_402_state_machine`, with the target mapped
+        in an RPDO.
+    :param int target_index:
+        Object receiving the setpoints, by default the target position
+        (0x607A).
+    :param int actual_index:
+        Object with the actual value, by default the position actual value
+        (0x6064).
+    :param float period:
+        SYNC period in seconds, used to detect missed cycles and to send
+        the SYNCs if the group produces them.
+    :param int latency:
+        Number of SYNCs between sending a setpoint and receiving the actual
+        value it resulted in, at least 1.
+    """
+
+    def __init__(self, nodes, target_index=0x607A, actual_index=0x6064,
+                 period=None, latency=2):
+        if latency < 1:
+            raise ValueError('Latency must be at least one SYNC')
+        self.nodes = list(nodes)
+        self.network = self.nodes[0].network
+        self.actual_index = actual_index
+        self.period = period
+        self._targets = []
+        self._maps = []
+        for node in self.nodes:
+            try:
+                var = node.rpdo_pointers[target_index]
+            except KeyError:
+                raise ValueError('Object 0x{0:04X} is not mapped in an RPDO of node {1}'.format(
+                    target_index, node.id))
+            if var.offset % 8 or var.length % 8:
+                # Not byte aligned, let the variable do the packing
+                self._targets.append((var, None, None))
+            else:
+                start = var.offset // 8
+                self._targets.append((var, start, start + var.length // 8))
+            if var.pdo_parent not in self._maps:
+                self._maps.append(var.pdo_parent)
+        self._buffer = collections.deque()
+        self._sent = collections.deque(maxlen=latency)
+        self._drained = threading.Event()
+        self._drained.set()
+        self._last_sync = None
+        self._timer = None
+        #: Number of SYNCs setpoints have been sent for
+        self.cycles = 0
+        #: Number of SYNC periods missed, judged from the time between SYNCs
+        self.missed_cycles = 0
+        #: Latest following error (setpoint - actual value) of each axis
+        self.following_error = [None] * len(self.nodes)
+        #: Largest absolute following error of each axis
+        self.max_following_error = [0] * len(self.nodes)
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def load(self, trajectory):
+        """Append setpoints to the trajectory buffer.
+
+        Setpoints can be added while the group is running.
+
+        :param trajectory:
+            One sequence of raw setpoints per axis, e.g. a list of NumPy
+            arrays or a 2D array with one row per axis. All sequences must
+            have the same length.
+        """
+        if len(trajectory) != len(self.nodes):
+            raise ValueError('Expected setpoints for {0} axes'.format(len(self.nodes)))
+        if numpy is not None:
+            try:
+                array = numpy.asarray(trajectory)
+            except ValueError:
+                array = None
+            if array is None or array.ndim != 2:
+                raise ValueError('All axes must have the same number of setpoints')
+            # One row of Python numbers per SYNC
+            rows = array.T.tolist()
+        else:
+            if len(set(len(setpoints) for setpoints in trajectory)) > 1:
+                raise ValueError('All axes must have the same number of setpoints')
+            rows = list(zip(*trajectory))
+        if rows:
+            self._drained.clear()
+            self._buffer.extend(rows)
+
+    def clear(self):
+        """Discard the setpoints not sent yet."""
+        self._buffer.clear()
+        self._drained.set()
+
+    def start(self, produce_sync=False):
+        """Start sending setpoints on each SYNC.
+
+        A network does not receive the messages it sends itself, so if this
+        network is the SYNC producer, the group must send the SYNCs instead
+        of :attr:`~canopen.Network.sync`. It then sends a SYNC every period
+        from the :attr:`~canopen.Network.scheduler`, directly followed by
+        the setpoints for the next one.
+
+        :param bool produce_sync:
+            Send the SYNCs from the group instead of following the SYNCs
+            received from another producer. Requires a period.
+        """
+        if produce_sync:
+            if not self.period:
+                raise ValueError('A period is needed to produce SYNCs')
+            self._timer = self.network.scheduler.call_periodic(
+                self.period, self._produce_sync)
+        else:
+            self.network.subscribe(0x80, self.on_sync)
+
+    def stop(self):
+        """Stop sending setpoints."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        else:
+            self.network.unsubscribe(0x80, self.on_sync)
+
+    def wait(self, timeout=None):
+        """Wait until all setpoints in the buffer have been sent.
+
+        :param float timeout: Max time to wait in seconds.
+        :return: True if the buffer was emptied in time
+        :rtype: bool
+        """
+        return self._drained.wait(timeout)
+
+    def _produce_sync(self):
+        self.network.sync.transmit()
+        self.on_sync(self.network.sync.cob_id, b'', time.time())
+
+    def on_sync(self, can_id, data, timestamp):
+        if self.period and self._last_sync is not None:
+            missed = int(round((timestamp - self._last_sync) / self.period)) - 1
+            if missed > 0:
+                self.missed_cycles += missed
+        self._last_sync = timestamp
+        self._update_following_error()
+        try:
+            setpoints = self._buffer.popleft()
+        except IndexError:
+            return
+        for (var, start, end), value in zip(self._targets, setpoints):
+            if start is None:
+                var.raw = value
+            else:
+                var.pdo_parent.data[start:end] = var.od.encode_raw(value)
+        for pdo_map in self._maps:
+            pdo_map.transmit()
+        self._sent.append(setpoints)
+        self.cycles += 1
+        if not self._buffer:
+            self._drained.set()
+
+    def _update_following_error(self):
+        if len(self._sent) < self._sent.maxlen:
+            return
+        # Setpoints which should be reflected in the latest actual values
+        setpoints = self._sent[0]
+        for i, node in enumerate(self.nodes):
+            actual = node.tpdo_values.get(self.actual_index)
+            if actual is None:
+                continue
+            error = setpoints[i] - actual
+            self.following_error[i] = error
+            if abs(error) > self.max_following_error[i]:
+                self.max_following_error[i] = abs(error)
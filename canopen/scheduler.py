@@ -0,0 +1,221 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    # Not affected by changes of the system clock
+    clock = time.monotonic
+except AttributeError:
+    # Python 2
+    clock = time.time
+
+
+class Scheduler(object):
+    """Runs timed callbacks from a single background thread.
+
+    Timers are kept in a heap so that the cost of adding, cancelling and
+    expiring a timer does not depend much on how many timers are active.
+    The thread is started when the first timer is added.
+
+    Times are given in seconds using :func:`canopen.scheduler.clock`.
+    """
+
+    #: Number of cancelled timers allowed in the heap before it is compacted,
+    #: if they are also more than half of the timers
+    COMPACT_THRESHOLD = 64
+
+    def __init__(self):
+        self._heap = []
+        # Cancelled timers that are still in the heap
+        self._cancelled = 0
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def call_at(self, when, callback, *args):
+        """Call a function at a given time.
+
+        :param float when:
+            Time in seconds according to :func:`canopen.scheduler.clock`.
+        :param callback:
+            Function to call from the scheduler thread.
+
+        :return: A timer which can be cancelled.
+        :rtype: canopen.scheduler.Timer
+        """
+        timer = Timer(when, callback, args)
+        timer._scheduler = self
+        with self._condition:
+            heapq.heappush(self._heap, (when, next(self._counter), timer))
+            if self._heap[0][2] is timer:
+                # New first timer, scheduler thread may need to wake up earlier
+                self._condition.notify()
+            if not self._running:
+                self._start()
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        """Call a function after a delay.
+
+        :param float delay:
+            Delay in seconds.
+        :param callback:
+            Function to call from the scheduler thread.
+
+        :return: A timer which can be cancelled.
+        :rtype: canopen.scheduler.Timer
+        """
+        return self.call_at(clock() + delay, callback, *args)
+
+    def call_periodic(self, period, callback, *args):
+        """Call a function periodically without accumulating drift.
+
+        :param float period:
+            Period in seconds.
+        :param callback:
+            Function to call from the scheduler thread.
+
+        :return: A timer which can be cancelled to stop the calls.
+        :rtype: canopen.scheduler.PeriodicTimer
+        """
+        timer = PeriodicTimer(self, period, callback, args)
+        timer.schedule(clock() + period)
+        return timer
+
+    def stop(self):
+        """Stop the scheduler thread and discard all timers."""
+        with self._condition:
+            self._running = False
+            for _, _, timer in self._heap:
+                timer._scheduler = None
+            del self._heap[:]
+            self._cancelled = 0
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name="canopen-scheduler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _cancel(self, timer):
+        with self._condition:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            if timer._scheduler is None:
+                # Not in the heap anymore
+                return
+            self._cancelled += 1
+            heap = self._heap
+            if (self._cancelled > self.COMPACT_THRESHOLD and
+                    self._cancelled * 2 > len(heap)):
+                # Remove cancelled timers instead of waiting for them to
+                # become due, the heap is modified in place as the
+                # scheduler thread holds a reference to it
+                for _, _, cancelled in heap:
+                    if cancelled.cancelled:
+                        cancelled._scheduler = None
+                heap[:] = [entry for entry in heap if not entry[2].cancelled]
+                heapq.heapify(heap)
+                self._cancelled = 0
+
+    def _pop(self):
+        _, _, timer = heapq.heappop(self._heap)
+        timer._scheduler = None
+        if timer.cancelled:
+            self._cancelled -= 1
+        return timer
+
+    def _run(self):
+        heap = self._heap
+        while True:
+            with self._condition:
+                while self._running:
+                    while heap and heap[0][2].cancelled:
+                        self._pop()
+                    if not heap:
+                        self._condition.wait()
+                        continue
+                    timeout = heap[0][0] - clock()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+                timer = self._pop()
+            try:
+                timer.run()
+            except Exception as e:
+                # Exceptions in callbacks should not stop other timers
+                logger.exception(e)
+
+
+class Timer(object):
+    """A callback scheduled by a :class:`~canopen.scheduler.Scheduler`."""
+
+    def __init__(self, when, callback, args):
+        #: Time when the callback is due
+        self.when = when
+        self.callback = callback
+        self.args = args
+        #: True if the timer has been cancelled
+        self.cancelled = False
+        # Scheduler while the timer is waiting in its heap
+        self._scheduler = None
+
+    def run(self):
+        if not self.cancelled:
+            self.callback(*self.args)
+
+    def cancel(self):
+        """Prevent the callback from being called."""
+        scheduler = self._scheduler
+        if scheduler is not None:
+            scheduler._cancel(self)
+        else:
+            self.cancelled = True
+
+
+class PeriodicTimer(Timer):
+    """A callback called periodically by a
+    :class:`~canopen.scheduler.Scheduler`.
+    """
+
+    def __init__(self, scheduler, period, callback, args):
+        super(PeriodicTimer, self).__init__(None, callback, args)
+        self.scheduler = scheduler
+        #: Period in seconds
+        self.period = period
+        self._timer = None
+
+    def schedule(self, when):
+        self.when = when
+        self._timer = self.scheduler.call_at(when, self.run)
+
+    def run(self):
+        if self.cancelled:
+            return
+        # Schedule from the previous due time to avoid drift
+        when = self.when + self.period
+        now = clock()
+        if when < now:
+            # Skip missed periods rather than trying to catch up
+            when += (now - when) // self.period * self.period + self.period
+        self.schedule(when)
+        self.callback(*self.args)
+
+    def cancel(self):
+        """Stop the periodic calls."""
+        self.cancelled = True
+        if self._timer is not None:
+            self._timer.cancel()
@@ -1,3 +1,4 @@
+import io
 import logging
 
 from .base import SdoBase
@@ -22,6 +23,12 @@ class SdoServer(SdoBase):
         SdoBase.__init__(self, rx_cobid, tx_cobid, node.object_dictionary)
         self._node = node
         self._buffer = None
+        # Upload source and number of bytes left to send
+        self._source = None
+        self._remaining = 0
+        # Domain being downloaded to and the offset of the next segment
+        self._domain = None
+        self._offset = 0
         self._toggle = 0
         self._index = None
         self._subindex = None
@@ -60,20 +67,36 @@ class SdoServer(SdoBase):
         _, index, subindex = SDO_STRUCT.unpack_from(request)
         self._index = index
         self._subindex = subindex
+        # A new request ends any previous transfer
+        self._close_source()
+        self._abort_domain()
         res_command = RESPONSE_UPLOAD | SIZE_SPECIFIED
         response = bytearray(8)
 
-        data = self._node.get_data(index, subindex, check_readable=True)
-        size = len(data)
-        if size <= 4:
+        data = self._node.get_data_source(index, subindex, check_readable=True)
+        if hasattr(data, "read"):
+            # Stream from a file like object
+            source = data
+            position = source.tell()
+            source.seek(0, io.SEEK_END)
+            size = source.tell() - position
+            source.seek(position)
+        else:
+            source = None
+            size = len(data)
+        if 0 < size <= 4:
             logger.info("Expedited upload for 0x%X:%d", index, subindex)
+            if source is not None:
+                data = source.read(size)
+                source.close()
             res_command |= EXPEDITED
             res_command |= (4 - size) << 2
             response[4:4 + size] = data
         else:
             logger.info("Initiating segmented upload for 0x%X:%d", index, subindex)
             struct.pack_into("<L", response, 4, size)
-            self._buffer = bytearray(data)
+            self._source = source if source is not None else io.BytesIO(data)
+            self._remaining = size
             self._toggle = 0
 
         SDO_STRUCT.pack_into(response, 0, res_command, index, subindex)
@@ -83,20 +106,22 @@ class SdoServer(SdoBase):
         if command & TOGGLE_BIT != self._toggle:
             # Toggle bit mismatch
             raise SdoAbortedError(0x05030000)
-        data = self._buffer[:7]
+        if self._source is None:
+            # No upload in progress
+            raise SdoAbortedError(0x05040001)
+        data = self._source.read(min(self._remaining, 7))
         size = len(data)
-
-        # Remove sent data from buffer
-        del self._buffer[:7]
+        self._remaining -= size
 
         res_command = RESPONSE_SEGMENT_UPLOAD
         # Add toggle bit
         res_command |= self._toggle
         # Add nof bytes not used
         res_command |= (7 - size) << 1
-        if not self._buffer:
-            # Nothing left in buffer
+        if size == 0 or not self._remaining:
+            # Nothing left to send
             res_command |= NO_MORE_DATA
+            self._close_source()
         # Toggle bit for next message
         self._toggle ^= TOGGLE_BIT
 
@@ -105,6 +130,17 @@ class SdoServer(SdoBase):
         response[1:1 + size] = data
         self.send_response(response)
 
+    def _close_source(self):
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def _abort_domain(self):
+        if self._domain is not None:
+            domain = self._domain
+            self._domain = None
+            domain.abort_write()
+
     def block_upload(self, data):
         # We currently don't support BLOCK UPLOAD
         # according to CIA301 the server is allowed
@@ -115,6 +151,8 @@ class SdoServer(SdoBase):
     def request_aborted(self, data):
         _, index, subindex, code = struct.unpack_from("<BHBL", data)
         self.last_received_error = code
+        self._close_source()
+        self._abort_domain()
         logger.info("Received request aborted for 0x%X:%d with code 0x%X", index, subindex, code)
 
     def block_download(self, data):
@@ -127,6 +165,8 @@ class SdoServer(SdoBase):
         command, index, subindex = SDO_STRUCT.unpack_from(request)
         self._index = index
         self._subindex = subindex
+        self._close_source()
+        self._abort_domain()
         res_command = RESPONSE_DOWNLOAD
         response = bytearray(8)
 
@@ -139,10 +179,18 @@ class SdoServer(SdoBase):
             self.download(index, subindex, request[4:4 + size])
         else:
             logger.info("Initiating segmented download for 0x%X:%d", index, subindex)
+            size = None
             if command & SIZE_SPECIFIED:
                 size, = struct.unpack_from("<L", request, 4)
                 logger.info("Size is %d bytes", size)
-            self._buffer = bytearray()
+            self._domain = self._node.get_domain(index, subindex,
+                                                 check_writable=True)
+            if self._domain is not None:
+                # Write each segment directly to the domain
+                self._domain.begin_write(size)
+                self._offset = 0
+            else:
+                self._buffer = bytearray()
             self._toggle = 0
 
         SDO_STRUCT.pack_into(response, 0, res_command, index, subindex)
@@ -153,13 +201,20 @@ class SdoServer(SdoBase):
             # Toggle bit mismatch
             raise SdoAbortedError(0x05030000)
         last_byte = 8 - ((command >> 1) & 0x7)
-        self._buffer.extend(request[1:last_byte])
-
-        if command & NO_MORE_DATA:
-            self._node.set_data(self._index,
-                                self._subindex,
-                                self._buffer,
-                                check_writable=True)
+        if self._domain is not None:
+            data = bytes(request[1:last_byte])
+            self._domain.write(self._offset, data)
+            self._offset += len(data)
+            if command & NO_MORE_DATA:
+                self._domain.end_write(self._offset)
+                self._domain = None
+        else:
+            self._buffer.extend(request[1:last_byte])
+            if command & NO_MORE_DATA:
+                self._node.set_data(self._index,
+                                    self._subindex,
+                                    self._buffer,
+                                    check_writable=True)
 
         res_command = RESPONSE_SEGMENT_DOWNLOAD
         # Add toggle bit
@@ -176,6 +231,8 @@ class SdoServer(SdoBase):
 
     def abort(self, abort_code=0x08000000):
         """Abort current transfer."""
+        self._close_source()
+        self._abort_domain()
         data = struct.pack("<BHBL", RESPONSE_ABORTED,
                            self._index, self._subindex, abort_code)
         self.send_response(data)
@@ -0,0 +1,174 @@
+import logging
+import struct
+import time
+
+from .network import Network
+from .node import LocalNode
+
+logger = logging.getLogger(__name__)
+
+
+class Simulator(Network):
+    """A network of simulated devices, e.g. for testing or load testing a
+    master.
+
+    All nodes must be :class:`~canopen.LocalNode` objects. They share the
+    subscriptions of this network, so every message received is dispatched
+    with one table lookup from the receiving thread of the simulator, which
+    is separate from the one of the master. NMT commands, which all nodes
+    listen to, are handled by one subscription that passes the command on
+    to the addressed node only, or to all nodes for a broadcast. Heartbeats
+    and other periodic messages are sent from the
+    :attr:`~canopen.Network.scheduler` instead of one thread per node.
+
+    The time from the reception of a message to a node until it has been
+    handled is recorded in :attr:`stats`. This relies on the timestamps of
+    the received messages being Unix timestamps.
+    """
+
+    def __init__(self, bus=None):
+        super(Simulator, self).__init__(bus)
+        #: :class:`ServiceStats` by node ID
+        self.stats = {}
+        # Node ID by (CAN ID, remote frame) for the services of the nodes
+        self._owners = {}
+        self.subscribe(0, self.on_nmt_command)
+
+    def __setitem__(self, node_id, node):
+        if not isinstance(node, LocalNode):
+            raise TypeError("Only local nodes can be simulated")
+        super(Simulator, self).__setitem__(node_id, node)
+        # NMT commands are passed on by on_nmt_command instead
+        self.unsubscribe(0, node.nmt.on_command)
+        self.stats[node_id] = ServiceStats()
+        for sdo in node.sdo_channels:
+            self._owners[(sdo.rx_cobid, False)] = node_id
+        self._owners[(0x700 + node_id, True)] = node_id
+
+    def __delitem__(self, node_id):
+        # Expected to be subscribed when the node is removed from the network
+        self.subscribe(0, self.nodes[node_id].nmt.on_command)
+        super(Simulator, self).__delitem__(node_id)
+        del self.stats[node_id]
+        self._owners = dict((key, owner) for key, owner in self._owners.items()
+                            if owner != node_id)
+
+    def start(self, heartbeat_time=None):
+        """Start the PDOs of all nodes.
+
+        :param int heartbeat_time:
+            If given, also start the heartbeats with this period in ms.
+        """
+        for node_id, node in self.nodes.items():
+            if heartbeat_time is not None:
+                node.sdo[0x1017].raw = heartbeat_time
+            node.tpdo_producer.start()
+            node.rpdo_consumer.start()
+            for pdo_map in node.rpdo.map.values():
+                if pdo_map.enabled and pdo_map.cob_id is not None:
+                    self._owners[(pdo_map.cob_id, False)] = node_id
+
+    def stop(self):
+        """Stop the PDOs and heartbeats of all nodes."""
+        for node in self.nodes.values():
+            node.tpdo_producer.stop()
+            node.rpdo_consumer.stop()
+            node.nmt.stop_heartbeat()
+
+    def on_nmt_command(self, can_id, data, timestamp):
+        _, node_id = struct.unpack_from("BB", data)
+        if node_id == 0:
+            nodes = list(self.nodes.values())
+        elif node_id in self.nodes:
+            nodes = [self.nodes[node_id]]
+        else:
+            return
+        for node in nodes:
+            node.nmt.on_command(can_id, data, timestamp)
+
+    def reset_stats(self):
+        """Clear the statistics of all nodes."""
+        for node_id in self.stats:
+            self.stats[node_id] = ServiceStats()
+
+    def send_periodic(self, can_id, data, period, remote=False):
+        """Start sending a message periodically from the scheduler.
+
+        :param int can_id:
+            CAN-ID of the message (always 11-bit)
+        :param data:
+            Data to be transmitted (anything that can be converted to bytes)
+        :param float period:
+            Seconds between each message
+        :param bool remote:
+            indicates if the message frame is a remote request to the slave node
+
+        :return:
+            An task object with a ``.stop()`` method to stop the transmission
+        :rtype: canopen.simulator.ScheduledMessageTask
+        """
+        return ScheduledMessageTask(self, can_id, data, period, remote)
+
+    def notify(self, can_id, data, timestamp, remote=False):
+        super(Simulator, self).notify(can_id, data, timestamp, remote)
+        node_id = self._owners.get((can_id, remote))
+        if node_id is not None:
+            self.stats[node_id].add(time.time() - timestamp)
+
+
+class ServiceStats(object):
+    """Latency statistics of messages handled by a simulated node."""
+
+    def __init__(self):
+        #: Number of messages handled
+        self.count = 0
+        #: Sum of latencies in seconds
+        self.total = 0.0
+        #: Largest latency in seconds
+        self.max = 0.0
+
+    def __repr__(self):
+        return "<ServiceStats count=%d mean=%.6f max=%.6f>" % (
+            self.count, self.mean, self.max)
+
+    @property
+    def mean(self):
+        """Mean latency in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+
+class ScheduledMessageTask(object):
+    """A message sent periodically from the scheduler of a network.
+
+    Has the same interface as :class:`~canopen.network.PeriodicMessageTask`.
+    """
+
+    def __init__(self, network, can_id, data, period, remote=False):
+        self.network = network
+        self.can_id = can_id
+        self.data = bytes(bytearray(data))
+        self.period = period
+        self.remote = remote
+        self._send()
+        self._timer = network.scheduler.call_periodic(period, self._send)
+
+    def _send(self):
+        self.network.send_message(self.can_id, self.data, self.remote)
+
+    def stop(self):
+        """Stop transmission"""
+        self._timer.cancel()
+
+    def update(self, data):
+        """Update data of message
+
+        :param data:
+            New data to transmit
+        """
+        self.data = bytes(bytearray(data))
@@ -12,11 +12,12 @@ TIME_OF_DAY_STRUCT = struct.Struct("<LH")
 class TimeProducer(object):
     """Produces timestamp objects."""
 
-    #: COB-ID of the SYNC message
+    #: COB-ID of the TIME message
     cob_id = 0x100
 
     def __init__(self, network):
         self.network = network
+        self._timer = None
 
     def transmit(self, timestamp=None):
         """Send out the TIME message once.
@@ -24,7 +25,89 @@ class TimeProducer(object):
         :param float timestamp:
             Optional Unix timestamp to use, otherwise the current time is used.
         """
-        delta = timestamp or time.time() - OFFSET
-        days, seconds = divmod(delta, ONE_DAY)
+        if timestamp is None:
+            timestamp = time.time()
+        days, seconds = divmod(timestamp - OFFSET, ONE_DAY)
         data = TIME_OF_DAY_STRUCT.pack(int(seconds * 1000), int(days))
         self.network.send_message(self.cob_id, data)
+
+    def start(self, period):
+        """Start periodic transmission of the current time.
+
+        The messages are sent from the network's
+        :class:`~canopen.scheduler.Scheduler`, which schedules each message
+        from the due time of the previous one using a monotonic clock so
+        that the period does not drift.
+
+        :param float period:
+            Period in seconds.
+        """
+        self.stop()
+        self._timer = self.network.scheduler.call_periodic(period, self.transmit)
+
+    def stop(self):
+        """Stop periodic transmission."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class TimeConsumer(object):
+    """Receives TIME messages and estimates the offset between the time of
+    the producer and the local timestamps of the received messages.
+
+    :param canopen.Network network:
+        The network to listen on.
+    """
+
+    #: COB-ID of the TIME message
+    cob_id = 0x100
+
+    #: Weight of a new sample in the smoothed offset
+    SMOOTHING = 0.1
+
+    def __init__(self, network):
+        self.network = network
+        #: Last received time as a Unix timestamp
+        self.time = None
+        #: Local timestamp of the last received message
+        self.timestamp = None
+        #: Estimated producer time minus local time in seconds, or ``None``
+        #: if no message has been received
+        self.offset = None
+
+    def start(self):
+        """Start listening for TIME messages."""
+        self.network.subscribe(self.cob_id, self.on_time)
+
+    def stop(self):
+        """Stop listening for TIME messages."""
+        self.network.unsubscribe(self.cob_id, self.on_time)
+
+    def on_time(self, can_id, data, timestamp):
+        if len(data) < 6:
+            return
+        milliseconds, days = TIME_OF_DAY_STRUCT.unpack_from(bytes(data))
+        # Upper 4 bits of the first 32 bits are reserved
+        milliseconds &= 0x0FFFFFFF
+        self.time = OFFSET + days * ONE_DAY + milliseconds / 1000.0
+        self.timestamp = timestamp
+        offset = self.time - timestamp
+        if self.offset is None:
+            self.offset = offset
+        else:
+            self.offset += self.SMOOTHING * (offset - self.offset)
+
+    def map_timestamp(self, timestamp):
+        """Convert a local timestamp, e.g. of a PDO or EMCY, to the time of
+        the TIME producer.
+
+        :param float timestamp:
+            Local timestamp as given to message callbacks.
+
+        :return: Producer time as a Unix timestamp.
+        :rtype: float
+        """
+        if self.offset is None:
+            raise RuntimeError("No TIME message received yet")
+        return timestamp + self.offset
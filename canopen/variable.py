@@ -69,12 +69,13 @@ class Variable(object):
         written as :class:`bytes`.
         """
         value = self.od.decode_raw(self.data)
-        text = "Value of %s (0x%X:%d) is %r" % (
-            self.name, self.index,
-            self.subindex, value)
-        if value in self.od.value_descriptions:
-            text += " (%s)" % self.od.value_descriptions[value]
-        logger.debug(text)
+        if logger.isEnabledFor(logging.DEBUG):
+            text = "Value of %s (0x%X:%d) is %r" % (
+                self.name, self.index,
+                self.subindex, value)
+            if value in self.od.value_descriptions:
+                text += " (%s)" % self.od.value_descriptions[value]
+            logger.debug(text)
         return value
 
     @raw.setter
@@ -92,7 +93,7 @@ class Variable(object):
         either a :class:`float` or an :class:`int`.
         Non integers will be passed as is.
         """
-        value = self.od.decode_phys(self.raw)
+        value = self.od.decode_phys_data(self.data)
         if self.od.unit:
             logger.debug("Physical value is %s %s", value, self.od.unit)
         return value
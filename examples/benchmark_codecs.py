@@ -0,0 +1,55 @@
+"""Measure encoding and decoding of values for each numeric data type.
+
+Run from the repository root with::
+
+    python examples/benchmark_codecs.py [number of calls]
+
+Times are printed in nanoseconds per call.
+"""
+from __future__ import print_function
+import sys
+import timeit
+
+from canopen import objectdictionary as od
+
+
+DATA_TYPES = (
+    ("BOOLEAN", od.BOOLEAN, 1),
+    ("INTEGER8", od.INTEGER8, -100),
+    ("INTEGER16", od.INTEGER16, -1000),
+    ("INTEGER32", od.INTEGER32, -100000),
+    ("INTEGER64", od.INTEGER64, -10000000000),
+    ("UNSIGNED8", od.UNSIGNED8, 200),
+    ("UNSIGNED16", od.UNSIGNED16, 50000),
+    ("UNSIGNED32", od.UNSIGNED32, 3000000000),
+    ("UNSIGNED64", od.UNSIGNED64, 10000000000),
+    ("REAL32", od.REAL32, 1.5),
+    ("REAL64", od.REAL64, 1.5),
+)
+
+
+def measure(func, arg, number):
+    seconds = min(timeit.repeat(lambda: func(arg), repeat=3, number=number))
+    return seconds / number * 1e9
+
+
+def main(number=100000):
+    print("%-12s %8s %8s %12s %12s" % (
+        "type", "decode", "encode", "decode phys", "encode phys"))
+    for name, data_type, value in DATA_TYPES:
+        var = od.Variable(name, 0x2000)
+        var.data_type = data_type
+        if data_type in od.INTEGER_TYPES:
+            var.factor = 0.1
+        data = var.encode_raw(value)
+        phys = var.decode_phys_data(data)
+        print("%-12s %8.0f %8.0f %12.0f %12.0f" % (
+            name,
+            measure(var.decode_raw, data, number),
+            measure(var.encode_raw, value, number),
+            measure(var.decode_phys_data, data, number),
+            measure(var.encode_phys_data, phys, number)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
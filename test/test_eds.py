@@ -1,6 +1,9 @@
 import os
+import shutil
+import tempfile
 import unittest
 import canopen
+from canopen.objectdictionary import eds
 
 EDS_PATH = os.path.join(os.path.dirname(__file__), 'sample.eds')
 
@@ -72,3 +75,70 @@ class TestEDS(unittest.TestCase):
     def test_compact_subobj_parameter_name_with_percent(self):
         name = self.od[0x3006].name
         self.assertEqual(name, 'Valve 1 % Open')
+
+    def test_export_dcf(self):
+        self.od[0x1017].value = 1000
+        self.od[0x1400][1].value = 0x203
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "exported.dcf")
+        canopen.objectdictionary.export_dcf(self.od, path, node_id=2)
+        with open(path) as fp:
+            text = fp.read()
+        self.assertIn("DefaultValue=$NODEID+0x200\n", text)
+        self.assertIn("ParameterValue=$NODEID+0x201\n", text)
+
+        exported = eds.import_eds(path, 3)
+        self.assertEqual(list(exported), list(self.od))
+        for obj in self.od.values():
+            if isinstance(obj, canopen.objectdictionary.Variable):
+                variables = [obj]
+            else:
+                self.assertEqual(exported[obj.index].name, obj.name)
+                self.assertEqual(type(exported[obj.index]), type(obj))
+                variables = obj.values()
+            for var in variables:
+                other = exported.get_variable(var.index, var.subindex)
+                self.assertEqual(other.name, var.name)
+                for attr in ("data_type", "access_type", "min", "max",
+                             "relative", "pdo_mappable"):
+                    self.assertEqual(getattr(other, attr), getattr(var, attr))
+                if var.relative:
+                    # Imported again with a different node ID
+                    self.assertEqual(other.default, var.default + 1)
+                elif isinstance(var.default, float):
+                    self.assertAlmostEqual(other.default, var.default)
+                else:
+                    self.assertEqual(other.default, var.default)
+        self.assertEqual(exported[0x1017].value, 1000)
+        self.assertEqual(exported[0x1400][1].value, 0x204)
+        self.assertEqual(exported[0x1003].compact_sub_obj, 255)
+        self.assertEqual(exported[0x3004].compact_sub_obj, 3)
+        self.assertEqual(exported[0x3004][3].name, "Sensor Status 3")
+
+    def test_export_dcf_binary_values(self):
+        od = canopen.ObjectDictionary()
+        domain = canopen.objectdictionary.Variable("Program", 0x1F50)
+        domain.data_type = canopen.objectdictionary.DOMAIN
+        domain.default = b"\x00\r\nBinary\xff"
+        od.add_object(domain)
+        octets = canopen.objectdictionary.Variable("Key", 0x2000)
+        octets.data_type = canopen.objectdictionary.OCTET_STRING
+        octets.pdo_mappable = True
+        octets.value = b"\n\x01\x02"
+        od.add_object(octets)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "exported.dcf")
+        canopen.objectdictionary.export_dcf(od, path)
+        with open(path) as fp:
+            text = fp.read()
+        self.assertIn("[1F50]\nParameterName=Program\nObjectType=0x2\n", text)
+        self.assertIn("DefaultValue=000D0A42696E617279FF\n", text)
+        self.assertIn("ParameterValue=0A0102\nPDOMapping=1\n", text)
+
+        exported = eds.import_eds(path, None)
+        self.assertEqual(exported[0x1F50].default, b"\x00\r\nBinary\xff")
+        self.assertEqual(exported[0x2000].value, b"\n\x01\x02")
+        self.assertTrue(exported[0x2000].pdo_mappable)
+        self.assertFalse(exported[0x1F50].pdo_mappable)
@@ -1,4 +1,6 @@
+import threading
 import unittest
+import canopen
 from canopen import emcy
 
 
@@ -43,6 +45,87 @@ class TestEmcyConsumer(unittest.TestCase):
         self.assertEqual(str(error), "Code 0x7100")
 
 
+class TestEmcyStore(unittest.TestCase):
+
+    def add(self, store, node_id, code, timestamp):
+        store.add(emcy.EmcyError(code, 0, b"", timestamp, node_id))
+
+    def test_bounded(self):
+        store = emcy.EmcyStore(3)
+        for i in range(5):
+            self.add(store, 1 + i % 2, 0x3100 + i, float(i))
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.discarded, 2)
+        self.assertEqual([e.code for e in store], [0x3102, 0x3103, 0x3104])
+        self.assertEqual([e.code for e in store.by_node(1)], [0x3102, 0x3104])
+        self.assertEqual([e.code for e in store.by_node(2)], [0x3103])
+        self.assertEqual(store[0].code, 0x3102)
+        self.assertEqual(store[-1].code, 0x3104)
+        self.assertEqual([e.code for e in store[-2:]], [0x3103, 0x3104])
+        self.assertEqual([e.code for e in store[::2]], [0x3102, 0x3104])
+        self.assertEqual([e.code for e in store.between(3.0, 5.0)], [0x3103, 0x3104])
+        self.assertEqual([e.code for e in store.between(0.0, 3.0)], [0x3102])
+        store.clear()
+        self.assertEqual(store.discarded, 0)
+        self.assertEqual(store[:], [])
+
+    def test_indexes(self):
+        store = emcy.EmcyStore()
+        self.add(store, 1, 0x2310, 1.0)
+        self.add(store, 2, 0x3120, 2.0)
+        self.add(store, 1, 0x3210, 3.0)
+        self.add(store, 3, 0x5000, 4.0)
+        self.assertEqual([e.code for e in store.by_class(0x3000)], [0x3120, 0x3210])
+        self.assertEqual([e.code for e in store.by_class(0x5000)], [0x5000])
+        self.assertEqual(store.by_class(0x5100), [])
+        self.assertEqual([e.code for e in store.between(2.0, 4.0)], [0x3120, 0x3210])
+        self.assertEqual(store.between(5.0, 6.0), [])
+        self.assertEqual(store.by_node(4), [])
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.by_node(1), [])
+
+    def test_error_class(self):
+        self.assertEqual(emcy.get_error_class(0x2310), 0x2000)
+        self.assertEqual(emcy.get_error_class(0x50FF), 0x5000)
+        self.assertEqual(emcy.get_error_class(0xFF01), 0xFF00)
+        self.assertEqual(emcy.get_error_class(0x7100), 0x7100)
+
+    def test_wait_burst(self):
+        store = emcy.EmcyStore()
+        results = {}
+
+        def wait(code):
+            results[code] = store.wait(code, 1)
+
+        threads = [threading.Thread(target=wait, args=(code, ))
+                   for code in (0x2310, 0x3120, None)]
+        for thread in threads:
+            thread.start()
+        # Make sure the threads are waiting
+        while sum(len(w) for w in store._waiters.values()) < 3:
+            pass
+        self.add(store, 1, 0x3120, 1.0)
+        self.add(store, 1, 0x2310, 2.0)
+        self.add(store, 1, 0x4000, 3.0)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results[0x2310].timestamp, 2.0)
+        self.assertEqual(results[0x3120].timestamp, 1.0)
+        self.assertEqual(results[None].timestamp, 1.0)
+        self.assertIsNone(store.wait(0x2310, 0.01))
+
+    def test_network_log(self):
+        network = canopen.Network()
+        network.add_node(1, None)
+        network.add_node(2, None)
+        network.notify(0x81, b"\x10\x90\x01\x00\x00\x00\x00\x00", 1.0)
+        network.notify(0x82, b"\x01\x20\x02\x00\x00\x00\x00\x00", 2.0)
+        self.assertEqual(len(network[1].emcy.log), 1)
+        self.assertEqual([e.node_id for e in network.emcy_log], [1, 2])
+        self.assertEqual(network.emcy_log.by_node(2)[0].code, 0x2001)
+
+
 class MockNetwork(object):
 
     data = None
@@ -59,3 +142,102 @@ class TestEmcyProducer(unittest.TestCase):
         emcy_node.network = network
         emcy_node.send(0x2001, 0x2, b'\x00\x01\x02\x03\x04')
         self.assertEqual(network.data, b'\x01\x20\x02\x00\x01\x02\x03\x04')
+
+
+class TestEmcyAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.network = canopen.Network()
+        self.addCleanup(self.network.scheduler.stop)
+        self.aggregator = self.network.emcy
+        self.batches = []
+        self.delivered = threading.Event()
+        self.aggregator.add_callback(self.on_events)
+
+    def on_events(self, events):
+        self.batches.append(events)
+        self.delivered.set()
+
+    def test_coalesce(self):
+        self.aggregator.start(window=10)
+        for i in range(100):
+            self.network.notify(0x81, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0 + i)
+            self.network.notify(0x82, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0 + i)
+        self.network.notify(0x81, b'\x00\x50\x01\x00\x00\x00\x00\x00', 200.0)
+        self.assertEqual(self.batches, [])
+        self.aggregator.stop()
+        self.assertEqual(self.aggregator.received, 201)
+        self.assertEqual(self.aggregator.suppressed, 198)
+        self.assertEqual(len(self.batches), 1)
+        events = self.batches[0]
+        self.assertEqual([(e.emcy.node_id, e.emcy.code, e.count) for e in events],
+                         [(1, 0x3010, 100), (2, 0x3010, 100), (1, 0x5000, 1)])
+        self.assertEqual(events[0].emcy.timestamp, 1.0)
+        self.assertEqual(events[0].last_timestamp, 100.0)
+        self.assertEqual(events[0].emcy.register, 4)
+        self.assertEqual(str(events[0]), "Node 1: Code 0x3010, Voltage (x100)")
+        # No longer listening
+        self.network.notify(0x81, b'\x00\x50\x01\x00\x00\x00\x00\x00', 300.0)
+        self.assertEqual(self.aggregator.received, 201)
+
+    def test_window(self):
+        self.aggregator.start(window=0.01)
+        self.network.notify(0x83, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0)
+        self.network.notify(0x83, b'\x10\x30\x04\x00\x00\x00\x00\x00', 2.0)
+        self.assertTrue(self.delivered.wait(1))
+        self.assertEqual(self.batches[0][0].count, 2)
+        self.aggregator.stop()
+        self.assertEqual(len(self.batches), 1)
+
+    def test_invalid_frame(self):
+        self.aggregator.start(window=10)
+        self.network.notify(0x81, b'\x10', 1.0)
+        self.network.notify(0x82, b'\x10\x30\x04\x00\x00\x00\x00\x00', 2.0)
+        self.aggregator.stop()
+        # Only the invalid frame is dropped
+        self.assertEqual([e.emcy.node_id for e in self.batches[0]], [2])
+
+    def test_node_consumers(self):
+        node = self.network.add_node(1, None)
+        self.aggregator.start(window=10)
+        for i in range(100):
+            self.network.notify(0x81, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0 + i)
+        # Not handled in the receive thread
+        self.assertEqual(len(node.emcy.log), 0)
+        self.aggregator.stop()
+        # But every message is passed on
+        self.assertEqual(len(node.emcy.log), 100)
+        self.assertEqual(len(node.emcy.active), 100)
+        self.assertEqual(node.emcy.log[-1].timestamp, 100.0)
+        self.assertEqual(len(self.network.emcy_log), 100)
+        # Handled directly when stopped
+        self.network.notify(0x81, b'\x00\x00\x00\x00\x00\x00\x00\x00', 200.0)
+        self.assertEqual(len(node.emcy.log), 101)
+        self.assertEqual(node.emcy.active, [])
+        del self.network[1]
+        self.network.notify(0x81, b'\x00\x00\x00\x00\x00\x00\x00\x00', 300.0)
+        self.assertEqual(len(node.emcy.log), 101)
+
+    def test_consumer_order(self):
+        node = self.network.add_node(1, None)
+        self.aggregator.start(window=10)
+        self.network.notify(0x81, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0)
+        self.network.notify(0x81, b'\x00\x00\x00\x00\x00\x00\x00\x00', 2.0)
+        self.network.notify(0x81, b'\x10\x30\x04\x00\x00\x00\x00\x00', 3.0)
+        self.aggregator.stop()
+        self.assertEqual([e.code for e in node.emcy.log], [0x3010, 0, 0x3010])
+        # The fault after the reset is still active
+        self.assertEqual([e.timestamp for e in node.emcy.active], [3.0])
+        # While callbacks get the coalesced events
+        self.assertEqual([(e.emcy.code, e.count) for e in self.batches[0]],
+                         [(0x3010, 2), (0, 1)])
+
+    def test_delivery_thread(self):
+        threads = []
+        self.aggregator.add_callback(
+            lambda events: threads.append(threading.current_thread()))
+        self.aggregator.start(window=0.01)
+        self.network.notify(0x83, b'\x10\x30\x04\x00\x00\x00\x00\x00', 1.0)
+        self.assertTrue(self.delivered.wait(1))
+        self.aggregator.stop()
+        self.assertEqual(threads[0].name, "canopen-emcy")
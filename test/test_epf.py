@@ -0,0 +1,106 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from canopen import objectdictionary
+from canopen.objectdictionary import epf
+
+EPF = b"""<?xml version="1.0" encoding="UTF-8"?>
+<EPF>
+  <Configuration>
+    <CANopen BitRate="500U" />
+  </Configuration>
+  <Dictionary>
+    <Parameters>
+      <Group SymbolName="Producer heartbeat time">
+        <Parameter Index="0x1017" SubIndex="0" SymbolName="HEARTBEAT"
+                   DataType="UNSIGNED16" AccessType="rw" DefaultValue="0" />
+      </Group>
+      <Group SymbolName="Identity object">
+        <Description>Identity of the device</Description>
+        <Parameter Index="0x1018" SubIndex="0" SymbolName="Number of entries"
+                   DataType="UNSIGNED8" AccessType="ro" />
+        <Parameter Index="0x1018" SubIndex="1" SymbolName="Vendor-ID"
+                   DataType="UNSIGNED32" AccessType="ro" />
+        <Parameter Index="0x1018" SubIndex="2" SymbolName="Product code"
+                   DataType="UNSIGNED32" AccessType="ro" />
+      </Group>
+      <Group SymbolName="Control mode">
+        <Parameter Index="0x2000" SubIndex="0" SymbolName="MODE"
+                   DataType="UNSIGNED8" Factor="1" Unit="-">
+          <ValueFieldDefs>
+            <ValueFieldDef Value="0" Description="Off" />
+            <ValueFieldDef Value="1" Description="On" />
+          </ValueFieldDefs>
+          <BitFieldDefs>
+            <BitFieldDef Name="Enable" Bit="0" />
+          </BitFieldDefs>
+        </Parameter>
+      </Group>
+    </Parameters>
+  </Dictionary>
+</EPF>
+"""
+
+
+class TestEPF(unittest.TestCase):
+
+    def check_od(self, od):
+        self.assertEqual(od.bitrate, 500000)
+        self.assertEqual(list(od), [0x1017, 0x1018, 0x2000])
+
+        var = od["Producer heartbeat time"]
+        self.assertIsInstance(var, objectdictionary.Variable)
+        self.assertEqual(var.index, 0x1017)
+        self.assertEqual(var.data_type, objectdictionary.UNSIGNED16)
+        self.assertEqual(var.default, 0)
+
+        record = od[0x1018]
+        self.assertIsInstance(record, objectdictionary.Record)
+        self.assertEqual(record.description, "Identity of the device")
+        self.assertEqual(len(record), 3)
+        self.assertEqual(record["Vendor-ID"].access_type, "ro")
+
+        var = od[0x2000]
+        self.assertEqual(var.decode_desc(1), "On")
+        self.assertEqual(var.decode_bits(1, "Enable"), 1)
+
+    def test_import(self):
+        self.check_od(epf.import_epf(io.BytesIO(EPF)))
+
+    def test_import_lazy(self):
+        od = epf.import_epf(io.BytesIO(EPF), lazy=True)
+        self.assertEqual(len(od), 3)
+        self.assertEqual(len(od.pending), 3)
+        # Only the position in the file is kept
+        name, start, end = od.pending[0x1018]
+        self.assertEqual(name, "Identity object")
+        self.assertTrue(EPF[start:end].startswith(b'<Group SymbolName="Identity'))
+        # Checking for an index does not build the object
+        self.assertIn(0x1018, od)
+        self.assertIn("Control mode", od)
+        self.assertEqual(len(od.pending), 3)
+        # Only the accessed object is built
+        var = od["Identity object.Product code"]
+        self.assertEqual(var.subindex, 2)
+        self.assertEqual(sorted(od.pending), [0x1017, 0x2000])
+        var = od.get_variable(0x2000)
+        self.assertEqual(var.name, "Control mode")
+        self.assertEqual(sorted(od.pending), [0x1017])
+        self.check_od(od)
+        self.assertEqual(len(od.pending), 0)
+
+    def test_import_lazy_path(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "test.epf")
+        with open(path, "wb") as fp:
+            fp.write(EPF)
+        od = epf.import_epf(path, lazy=True)
+        self.assertEqual(od["Identity object.Vendor-ID"].index, 0x1018)
+        self.check_od(od)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
+import io
 import os
+import shutil
+import tempfile
+import threading
 import unittest
 import canopen
+from canopen.objectdictionary import epf
 import logging
 import time
+from util import wait_for
 
 # logging.basicConfig(level=logging.DEBUG)
 
@@ -160,6 +166,208 @@ class TestSDO(unittest.TestCase):
         self.assertEqual(self._kwargs["data"], b"\x03\x04")
 
 
+class TestSdoChannels(unittest.TestCase):
+    """
+    Test SDO server with several channels.
+    """
+
+    def setUp(self):
+        self.network1 = canopen.Network()
+        self.network1.connect("channels", bustype="virtual")
+        self.addCleanup(self.network1.disconnect)
+        self.remote_node = self.network1.add_node(2, EDS_PATH)
+        self.network2 = canopen.Network()
+        self.network2.connect("channels", bustype="virtual")
+        self.addCleanup(self.network2.disconnect)
+        self.local_node = self.network2.create_node(2, EDS_PATH)
+        self.local_node.add_sdo_channel(0x642, 0x5C2)
+        self.client = canopen.sdo.SdoClient(
+            0x642, 0x5C2, self.remote_node.object_dictionary)
+        self.client.network = self.network1
+        self.network1.subscribe(0x5C2, self.client.on_response)
+
+    def test_concurrent_transfers(self):
+        self.local_node.sdo["Writable string"].raw = "0123456789" * 10
+        errors = []
+
+        def upload(sdo):
+            try:
+                for _ in range(5):
+                    self.assertEqual(sdo.upload(0x2000, 0), b"0123456789" * 10)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=upload, args=(sdo, ))
+                   for sdo in (self.remote_node.sdo, self.client)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_channel_from_od(self):
+        od = canopen.import_od(EDS_PATH, 3)
+        param = canopen.objectdictionary.Record("SDO server parameter 2", 0x1201)
+        for subindex, value in ((1, 0x643), (2, 0x5C3)):
+            var = canopen.objectdictionary.Variable("COB-ID", 0x1201, subindex)
+            var.data_type = canopen.objectdictionary.UNSIGNED32
+            var.default = value
+            param.add_member(var)
+        od.add_object(param)
+        node = canopen.LocalNode(3, od)
+        self.assertEqual([(sdo.rx_cobid, sdo.tx_cobid) for sdo in node.sdo_channels],
+                         [(0x603, 0x583), (0x643, 0x5C3)])
+
+    def test_streamed_upload(self):
+        stream = io.BytesIO(b"abcdefghij" * 100)
+        self.local_node.add_read_callback(lambda **kwargs: stream, 0x2000)
+        self.assertEqual(self.client.upload(0x2000, 0), b"abcdefghij" * 100)
+        self.assertTrue(stream.closed)
+        # Expedited
+        stream = io.BytesIO(b"abc")
+        self.assertEqual(self.client.upload(0x2000, 0), b"abc")
+        self.assertTrue(stream.closed)
+
+
+class TestDomain(unittest.TestCase):
+    """
+    Test transfers of domains provided in chunks.
+    """
+
+    def setUp(self):
+        self.network1 = canopen.Network()
+        self.network1.connect("domain", bustype="virtual")
+        self.addCleanup(self.network1.disconnect)
+        self.remote_node = self.network1.add_node(2, EDS_PATH)
+        self.network2 = canopen.Network()
+        self.network2.connect("domain", bustype="virtual")
+        self.addCleanup(self.network2.disconnect)
+        self.local_node = self.network2.create_node(2, EDS_PATH)
+        var = canopen.objectdictionary.Variable("Firmware", 0x2100)
+        var.data_type = canopen.objectdictionary.DOMAIN
+        var.access_type = "rw"
+        self.local_node.object_dictionary.add_object(var)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, "firmware.bin")
+        self.firmware = bytes(bytearray(range(256))) * 8
+        with open(self.path, "wb") as f:
+            f.write(self.firmware)
+        self.domain = canopen.domain.FileDomain(self.path)
+        self.addCleanup(self.domain.close)
+        self.local_node.add_domain(self.domain, 0x2100)
+
+    def test_upload(self):
+        self.assertEqual(self.remote_node.sdo.upload(0x2100, 0), self.firmware)
+        # Also for local access
+        self.assertEqual(self.local_node.sdo.upload(0x2100, 0), self.firmware)
+
+    def test_download(self):
+        self.remote_node.sdo.download(0x2100, 0, b"new firmware" * 100)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), b"new firmware" * 100)
+        self.remote_node.sdo.download(0x2100, 0, b"1234")
+        self.assertEqual(self.remote_node.sdo.upload(0x2100, 0), b"1234")
+
+    def test_upload_releases_file(self):
+        self.remote_node.sdo.upload(0x2100, 0)
+        self.assertIsNone(self.domain._map)
+
+    def test_aborted_download(self):
+        self.local_node.add_sdo_channel(0x642, 0x5C2)
+        client = canopen.sdo.SdoClient(
+            0x642, 0x5C2, self.remote_node.object_dictionary)
+        client.network = self.network1
+        self.network1.subscribe(0x5C2, client.on_response)
+        stream = canopen.sdo.client.WritableStream(
+            self.remote_node.sdo, 0x2100, 0, size=100)
+        stream.write(b"new fir")
+        # Reading on another channel while writing
+        self.assertEqual(client.upload(0x2100, 0), self.firmware)
+        stream.write(b"mware..")
+        self.remote_node.sdo.abort()
+        # Handled in order, so the abort is done when this completes
+        self.assertEqual(self.remote_node.sdo.upload(0x2100, 0), self.firmware)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.firmware)
+        # Temporary file has been removed
+        self.assertEqual(os.listdir(os.path.dirname(self.path)),
+                         ["firmware.bin"])
+
+    def test_read_only(self):
+        self.domain.writable = False
+        with self.assertRaises(canopen.SdoAbortedError) as cm:
+            self.remote_node.sdo.download(0x2100, 0, b"new firmware")
+        self.assertEqual(cm.exception.code, 0x06010002)
+        self.assertEqual(self.remote_node.sdo.upload(0x2100, 0), self.firmware)
+
+    def test_empty(self):
+        self.local_node.add_domain(canopen.domain.Domain(), 0x2100)
+        self.assertEqual(self.remote_node.sdo.upload(0x2100, 0), b"")
+
+
+class TestDataStore(unittest.TestCase):
+    """
+    Test the object dictionary data of a local node.
+    """
+
+    def setUp(self):
+        self.node = canopen.LocalNode(2, EDS_PATH)
+        self.calls = []
+
+    def _callback(self, **kwargs):
+        self.calls.append((kwargs["index"], kwargs["subindex"]))
+
+    def test_defaults(self):
+        self.assertEqual(self.node.data_store, {})
+        self.assertEqual(self.node.get_data(0x1018, 1), b"\x01\x00\x00\x00")
+        self.assertEqual(self.node.get_data(0x1400, 2), b"\xff")
+        # Changes to the object dictionary are seen until the data is written
+        self.node.object_dictionary[0x1400][2].value = 0xFE
+        self.assertEqual(self.node.get_data(0x1400, 2), b"\xfe")
+        self.node.set_data(0x1400, 2, b"\x01")
+        self.assertEqual(self.node.get_data(0x1400, 2), b"\x01")
+
+    def test_read_callback_stream(self):
+        stream = io.BytesIO(b"\x05\x00")
+        self.node.add_read_callback(lambda **kwargs: stream, 0x1017, 0)
+        # Streams are only passed on by get_data_source()
+        self.assertIs(self.node.get_data_source(0x1017, 0), stream)
+        self.assertEqual(self.node.get_data(0x1017, 0), b"\x05\x00")
+        self.assertTrue(stream.closed)
+
+    def test_lazy_object_dictionary(self):
+        od = epf.import_epf(io.BytesIO(b"""<EPF><Dictionary><Parameters>
+            <Group SymbolName="Control mode">
+            <Parameter Index="0x2000" SubIndex="0" SymbolName="MODE"
+                       DataType="UNSIGNED8" AccessType="rw" DefaultValue="1" />
+            </Group>
+            </Parameters></Dictionary></EPF>"""), lazy=True)
+        node = canopen.LocalNode(2, od)
+        # Objects are only built when accessed
+        self.assertEqual(list(od.pending), [0x2000])
+        self.assertEqual(node.get_data(0x2000, 0), b"\x01")
+        self.assertEqual(od.pending, {})
+
+    def test_callback_routing(self):
+        self.node.add_write_callback(self._callback, 0x1400)
+        self.node.add_write_callback(self._callback, 0x1401, 2)
+        self.node.set_data(0x1400, 1, b"\x01\x02\x00\x00")
+        self.node.set_data(0x1401, 1, b"\x01\x03\x00\x00")
+        self.node.set_data(0x1401, 2, b"\x01")
+        self.node.set_data(0x1401, 0, b"\x05")
+        self.assertEqual(self.calls, [(0x1400, 1), (0x1401, 2)])
+        # Routes are rebuilt when callbacks are added
+        self.node.add_write_callback(self._callback)
+        self.node.set_data(0x1400, 1, b"\x01\x02\x00\x00")
+        self.assertEqual(self.calls[2:], [(0x1400, 1), (0x1400, 1)])
+
+    def test_read_callback_routing(self):
+        self.node.add_read_callback(lambda **kwargs: 5, 0x1017, 0)
+        self.assertEqual(self.node.get_data(0x1017, 0), b"\x05\x00")
+        self.assertEqual(self.node.get_data(0x1018, 1), b"\x01\x00\x00\x00")
+
+
 class TestNMT(unittest.TestCase):
     """
     Test NMT slave.
@@ -254,5 +462,142 @@ class TestPDO(unittest.TestCase):
         self.local_node.pdo.save()
 
 
+class TestTpdoProducer(unittest.TestCase):
+    """
+    Test transmission of TPDOs from a local node.
+    """
+
+    def setUp(self):
+        self.network1 = canopen.Network()
+        self.network1.connect("tpdo", bustype="virtual")
+        self.addCleanup(self.network1.disconnect)
+        self.network2 = canopen.Network()
+        self.network2.connect("tpdo", bustype="virtual")
+        self.addCleanup(self.network2.disconnect)
+        self.local_node = self.network2.create_node(2, EDS_PATH)
+        self.received = []
+        self.network1.subscribe(0x182, self._on_tpdo)
+        self.network1.subscribe(0x282, self._on_tpdo)
+
+        tpdo1 = self.local_node.tpdo[1]
+        tpdo1.clear()
+        tpdo1.add_variable(0x2001)
+        tpdo1.add_variable(0x2004)
+        tpdo1.cob_id = 0x182
+        tpdo1.trans_type = 255
+        tpdo1.inhibit_time = 500  # 50 ms
+        tpdo1.enabled = True
+        tpdo2 = self.local_node.tpdo[2]
+        tpdo2.clear()
+        tpdo2.add_variable(0x2002)
+        tpdo2.cob_id = 0x282
+        tpdo2.trans_type = 2
+        tpdo2.enabled = True
+
+    def _on_tpdo(self, can_id, data, timestamp):
+        self.received.append((can_id, bytes(data)))
+
+    def test_event_driven(self):
+        self.local_node.tpdo_producer.start()
+        self.addCleanup(self.local_node.tpdo_producer.stop)
+        self.local_node.sdo[0x2001].raw = 5
+        self.local_node.sdo[0x2004].raw = 6
+        self.local_node.sdo[0x2001].raw = 7
+        self.assertTrue(wait_for(lambda: len(self.received) >= 1))
+        self.assertEqual(self.received[0], (0x182, b"\x05\x00\x00\x00\x00\x00"))
+        # The last data is sent when the inhibit time has passed
+        self.assertTrue(wait_for(lambda: len(self.received) >= 2))
+        self.assertEqual(self.received[1:], [(0x182, b"\x07\x00\x06\x00\x00\x00")])
+        # Writes to objects which are not mapped do not trigger anything
+        self.local_node.sdo[0x2003].raw = 1
+        time.sleep(0.02)
+        self.assertEqual(len(self.received), 2)
+
+    def test_event_timer(self):
+        self.local_node.tpdo[1].event_timer = 20
+        self.local_node.tpdo[1].inhibit_time = 0
+        self.local_node.tpdo_producer.start()
+        self.assertTrue(wait_for(lambda: len(self.received) >= 4))
+        self.local_node.tpdo_producer.stop()
+        # Let messages sent before stopping arrive
+        time.sleep(0.02)
+        count = len(self.received)
+        time.sleep(0.05)
+        self.assertEqual(len(self.received), count)
+
+    def test_sync(self):
+        self.local_node.tpdo_producer.start()
+        self.addCleanup(self.local_node.tpdo_producer.stop)
+        self.local_node.sdo[0x2002].raw = 3
+        for _ in range(5):
+            self.network2.notify(0x80, b"", time.time())
+        self.assertTrue(wait_for(lambda: len(self.received) >= 2))
+        self.assertEqual(self.received, [(0x282, b"\x03"), (0x282, b"\x03")])
+
+
+class TestRpdoConsumer(unittest.TestCase):
+    """
+    Test reception of RPDOs by a local node.
+    """
+
+    def setUp(self):
+        self.network1 = canopen.Network()
+        self.network1.connect("rpdo", bustype="virtual")
+        self.addCleanup(self.network1.disconnect)
+        self.network2 = canopen.Network()
+        self.network2.connect("rpdo", bustype="virtual")
+        self.addCleanup(self.network2.disconnect)
+        self.local_node = self.network2.create_node(2, EDS_PATH)
+        self.writes = []
+        self.local_node.add_write_callback(self._on_write)
+
+        rpdo1 = self.local_node.rpdo[1]
+        rpdo1.clear()
+        rpdo1.add_variable(0x2001)
+        rpdo1.add_variable(0x2004)
+        rpdo1.cob_id = 0x202
+        rpdo1.trans_type = 255
+        rpdo1.enabled = True
+        rpdo2 = self.local_node.rpdo[2]
+        rpdo2.clear()
+        rpdo2.add_variable(0x2002)
+        rpdo2.cob_id = 0x302
+        rpdo2.trans_type = 1
+        rpdo2.enabled = True
+        self.local_node.rpdo_consumer.start()
+        self.addCleanup(self.local_node.rpdo_consumer.stop)
+
+    def _on_write(self, index, subindex, data, **kwargs):
+        self.writes.append((index, subindex, data))
+
+    def test_event_driven(self):
+        self.network1.send_message(0x202, b"\x05\x00\x06\x00\x00\x00")
+        self.network1.send_message(0x202, b"\x05\x00\x07\x00\x00\x00")
+        self.assertTrue(wait_for(lambda: len(self.writes) >= 3))
+        self.assertEqual(self.local_node.sdo[0x2001].raw, 5)
+        self.assertEqual(self.local_node.sdo[0x2004].raw, 7)
+        # Callbacks are only called for changed values
+        self.assertEqual(self.writes, [
+            (0x2001, 0, b"\x05\x00"),
+            (0x2004, 0, b"\x06\x00\x00\x00"),
+            (0x2004, 0, b"\x07\x00\x00\x00"),
+        ])
+
+    def test_too_short(self):
+        self.network1.send_message(0x202, b"\x05\x00")
+        time.sleep(0.05)
+        self.assertEqual(self.writes, [])
+
+    def test_sync(self):
+        self.network1.send_message(0x302, b"\x01")
+        self.network1.send_message(0x302, b"\x02")
+        time.sleep(0.05)
+        self.assertEqual(self.writes, [])
+        # Only the latest data is written on SYNC
+        self.network1.send_message(0x80, b"")
+        self.assertTrue(wait_for(lambda: self.writes))
+        self.assertEqual(self.writes, [(0x2002, 0, b"\x02")])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,142 @@
+import struct
+import threading
+import unittest
+import canopen
+from canopen import lss
+from util import wait_for
+
+
+class LssSlave(object):
+    """Minimal LSS slave answering on a network."""
+
+    def __init__(self, network, lss_address, node_id=0xFF, delay=0):
+        self.network = network
+        #: Delay of the fast scan responses after the first one
+        self.delay = delay
+        self.fast_scan_requests = 0
+        self.lss_address = lss_address
+        self.node_id = node_id
+        self.stored = False
+        self.configuration = False
+        self.lss_pos = 0
+        self.selected = 0
+        network.subscribe(0x7E5, self.on_request)
+
+    def respond(self, *values, **kwargs):
+        data = bytearray(8)
+        data[:len(values)] = values
+        delay = kwargs.get("delay", 0)
+        if delay:
+            threading.Timer(delay, self.network.send_message, (0x7E4, data)).start()
+        else:
+            self.network.send_message(0x7E4, data)
+
+    def on_request(self, can_id, data, timestamp):
+        cs = data[0]
+        if cs == lss.CS_SWITCH_STATE_GLOBAL:
+            self.configuration = data[1] == 1
+        elif (lss.CS_SWITCH_STATE_SELECTIVE_VENDOR_ID <= cs <=
+              lss.CS_SWITCH_STATE_SELECTIVE_SERIAL_NUMBER):
+            part = cs - lss.CS_SWITCH_STATE_SELECTIVE_VENDOR_ID
+            value, = struct.unpack_from("<L", data, 1)
+            if value == self.lss_address[part] and self.selected == part:
+                self.selected += 1
+            else:
+                self.selected = 0
+            if self.selected == 4:
+                self.selected = 0
+                self.configuration = True
+                self.respond(lss.CS_SWITCH_STATE_SELECTIVE_RESPONSE)
+        elif cs == lss.CS_FAST_SCAN:
+            if self.node_id != 0xFF:
+                return
+            self.fast_scan_requests += 1
+            id_number, bit_check, lss_sub, lss_next = struct.unpack_from("<LBBB", data, 1)
+            if bit_check == 128:
+                self.lss_pos = 0
+                self.respond(lss.CS_IDENTIFY_SLAVE)
+            elif lss_sub == self.lss_pos:
+                if (id_number ^ self.lss_address[lss_sub]) >> bit_check == 0:
+                    self.lss_pos = lss_next
+                    if bit_check == 0 and lss_next < lss_sub:
+                        self.configuration = True
+                    self.respond(lss.CS_IDENTIFY_SLAVE, delay=self.delay)
+        elif not self.configuration:
+            return
+        elif cs == lss.CS_CONFIGURE_NODE_ID:
+            self.node_id = data[1]
+            self.respond(cs, 0)
+        elif cs == lss.CS_STORE_CONFIGURATION:
+            self.stored = True
+            self.respond(cs, 0)
+        elif cs == lss.CS_INQUIRE_NODE_ID:
+            self.respond(cs, self.node_id)
+
+
+class TestLss(unittest.TestCase):
+
+    def setUp(self):
+        self.master = canopen.Network()
+        self.master.connect("lss", bustype="virtual")
+        self.addCleanup(self.master.disconnect)
+        self.slaves = canopen.Network()
+        self.slaves.connect("lss", bustype="virtual")
+        self.addCleanup(self.slaves.disconnect)
+        self.lss = self.master.lss
+        self.lss.RESPONSE_TIMEOUT = 0.1
+
+    def test_fast_scan(self):
+        LssSlave(self.slaves, [0x22, 0x12345678, 0x555, 0xABCDEF])
+        found, lss_id = self.lss.fast_scan(adaptive=True)
+        self.assertTrue(found)
+        self.assertEqual(lss_id, [0x22, 0x12345678, 0x555, 0xABCDEF])
+
+    def test_fast_scan_no_slave(self):
+        # A stray response must not be taken for a slave
+        self.lss.responses.put(bytes(bytearray([lss.CS_IDENTIFY_SLAVE])))
+        self.assertEqual(self.lss.fast_scan(), (False, None))
+
+    def test_fast_scan_slower_responses(self):
+        # Much slower than the first response, but within the minimum
+        slave = LssSlave(self.slaves, [0x22, 0x12345678, 0x555, 0xABCDEF],
+                         delay=0.01)
+        found, lss_id = self.lss.fast_scan(adaptive=True)
+        self.assertTrue(found)
+        self.assertEqual(lss_id, [0x22, 0x12345678, 0x555, 0xABCDEF])
+        # Not repeated with the full timeout
+        self.assertEqual(slave.fast_scan_requests, 1 + 4 * 33)
+
+    def test_fast_scan_all(self):
+        slave1 = LssSlave(self.slaves, [0x22, 0x1, 0x1, 0x5])
+        slave2 = LssSlave(self.slaves, [0x22, 0x1, 0x1, 0x3])
+        LssSlave(self.slaves, [0x22, 0x1, 0x1, 0x7], node_id=20)
+        results = self.lss.fast_scan_all([10, 11, 12], store=True)
+        self.assertEqual([(r.node_id, r.lss_address) for r in results],
+                         [(10, [0x22, 0x1, 0x1, 0x3]),
+                          (11, [0x22, 0x1, 0x1, 0x5])])
+        self.assertTrue(all(r.success and r.elapsed > 0 for r in results))
+        self.assertEqual(slave1.node_id, 11)
+        self.assertEqual(slave2.node_id, 10)
+        self.assertTrue(slave2.stored)
+        self.assertFalse(slave2.configuration)
+
+    def test_commission(self):
+        slave1 = LssSlave(self.slaves, [0x22, 0x1, 0x1, 0x5])
+        slave2 = LssSlave(self.slaves, [0x22, 0x1, 0x1, 0x3])
+        results = self.lss.commission([
+            ([0x22, 0x1, 0x1, 0x5], 5),
+            ([0x22, 0x1, 0x1, 0x4], 6),
+            ([0x22, 0x1, 0x1, 0x3], 7, 0.001),
+        ], delay=0)
+        self.assertEqual([r.success for r in results], [True, False, True])
+        self.assertEqual(str(results[1].error), "Slave did not respond")
+        self.assertEqual(slave1.node_id, 5)
+        self.assertTrue(slave1.stored)
+        self.assertFalse(slave1.configuration)
+        self.assertEqual(slave2.node_id, 7)
+        # Switching to waiting state is not answered
+        self.assertTrue(wait_for(lambda: not slave2.configuration))
+
+
+if __name__ == "__main__":
+    unittest.main()
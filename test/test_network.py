@@ -1,3 +1,4 @@
+import threading
 import time
 import os
 import unittest
@@ -23,6 +24,21 @@ class TestNetwork(unittest.TestCase):
         self.assertEqual(self.network[2], node)
         self.assertEqual(len(self.network), 2)
 
+    def test_add_nodes(self):
+        od = self.network[2].object_dictionary
+        nodes = self.network.add_nodes(
+            [(4, EDS_PATH), (5, EDS_PATH), (6, od)], workers=2)
+        self.assertEqual([node.id for node in nodes], [4, 5, 6])
+        self.assertEqual(len(self.network), 5)
+        for node in nodes:
+            self.assertIsInstance(node, canopen.RemoteNode)
+            self.assertIs(self.network[node.id], node)
+            self.assertIs(node.network, self.network)
+        self.assertIs(nodes[2].object_dictionary, od)
+        # $NODEID expressions resolved per node
+        self.assertEqual(nodes[0].object_dictionary[0x1400][1].default, 0x204)
+        self.assertEqual(nodes[1].object_dictionary[0x1400][1].default, 0x205)
+
     def test_notify(self):
         node = self.network[2]
         self.network.notify(0x82, b'\x01\x20\x02\x00\x01\x02\x03\x04', 1473418396.0)
@@ -31,6 +47,22 @@ class TestNetwork(unittest.TestCase):
         self.assertEqual(node.nmt.state, 'OPERATIONAL')
         self.assertListEqual(self.network.scanner.nodes, [2])
 
+    def test_concurrent_subscribe(self):
+        network = canopen.Network()
+        callbacks = [lambda *args: None for _ in range(200)]
+
+        def subscribe(callbacks):
+            for callback in callbacks:
+                network.subscribe(0x123, callback)
+
+        threads = [threading.Thread(target=subscribe, args=(callbacks[i::4], ))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(network.subscribers[0x123]), 200)
+
     def test_send_perodic(self):
         bus = can.interface.Bus(bustype="virtual", channel=1)
         self.network.connect(bustype="virtual", channel=1)
@@ -59,6 +91,44 @@ class TestScanner(unittest.TestCase):
         scanner.on_message_received(0x586)
         self.assertListEqual(scanner.nodes, [6, 7])
 
+    def test_active_scanning(self):
+        network1 = canopen.Network()
+        network1.connect("scan", bustype="virtual")
+        self.addCleanup(network1.disconnect)
+        network2 = canopen.Network()
+        network2.connect("scan", bustype="virtual")
+        self.addCleanup(network2.disconnect)
+        node = network2.create_node(4, EDS_PATH)
+        node.sdo[0x1018][4].raw = 0x12345678
+        network2.create_node(9, EDS_PATH)
+
+        start = time.time()
+        identities = network1.scanner.scan(limit=10, timeout=5,
+                                           bitrate=1000000, device_type=True)
+        # Ended after a quiet period, long before the timeout
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(sorted(identities), [4, 9])
+        identity = identities[4]
+        self.assertEqual(identity.node_id, 4)
+        self.assertEqual(identity.vendor_id, 1)
+        self.assertIsNone(identity.product_code)
+        self.assertEqual(identity.serial_number, 0x12345678)
+        self.assertIsNone(identity.device_type)
+        self.assertIsNone(identities[9].serial_number)
+
+    def test_expedited_without_size(self):
+        network = canopen.Network()
+        sent = []
+        network.send_message = lambda can_id, data: sent.append(can_id)
+        scan = canopen.network._IdentityScan(network, [5], [(0x1018, 1)])
+        scan.start()
+        scan.request(5)
+        network.notify(0x585, b'\x42\x18\x10\x01\x78\x56\x34\x12', 1.0)
+        scan.wait(1, 0.05)
+        scan.stop()
+        self.assertEqual(sent, [0x605])
+        self.assertEqual(scan.identities[5].vendor_id, 0x12345678)
+
 
 if __name__ == "__main__":
     unittest.main()
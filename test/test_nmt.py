@@ -0,0 +1,218 @@
+import os
+import threading
+import unittest
+import canopen
+from canopen.objectdictionary import Variable, UNSIGNED8, UNSIGNED16
+from util import wait_for
+
+EDS_PATH = os.path.join(os.path.dirname(__file__), 'sample.eds')
+
+
+class TestHeartbeatMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.network = canopen.Network()
+        self.addCleanup(self.network.scheduler.stop)
+        self.monitor = self.network.heartbeat
+        self.events = []
+        self.event_received = threading.Event()
+        self.monitor.add_callback(self.on_event)
+
+    def on_event(self, node_id, alive):
+        self.events.append((node_id, alive))
+        self.event_received.set()
+
+    def test_loss_and_recovery(self):
+        self.monitor.watch(5, 0.05)
+        self.monitor.watch_consumer_entries([0x00060064, 0x00070000])
+        self.assertEqual(sorted(self.monitor.consumers), [5, 6])
+        self.assertEqual(self.monitor.consumers[6].period, 0.1)
+
+        self.network.notify(0x705, b"\x7f", 100.0)
+        consumer = self.monitor.consumers[5]
+        self.assertTrue(consumer.alive)
+        self.assertEqual(consumer.state, 127)
+        self.assertTrue(self.event_received.wait(1))
+        self.assertEqual(self.events, [(5, False)])
+        self.assertFalse(consumer.alive)
+        self.assertEqual(consumer.losses, 1)
+
+        self.network.notify(0x705, b"\x05", 101.0)
+        self.assertEqual(self.events, [(5, False), (5, True)])
+        self.assertTrue(consumer.alive)
+        self.monitor.stop()
+        self.assertEqual(self.monitor.consumers, {})
+
+    def test_statistics(self):
+        consumer = self.monitor.watch(5, 1)
+        for timestamp in (10.0, 10.1, 10.3, 10.4):
+            self.network.notify(0x705, b"\x05", timestamp)
+        self.monitor.unwatch(5)
+        self.assertEqual(consumer.count, 4)
+        self.assertAlmostEqual(consumer.mean_interval, 0.4 / 3)
+        self.assertAlmostEqual(consumer.min_interval, 0.1)
+        self.assertAlmostEqual(consumer.max_interval, 0.2)
+        self.assertAlmostEqual(consumer.jitter, 0.0577, places=4)
+        self.assertEqual(self.events, [])
+
+
+class TestWaitForBootups(unittest.TestCase):
+
+    def setUp(self):
+        self.network = canopen.Network()
+
+    def send_later(self, delay, can_id, data, timestamp):
+        timer = threading.Timer(
+            delay, self.network.notify, (can_id, data, timestamp))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_wait_for_bootups(self):
+        self.send_later(0.01, 0x702, b"\x00", 10.0)
+        self.send_later(0.02, 0x703, b"\x05", 11.0)
+        self.send_later(0.03, 0x703, b"\x00", 12.0)
+        timestamps = self.network.nmt.wait_for_bootups([2, 3], timeout=1)
+        self.assertEqual(timestamps, {2: 10.0, 3: 12.0})
+        self.assertEqual(self.network.subscribers[0x702], [])
+
+    def test_wait_for_bootups_timeout(self):
+        waiter = self.network.nmt.expect_heartbeats([2, 3, 4], bootup=True)
+        self.network.notify(0x703, b"\x00", 10.0)
+        with self.assertRaises(canopen.nmt.NmtError) as cm:
+            waiter.wait(0.01)
+        self.assertEqual(str(cm.exception),
+                         "No boot-up received from node(s) 2, 4")
+
+    def test_wait_for_heartbeats(self):
+        self.send_later(0.01, 0x702, b"\x7f", 10.0)
+        self.send_later(0.01, 0x703, b"\x05", 11.0)
+        waiter = self.network.nmt.expect_heartbeats([2, 3])
+        self.assertEqual(waiter.wait(1), {2: 10.0, 3: 11.0})
+        self.assertEqual(waiter.states, {2: 127, 3: 5})
+
+    def test_wait_for_bootups_async(self):
+        try:
+            import asyncio
+        except ImportError:
+            self.skipTest("asyncio not available")
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        future = self.network.nmt.wait_for_bootups_async([2, 3], 1, loop)
+        self.send_later(0.01, 0x702, b"\x00", 10.0)
+        self.send_later(0.02, 0x703, b"\x00", 11.0)
+        timestamps = loop.run_until_complete(future)
+        self.assertEqual(timestamps, {2: 10.0, 3: 11.0})
+
+        future = self.network.nmt.wait_for_bootups_async([2], 0.01, loop)
+        with self.assertRaises(canopen.nmt.NmtError):
+            loop.run_until_complete(future)
+
+
+class TestNodeGuarding(unittest.TestCase):
+
+    def setUp(self):
+        self.master = canopen.Network()
+        self.master.connect("guarding", bustype="virtual")
+        self.addCleanup(self.master.disconnect)
+        self.slaves = canopen.Network()
+        self.slaves.connect("guarding", bustype="virtual")
+        self.addCleanup(self.slaves.disconnect)
+
+        self.slave = self.slaves.create_node(2, EDS_PATH)
+        guard_time = Variable("Guard time", 0x100C)
+        guard_time.data_type = UNSIGNED16
+        guard_time.value = 20
+        life_time_factor = Variable("Life time factor", 0x100D)
+        life_time_factor.data_type = UNSIGNED8
+        life_time_factor.value = 2
+        self.slave.object_dictionary.add_object(guard_time)
+        self.slave.object_dictionary.add_object(life_time_factor)
+        self.slave.nmt.state = "PRE-OPERATIONAL"
+        self.life_events = []
+        self.slave.nmt.add_life_guarding_callback(self.life_events.append)
+
+        self.events = []
+        self.master.guarding.add_callback(
+            lambda node_id, event: self.events.append((node_id, event)))
+
+    def test_guarding(self):
+        node = self.master.add_node(2, EDS_PATH)
+        guarded = node.nmt.start_node_guarding(0.01, 3)
+        self.assertTrue(wait_for(lambda: guarded.count >= 3))
+        self.assertTrue(guarded.alive)
+        self.assertEqual(guarded.state, 127)
+        self.assertEqual(node.nmt.state, "PRE-OPERATIONAL")
+        self.assertEqual(guarded.toggle_errors, 0)
+
+        # Slave repeats the toggle bit
+        self.slave.nmt._toggle ^= 0x80
+        self.assertTrue(wait_for(lambda: self.events))
+        self.assertEqual(self.events[0], (2, "TOGGLE ERROR"))
+        self.assertEqual(guarded.toggle_errors, 1)
+
+        # Master stops guarding
+        node.nmt.stop_node_guarding()
+        self.assertEqual(self.master.guarding.nodes, {})
+        self.assertTrue(wait_for(lambda: self.life_events == [False]))
+        self.master.guarding.guard(2, 0.01, 3)
+        self.assertTrue(wait_for(lambda: self.life_events == [False, True]))
+
+        # Slave disappears
+        del self.slaves[2]
+        self.assertTrue(wait_for(lambda: (2, "LOST") in self.events))
+        self.assertEqual(self.events, [(2, "TOGGLE ERROR"), (2, "LOST")])
+        self.master.guarding.stop()
+
+
+class TestTransition(unittest.TestCase):
+
+    def setUp(self):
+        self.master = canopen.Network()
+        self.master.connect("transition", bustype="virtual")
+        self.addCleanup(self.master.disconnect)
+        self.slaves = canopen.Network()
+        self.slaves.connect("transition", bustype="virtual")
+        self.addCleanup(self.slaves.disconnect)
+        for node_id in (2, 3):
+            node = self.slaves.create_node(node_id, EDS_PATH)
+            node.nmt.state = "PRE-OPERATIONAL"
+            node.sdo[0x1017].raw = 10
+
+    def test_transition(self):
+        failed = self.master.nmt.transition([2, 3], "OPERATIONAL", 1)
+        self.assertEqual(failed, set())
+        self.assertEqual(self.slaves[2].nmt.state, "OPERATIONAL")
+
+        # Node 4 is not on the bus
+        self.master.add_node(2, EDS_PATH)
+        self.master.add_node(4, EDS_PATH)
+        self.master.add_node(5, EDS_PATH)
+        failed = self.master.nmt.transition([2, 4], "STOPPED", 0.1)
+        self.assertEqual(failed, {4})
+        self.assertEqual(self.slaves[2].nmt.state, "STOPPED")
+        # Only the requested nodes are affected
+        self.assertEqual(self.slaves[3].nmt.state, "OPERATIONAL")
+        self.assertEqual(self.master[2].nmt.state, "STOPPED")
+
+    def test_transition_empty_network(self):
+        self.master.nmt.transition([2, 3], "OPERATIONAL", 1)
+        # No nodes have been added to the master, so no broadcast is used
+        failed = self.master.nmt.transition([2], "STOPPED", 1)
+        self.assertEqual(failed, set())
+        self.assertEqual(self.slaves[2].nmt.state, "STOPPED")
+        self.assertEqual(self.slaves[3].nmt.state, "OPERATIONAL")
+
+    def test_invalid_state(self):
+        with self.assertRaises(ValueError):
+            self.master.nmt.transition([2], "RUNNING")
+
+    def test_expect_state(self):
+        waiter = self.master.nmt.expect_heartbeats([2, 3], state="STOPPED")
+        with self.assertRaises(canopen.nmt.NmtError) as cm:
+            waiter.wait(0.05)
+        self.assertEqual(str(cm.exception),
+                         "No STOPPED heartbeat received from node(s) 2, 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
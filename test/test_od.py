@@ -1,4 +1,7 @@
+import copy
+import pickle
 import unittest
+import weakref
 from canopen import objectdictionary as od
 
 
@@ -52,6 +55,70 @@ class TestDataConversions(unittest.TestCase):
         self.assertEqual(var.decode_raw(b"\xfe\xff\xff\xff"), -2)
         self.assertEqual(var.encode_raw(-2), b"\xfe\xff\xff\xff")
 
+    def test_unsigned64(self):
+        var = od.Variable("Test UNSIGNED64", 0x1000)
+        var.data_type = od.UNSIGNED64
+        self.assertEqual(var.decode_raw(b"\xff" * 8), 2 ** 64 - 1)
+        self.assertEqual(var.encode_raw(1), b"\x01" + b"\x00" * 7)
+
+    def test_integer64(self):
+        var = od.Variable("Test INTEGER64", 0x1000)
+        var.data_type = od.INTEGER64
+        self.assertEqual(var.decode_raw(b"\xfe" + b"\xff" * 7), -2)
+        self.assertEqual(var.encode_raw(-2), b"\xfe" + b"\xff" * 7)
+
+    def test_real32(self):
+        var = od.Variable("Test REAL32", 0x1000)
+        var.data_type = od.REAL32
+        self.assertEqual(var.decode_raw(b"\x00\x00\x80\x3f"), 1.0)
+        self.assertEqual(var.encode_raw(1.0), b"\x00\x00\x80\x3f")
+        self.assertEqual(var.decode_phys(1.5), 1.5)
+
+    def test_real64(self):
+        var = od.Variable("Test REAL64", 0x1000)
+        var.data_type = od.REAL64
+        self.assertEqual(var.decode_raw(b"\x00" * 6 + b"\xf0\x3f"), 1.0)
+        self.assertEqual(var.encode_raw(1.0), b"\x00" * 6 + b"\xf0\x3f")
+
+    def test_wrong_size(self):
+        var = od.Variable("Test UNSIGNED16", 0x1000)
+        var.data_type = od.UNSIGNED16
+        with self.assertRaises(od.ObjectDictionaryError):
+            var.decode_raw(b"\x01")
+        with self.assertRaises(ValueError):
+            var.encode_raw(0x10000)
+
+    def test_change_data_type(self):
+        var = od.Variable("Test", 0x1000)
+        with self.assertRaises(od.ObjectDictionaryError):
+            var.encode_raw(1)
+        var.data_type = od.UNSIGNED8
+        self.assertEqual(var.encode_raw(1), b"\x01")
+        var.data_type = od.UNSIGNED16
+        self.assertEqual(var.encode_raw(1), b"\x01\x00")
+        self.assertEqual(var.decode_raw(b"\x01\x00"), 1)
+
+    def test_copy_and_pickle(self):
+        var = od.Variable("Test INTEGER16", 0x1000)
+        var.data_type = od.INTEGER16
+        var.factor = 0.5
+        self.assertEqual(var.decode_phys(2), 1.0)
+        for other in (copy.copy(var), pickle.loads(pickle.dumps(var))):
+            other.factor = 2
+            self.assertEqual(other.decode_phys(2), 4)
+            self.assertEqual(other.encode_raw(-2), b"\xfe\xff")
+        self.assertEqual(var.decode_phys(2), 1.0)
+
+    def test_no_reference_cycle(self):
+        var = od.Variable("Test UNSIGNED16", 0x1000)
+        var.data_type = od.UNSIGNED16
+        var.factor = 2
+        self.assertEqual(var.encode_phys_data(4), b"\x02\x00")
+        ref = weakref.ref(var)
+        del var
+        # Freed by reference counting alone
+        self.assertIsNone(ref())
+
     def test_visible_string(self):
         var = od.Variable("Test VISIBLE_STRING", 0x1000)
         var.data_type = od.VISIBLE_STRING
@@ -69,6 +136,10 @@ class TestAlternativeRepresentations(unittest.TestCase):
 
         self.assertAlmostEqual(var.decode_phys(128), 12.8)
         self.assertEqual(var.encode_phys(-0.1), -1)
+        self.assertAlmostEqual(var.decode_phys_data(b"\x80\x00"), 12.8)
+        self.assertEqual(var.encode_phys_data(-0.1), b"\xff\xff")
+        var.factor = 2
+        self.assertEqual(var.decode_phys(128), 256)
 
     def test_desc(self):
         var = od.Variable("Test UNSIGNED8", 0x1000)
@@ -122,6 +193,48 @@ class TestObjectDictionary(unittest.TestCase):
         self.assertEqual(test_od["Test Array"], array)
         self.assertEqual(test_od[0x1002], array)
 
+    def test_lookup_member(self):
+        test_od = od.ObjectDictionary()
+        record = od.Record("Test Record", 0x1001)
+        test_od.add_object(record)
+        # Members added after the record has been added to the dictionary
+        var = od.Variable("Test Subindex", 0x1001, 1)
+        record.add_member(var)
+        self.assertEqual(test_od["Test Record.Test Subindex"], var)
+        self.assertEqual(test_od[(0x1001, 1)], var)
+        self.assertIn((0x1001, 1), test_od)
+        del record[1]
+        self.assertNotIn((0x1001, 1), test_od)
+        self.assertNotIn("Test Record.Test Subindex", test_od)
+
+    def test_lookup_empty_record(self):
+        test_od = od.ObjectDictionary()
+        record = od.Record("Empty Record", 0x1001)
+        test_od.add_object(record)
+        self.assertIs(test_od["Empty Record"], record)
+        self.assertIs(test_od[0x1001], record)
+
+    def test_lookup_tuple_of_variable(self):
+        test_od = od.ObjectDictionary()
+        var = od.Variable("Test Variable", 0x1000)
+        test_od.add_object(var)
+        self.assertIs(test_od[(0x1000, 0)], var)
+        with self.assertRaises(KeyError):
+            test_od[(0x1000, 1)]
+        self.assertIsNone(test_od.get((0x1000, 1)))
+        self.assertNotIn((0x1000, 1), test_od)
+
+    def test_iteration_order(self):
+        test_od = od.ObjectDictionary()
+        test_od.add_object(od.Variable("Variable 2", 0x2000))
+        test_od.add_object(od.Variable("Variable 1", 0x1000))
+        self.assertEqual(list(test_od), [0x1000, 0x2000])
+        test_od.add_object(od.Variable("Variable 3", 0x1800))
+        self.assertEqual(list(test_od), [0x1000, 0x1800, 0x2000])
+        del test_od[0x1000]
+        self.assertEqual(list(test_od), [0x1800, 0x2000])
+        self.assertNotIn("Variable 1", test_od)
+
 
 class TestArray(unittest.TestCase):
 
@@ -0,0 +1,316 @@
+import os
+import threading
+import time
+import unittest
+import canopen
+from canopen.objectdictionary import Variable, INTEGER32
+from canopen.profiles.p402 import (
+    BaseNode402, State402, Homing, AxisGroup, enable_all, set_op_mode_all)
+from util import wait_for
+
+EDS_PATH = os.path.join(os.path.dirname(__file__), 'sample.eds')
+
+
+class MappedValue(object):
+
+    def __init__(self, index, raw):
+        self.index = index
+        self.raw = raw
+
+
+class SimulatedDrive(BaseNode402):
+    """Answers each Controlword with a TPDO containing the new Statusword."""
+
+    STATUSWORDS = {
+        0x00: 0x40,  # Disable voltage
+        0x02: 0x07,  # Quick stop
+        0x06: 0x21,  # Shutdown
+        0x07: 0x23,  # Switch on
+        0x0F: 0x27,  # Enable operation
+        0x80: 0x40,  # Fault reset
+    }
+
+    def __init__(self, node_id, responding=True, delay=0.005):
+        super(SimulatedDrive, self).__init__(node_id, EDS_PATH)
+        self.tpdo_values[0x6041] = 0x40
+        self.tpdo_values[0x6061] = 0
+        # Profiled position, homing and cyclic synchronous position
+        self._op_mode_support = 0xA1
+        self.responding = responding
+        self.delay = delay
+        self.controlwords = []
+        self.op_modes = []
+
+    @property
+    def controlword(self):
+        raise RuntimeError('This property has no getter.')
+
+    @controlword.setter
+    def controlword(self, value):
+        self.controlwords.append(value)
+        if self.responding:
+            timer = threading.Timer(self.delay, self.send_statusword,
+                                    (self.STATUSWORDS[value],))
+            timer.start()
+
+    def _send_op_mode(self, code):
+        self.op_modes.append(code)
+        if self.responding:
+            timer = threading.Timer(0.005, self.on_TPDOs_update_callback,
+                                    ([MappedValue(0x6061, code)],))
+            timer.start()
+
+    def send_statusword(self, statusword):
+        self.on_TPDOs_update_callback([MappedValue(0x6041, statusword)])
+
+
+class CountingDrive(SimulatedDrive):
+    """Counts how many times the state is read."""
+
+    reads = 0
+
+    @property
+    def state(self):
+        self.reads += 1
+        return SimulatedDrive.state.fget(self)
+
+
+class TestStateMachine(unittest.TestCase):
+
+    def test_state(self):
+        drive = SimulatedDrive(2)
+        self.assertEqual(drive.state, 'SWITCH ON DISABLED')
+        drive.state = 'OPERATION ENABLED'
+        self.assertEqual(drive.state, 'OPERATION ENABLED')
+        self.assertEqual(drive.controlwords, [0x06, 0x07, 0x0F])
+        drive.state = 'SWITCHED ON'
+        self.assertEqual(drive.state, 'SWITCHED ON')
+
+    def test_illegal_transition(self):
+        drive = SimulatedDrive(2)
+        with self.assertRaises(ValueError):
+            drive.state = 'SWITCHED ON'
+
+    def test_wait_for_statusword(self):
+        drive = SimulatedDrive(2)
+        self.assertFalse(drive.wait_for_statusword(lambda sw: sw == 0x21, 0.01))
+        threading.Timer(0.01, drive.send_statusword, (0x21, )).start()
+        self.assertTrue(drive.wait_for_statusword(lambda sw: sw == 0x21, 1))
+
+    def test_enable_all(self):
+        drives = [SimulatedDrive(node_id) for node_id in range(1, 31)]
+        start = time.time()
+        enable_all(drives, timeout=2)
+        # Transitions of all drives are done in parallel
+        self.assertLess(time.time() - start, 0.3)
+        for drive in drives:
+            self.assertEqual(drive.state, 'OPERATION ENABLED')
+            self.assertEqual(drive.controlwords, [0x06, 0x07, 0x0F])
+            self.assertEqual(drive._state_listeners, [])
+
+    def test_enable_all_slow_node(self):
+        fast = SimulatedDrive(1)
+        slow = CountingDrive(2, delay=0.2)
+        # Generators are accepted too
+        enable_all((drive for drive in [fast, slow]), timeout=2)
+        self.assertEqual(slow.state, 'OPERATION ENABLED')
+        self.assertEqual(fast._state_listeners, [])
+        self.assertEqual(slow._state_listeners, [])
+        # Only woken up by state changes, not busy waiting after the fast
+        # node has been enabled
+        self.assertLess(slow.reads, 30)
+
+    def test_enable_all_timeout(self):
+        drives = [SimulatedDrive(1), SimulatedDrive(2, responding=False)]
+        with self.assertRaises(RuntimeError) as cm:
+            enable_all(drives, timeout=0.5)
+        self.assertEqual(str(cm.exception), 'Timeout when enabling node(s) 2')
+        self.assertEqual(drives[0].state, 'OPERATION ENABLED')
+        # Controlword is repeated when there is no response
+        self.assertEqual(drives[1].controlwords, [0x06, 0x06])
+
+
+class TestOperationMode(unittest.TestCase):
+
+    def test_op_mode(self):
+        drive = SimulatedDrive(2)
+        drive.state = 'OPERATION ENABLED'
+        drive.op_mode = 'HOMING'
+        self.assertEqual(drive.op_mode, 'HOMING')
+        self.assertEqual(drive.op_modes, [6])
+        # Switched on while changing mode
+        self.assertEqual(drive.controlwords, [0x06, 0x07, 0x0F, 0x07, 0x0F])
+        self.assertEqual(drive.state, 'OPERATION ENABLED')
+        # Nothing is sent if the mode is already set
+        drive.op_mode = 'HOMING'
+        self.assertEqual(drive.op_modes, [6])
+
+    def test_op_mode_not_supported(self):
+        drive = SimulatedDrive(2)
+        with self.assertRaises(TypeError):
+            drive.op_mode = 'PROFILED TORQUE'
+        self.assertEqual(drive.op_modes, [])
+
+    def test_set_op_mode_all(self):
+        drives = [SimulatedDrive(node_id) for node_id in range(1, 21)]
+        enable_all(drives[:10], timeout=2)
+        start = time.time()
+        set_op_mode_all(drives, 'CYCLIC SYNCHRONOUS POSITION')
+        # Mode changes of all drives are done in parallel
+        self.assertLess(time.time() - start, 0.3)
+        for drive in drives:
+            self.assertEqual(drive.op_mode, 'CYCLIC SYNCHRONOUS POSITION')
+        for drive in drives[:10]:
+            self.assertEqual(drive.state, 'OPERATION ENABLED')
+            self.assertEqual(drive.controlwords, [0x06, 0x07, 0x0F, 0x07, 0x0F])
+        for drive in drives[10:]:
+            self.assertEqual(drive.controlwords, [])
+
+    def test_set_op_mode_all_timeout(self):
+        drives = [SimulatedDrive(1), SimulatedDrive(2, responding=False)]
+        with self.assertRaises(RuntimeError) as cm:
+            set_op_mode_all(drives, 'HOMING', timeout=0.1)
+        self.assertEqual(str(cm.exception),
+                         'Timeout setting the mode of operation of node(s) 2')
+        self.assertEqual(drives[0].op_mode, 'HOMING')
+
+
+class TestStatuswordDecoding(unittest.TestCase):
+
+    @staticmethod
+    def scan(states, statusword):
+        for key, (mask, value) in states.items():
+            if statusword & mask == value:
+                return key
+
+    def test_lookup_tables(self):
+        for statusword in range(0x10000):
+            self.assertEqual(BaseNode402._decode_state(statusword),
+                             self.scan(State402.SW_MASK, statusword) or 'UNKNOWN')
+            self.assertEqual(BaseNode402._homing_status(statusword),
+                             self.scan(Homing.STATES, statusword))
+
+    def test_state_from_tpdo(self):
+        drive = SimulatedDrive(2)
+        drive.send_statusword(0x1637)
+        self.assertEqual(drive.state, 'OPERATION ENABLED')
+        self.assertEqual(drive._homing_status(drive.statusword), 'TARGET REACHED')
+        drive.send_statusword(0x0008)
+        self.assertEqual(drive.state, 'FAULT')
+
+
+class TestAxisGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.network = canopen.Network()
+        self.network.connect("axes", bustype="virtual")
+        self.addCleanup(self.network.disconnect)
+        self.nodes = []
+        for node_id in (1, 2):
+            node = self.network.add_node(BaseNode402(node_id, EDS_PATH))
+            for index, name in ((0x607A, 'Target position'),
+                                (0x6064, 'Position actual value')):
+                var = Variable(name, index)
+                var.data_type = INTEGER32
+                node.object_dictionary.add_object(var)
+            pdo = node.rpdo[1]
+            pdo.clear()
+            pdo.add_variable(0x607A)
+            pdo.cob_id = 0x200 + node_id
+            node.rpdo_pointers[0x607A] = pdo[0x607A]
+            node.tpdo_values[0x6064] = 0
+            self.nodes.append(node)
+        # Capture the RPDOs on a second network
+        self.bus = canopen.Network()
+        self.bus.connect("axes", bustype="virtual")
+        self.addCleanup(self.bus.disconnect)
+        self.received = []
+        self.event = threading.Event()
+        for node_id in (1, 2):
+            self.bus.subscribe(0x200 + node_id, self.on_rpdo)
+
+    def on_rpdo(self, can_id, data, timestamp):
+        self.received.append((can_id, bytes(data)))
+        self.event.set()
+
+    def sync(self, timestamp):
+        self.event.clear()
+        self.network.notify(0x80, b"", timestamp)
+
+    def test_not_mapped(self):
+        del self.nodes[1].rpdo_pointers[0x607A]
+        with self.assertRaises(ValueError):
+            AxisGroup(self.nodes)
+
+    def test_latency(self):
+        with self.assertRaises(ValueError):
+            AxisGroup(self.nodes, latency=0)
+
+    def test_load(self):
+        group = AxisGroup(self.nodes)
+        with self.assertRaises(ValueError):
+            group.load([[1, 2]])
+        with self.assertRaises(ValueError):
+            group.load([[1, 2], [3]])
+        group.load([[1, 2], [3, 4]])
+        group.load(([5], [6]))
+        self.assertEqual(len(group), 3)
+
+    def test_stream(self):
+        group = AxisGroup(self.nodes, period=0.001)
+        group.load([[100, 200, 300], [-1, -2, -3]])
+        group.start()
+        self.addCleanup(group.stop)
+        self.sync(1.000)
+        self.assertTrue(self.event.wait(1))
+        self.sync(1.001)
+        # A SYNC is missing here
+        self.sync(1.003)
+        self.assertTrue(group.wait(1))
+        time.sleep(0.05)
+        self.assertEqual(self.received, [
+            (0x201, b"\x64\x00\x00\x00"),
+            (0x202, b"\xff\xff\xff\xff"),
+            (0x201, b"\xc8\x00\x00\x00"),
+            (0x202, b"\xfe\xff\xff\xff"),
+            (0x201, b"\x2c\x01\x00\x00"),
+            (0x202, b"\xfd\xff\xff\xff"),
+        ])
+        self.assertEqual(group.cycles, 3)
+        self.assertEqual(group.missed_cycles, 1)
+        # Actual values are compared to the setpoints sent two SYNCs earlier
+        self.assertEqual(group.following_error, [100, -1])
+        self.nodes[0].tpdo_values[0x6064] = 180
+        self.nodes[1].tpdo_values[0x6064] = 0
+        self.sync(1.004)
+        self.assertEqual(group.following_error, [20, -2])
+        self.assertEqual(group.max_following_error, [100, 2])
+        # Nothing more to send
+        self.assertEqual(group.cycles, 3)
+
+
+    def test_produce_sync(self):
+        self.bus.subscribe(0x80, self.on_rpdo)
+        group = AxisGroup(self.nodes)
+        with self.assertRaises(ValueError):
+            group.start(produce_sync=True)
+        group = AxisGroup(self.nodes, period=0.005)
+        group.load([[100, 200], [-1, -2]])
+        group.start(produce_sync=True)
+        self.addCleanup(group.stop)
+        self.assertTrue(group.wait(1))
+        self.assertTrue(wait_for(lambda: len(self.received) >= 6))
+        # Each SYNC is directly followed by the setpoints for the next one
+        self.assertEqual(self.received[:6], [
+            (0x80, b""),
+            (0x201, b"\x64\x00\x00\x00"),
+            (0x202, b"\xff\xff\xff\xff"),
+            (0x80, b""),
+            (0x201, b"\xc8\x00\x00\x00"),
+            (0x202, b"\xfe\xff\xff\xff"),
+        ])
+        self.assertEqual(group.cycles, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import threading
+import time
+import unittest
+from canopen import scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = scheduler.Scheduler()
+        self.addCleanup(self.scheduler.stop)
+
+    def test_order(self):
+        calls = []
+        done = threading.Event()
+        now = scheduler.clock()
+        self.scheduler.call_at(now + 0.03, calls.append, 3)
+        self.scheduler.call_at(now + 0.01, calls.append, 1)
+        cancelled = self.scheduler.call_at(now + 0.02, calls.append, 2)
+        self.scheduler.call_at(now + 0.04, done.set)
+        cancelled.cancel()
+        self.assertTrue(done.wait(1))
+        self.assertEqual(calls, [1, 3])
+
+    def test_periodic(self):
+        calls = []
+        done = threading.Event()
+
+        def callback():
+            calls.append(scheduler.clock())
+            if len(calls) == 10:
+                done.set()
+
+        start = scheduler.clock()
+        timer = self.scheduler.call_periodic(0.01, callback)
+        self.assertTrue(done.wait(1))
+        timer.cancel()
+        count = len(calls)
+        for i, when in enumerate(calls[:10]):
+            # Never called before it is due
+            self.assertGreaterEqual(when, start + (i + 1) * 0.01)
+        time.sleep(0.03)
+        self.assertEqual(len(calls), count)
+
+    def test_compact_cancelled(self):
+        now = scheduler.clock()
+        timers = [self.scheduler.call_at(now + 100, lambda: None)
+                  for _ in range(200)]
+        for timer in timers[:150]:
+            timer.cancel()
+        self.assertLessEqual(len(self.scheduler._heap), 100)
+        for timer in timers[150:]:
+            self.assertFalse(timer.cancelled)
+            self.assertIn(timer, [entry[2] for entry in self.scheduler._heap])
+
+if __name__ == "__main__":
+    unittest.main()
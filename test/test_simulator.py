@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+import unittest
+import canopen
+from canopen.simulator import ScheduledMessageTask
+from util import wait_for
+
+EDS_PATH = os.path.join(os.path.dirname(__file__), 'sample.eds')
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.network = canopen.Network()
+        self.network.connect("sim", bustype="virtual")
+        self.addCleanup(self.network.disconnect)
+        self.simulator = canopen.Simulator()
+        self.simulator.connect("sim", bustype="virtual")
+        self.addCleanup(self.simulator.disconnect)
+        for node_id in range(1, 11):
+            self.simulator.create_node(node_id, EDS_PATH)
+
+    def test_only_local_nodes(self):
+        with self.assertRaises(TypeError):
+            self.simulator.add_node(20, EDS_PATH)
+
+    def test_sdo(self):
+        for node_id in range(1, 11):
+            node = self.network.add_node(node_id, EDS_PATH)
+            self.simulator[node_id].sdo[0x2004].raw = node_id
+            self.assertEqual(node.sdo[0x2004].raw, node_id)
+        for node_id in range(1, 11):
+            stats = self.simulator.stats[node_id]
+            self.assertEqual(stats.count, 1)
+            self.assertGreater(stats.max, 0)
+            self.assertLess(stats.mean, 1)
+        self.simulator.reset_stats()
+        self.assertEqual(self.simulator.stats[1].count, 0)
+
+    def test_nmt_dispatch(self):
+        # One subscription for the NMT commands of all nodes
+        self.assertEqual(self.simulator.subscribers[0],
+                         [self.simulator.on_nmt_command])
+        self.network.nmt.state = 'OPERATIONAL'
+        self.assertTrue(wait_for(
+            lambda: self.simulator[10].nmt.state == 'OPERATIONAL'))
+        self.network.send_message(0, [0x80, 3])
+        self.assertTrue(wait_for(
+            lambda: self.simulator[3].nmt.state == 'PRE-OPERATIONAL'))
+        self.assertEqual(self.simulator[2].nmt.state, 'OPERATIONAL')
+        self.assertEqual(self.simulator[4].nmt.state, 'OPERATIONAL')
+        del self.simulator[3]
+        self.assertEqual(self.simulator.subscribers[0],
+                         [self.simulator.on_nmt_command])
+
+    def test_nmt_and_heartbeat(self):
+        heartbeats = {}
+        lock = threading.Lock()
+
+        def on_heartbeat(can_id, data, timestamp):
+            with lock:
+                heartbeats.setdefault(can_id - 0x700, []).append(data[0])
+
+        for node_id in range(1, 11):
+            self.network.subscribe(0x700 + node_id, on_heartbeat)
+
+        def count(minimum):
+            with lock:
+                return (len(heartbeats) == 10 and
+                        all(len(states) >= minimum for states in heartbeats.values()))
+
+        self.network.nmt.state = 'OPERATIONAL'
+        self.assertTrue(wait_for(
+            lambda: self.simulator[10].nmt.state == 'OPERATIONAL'))
+        self.simulator.start(heartbeat_time=20)
+        self.assertTrue(wait_for(lambda: count(3)))
+        self.simulator.stop()
+        # Let heartbeats sent before stopping arrive
+        time.sleep(0.02)
+        for states in heartbeats.values():
+            self.assertEqual(states[-1], 0x05)
+        with lock:
+            total = sum(len(states) for states in heartbeats.values())
+        time.sleep(0.05)
+        self.assertEqual(sum(len(states) for states in heartbeats.values()), total)
+
+    def test_scheduled_message_task(self):
+        received = []
+        self.network.subscribe(0x123, lambda *args: received.append(bytes(args[1])))
+        task = self.simulator.send_periodic(0x123, [1], 0.02)
+        self.assertIsInstance(task, ScheduledMessageTask)
+        self.assertTrue(wait_for(lambda: len(received) >= 2))
+        task.update([2])
+        self.assertTrue(wait_for(lambda: received[-1] == b"\x02"))
+        task.stop()
+        self.assertEqual(received[:2], [b"\x01", b"\x01"])
+        # Let messages sent before stopping arrive
+        time.sleep(0.02)
+        count = len(received)
+        time.sleep(0.05)
+        self.assertEqual(len(received), count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 import canopen
 
@@ -13,7 +15,44 @@ class TestTime(unittest.TestCase):
         network.disconnect()
         self.assertEqual(msg.arbitration_id, 0x100)
         self.assertEqual(msg.dlc, 6)
-        self.assertEqual(msg.data, b"\xb0\xa4\x29\x04\x31\x43")
+        self.assertEqual(msg.data, b"\xb0\xa4\x29\x04\x38\x2f")
+
+    def test_time_producer_periodic(self):
+        network = canopen.Network()
+        network.connect(bustype="virtual", receive_own_messages=True)
+        timestamps = []
+        received = threading.Event()
+
+        def on_time(can_id, data, timestamp):
+            timestamps.append(timestamp)
+            if len(timestamps) == 5:
+                received.set()
+
+        network.subscribe(0x100, on_time)
+        producer = canopen.timestamp.TimeProducer(network)
+        producer.start(0.01)
+        self.assertTrue(received.wait(1))
+        producer.stop()
+        # Let messages sent before stopping arrive
+        time.sleep(0.02)
+        count = len(timestamps)
+        time.sleep(0.05)
+        network.disconnect()
+        self.assertEqual(len(timestamps), count)
+
+    def test_time_consumer(self):
+        network = canopen.Network()
+        consumer = canopen.timestamp.TimeConsumer(network)
+        consumer.start()
+        network.notify(0x100, b"\xb0\xa4\x29\x04\x38\x2f", 1486236237.5)
+        self.assertEqual(consumer.time, 1486236238)
+        self.assertAlmostEqual(consumer.offset, 0.5)
+        network.notify(0x100, b"\xb0\xa4\x29\x04\x38\x2f", 1486236238.5)
+        self.assertAlmostEqual(consumer.offset, 0.4)
+        self.assertAlmostEqual(consumer.map_timestamp(1486236240.0), 1486236240.4)
+        consumer.stop()
+        network.notify(0x100, b"\x00\x00\x00\x00\x00\x00", 1.0)
+        self.assertEqual(consumer.time, 1486236238)
 
 
 if __name__ == "__main__":
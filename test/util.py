@@ -0,0 +1,14 @@
+import time
+
+
+def wait_for(predicate, timeout=1):
+    """Wait until a condition is true.
+
+    :return: False if it did not become true within the timeout
+    """
+    end_time = time.time() + timeout
+    while not predicate():
+        if time.time() > end_time:
+            return False
+        time.sleep(0.001)
+    return True